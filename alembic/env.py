@@ -24,6 +24,14 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def include_name(name, type_, parent_names) -> bool:
+    # Структури повнотекстового пошуку не описані моделями: FTS5-таблиця tasks_fts
+    # зі службовими таблицями в SQLite, стовпець search_vector з індексом у PostgreSQL.
+    if type_ == "table":
+        return not name.startswith("tasks_fts")
+    return name not in {"search_vector", "ix_tasks_search_vector"}
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -49,7 +57,13 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        # SQLite не вміє більшість ALTER TABLE: alembic перебудовує таблицю.
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
 
     with context.begin_transaction():
         context.run_migrations()
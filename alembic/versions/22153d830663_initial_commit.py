@@ -39,3 +39,4 @@ def downgrade() -> None:
     op.drop_index(op.f('ix_tasks_status'), table_name='tasks')
     op.drop_index(op.f('ix_tasks_id'), table_name='tasks')
     op.drop_table('tasks')
+    sa.Enum(name='taskstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,35 @@
+"""add keyset pagination indexes
+
+Revision ID: 3d5a1e8c7f42
+Revises: 9f2e6c1a4b77
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "3d5a1e8c7f42"
+down_revision: Union[str, Sequence[str], None] = "9f2e6c1a4b77"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_tasks_created_at_id", "tasks", ["created_at", "id"], unique=False)
+    op.create_index(
+        "ix_tasks_status_created_at_id", "tasks", ["status", "created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_task_history_task_id_changed_at_id",
+        "task_history",
+        ["task_id", "changed_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_history_task_id_changed_at_id", table_name="task_history")
+    op.drop_index("ix_tasks_status_created_at_id", table_name="tasks")
+    op.drop_index("ix_tasks_created_at_id", table_name="tasks")
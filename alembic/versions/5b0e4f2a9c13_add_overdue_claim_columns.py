@@ -0,0 +1,29 @@
+"""add overdue claim columns
+
+Revision ID: 5b0e4f2a9c13
+Revises: 3d5a1e8c7f42
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "5b0e4f2a9c13"
+down_revision: Union[str, Sequence[str], None] = "3d5a1e8c7f42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("overdue_claim_token", sa.String(), nullable=True))
+    op.add_column("tasks", sa.Column("overdue_claim_expires_at", sa.DateTime(), nullable=True))
+    op.create_index(op.f("ix_tasks_overdue_claim_token"), "tasks", ["overdue_claim_token"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_tasks_overdue_claim_token"), table_name="tasks")
+    op.drop_column("tasks", "overdue_claim_expires_at")
+    op.drop_column("tasks", "overdue_claim_token")
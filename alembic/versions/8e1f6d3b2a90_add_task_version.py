@@ -0,0 +1,25 @@
+"""add task version
+
+Revision ID: 8e1f6d3b2a90
+Revises: 5b0e4f2a9c13
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "8e1f6d3b2a90"
+down_revision: Union[str, Sequence[str], None] = "5b0e4f2a9c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "version")
@@ -0,0 +1,51 @@
+"""add task filter indexes
+
+Revision ID: a4c8e1f7b2d5
+Revises: f2a7d5c8e3b9
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "a4c8e1f7b2d5"
+down_revision: Union[str, Sequence[str], None] = "f2a7d5c8e3b9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+WITH_EMAIL = sa.text("notification_email IS NOT NULL")
+AWAITING_OVERDUE_NOTIFICATION = sa.text("notification_email IS NOT NULL AND overdue_notified_at IS NULL")
+
+
+def upgrade() -> None:
+    op.create_index("ix_tasks_due_date_id", "tasks", ["due_date", "id"], unique=False)
+    op.create_index("ix_tasks_status_due_date_id", "tasks", ["status", "due_date", "id"], unique=False)
+    op.create_index(
+        "ix_tasks_with_email_created_at_id",
+        "tasks",
+        ["created_at", "id"],
+        unique=False,
+        sqlite_where=WITH_EMAIL,
+        postgresql_where=WITH_EMAIL,
+    )
+    op.create_index(
+        "ix_tasks_overdue_notification",
+        "tasks",
+        ["status", "id", "due_date"],
+        unique=False,
+        sqlite_where=AWAITING_OVERDUE_NOTIFICATION,
+        postgresql_where=AWAITING_OVERDUE_NOTIFICATION,
+    )
+    if op.get_bind().dialect.name == "sqlite":
+        # Без статистики SQLite недооцінює часткові індекси й обирає ширші.
+        op.execute("ANALYZE tasks")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_overdue_notification", table_name="tasks")
+    op.drop_index("ix_tasks_with_email_created_at_id", table_name="tasks")
+    op.drop_index("ix_tasks_status_due_date_id", table_name="tasks")
+    op.drop_index("ix_tasks_due_date_id", table_name="tasks")
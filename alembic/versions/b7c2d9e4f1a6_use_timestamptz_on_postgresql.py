@@ -0,0 +1,55 @@
+"""use timestamptz on postgresql
+
+Revision ID: b7c2d9e4f1a6
+Revises: 8e1f6d3b2a90
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b7c2d9e4f1a6"
+down_revision: Union[str, Sequence[str], None] = "8e1f6d3b2a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite зберігає дату як текст без поясу, тож там міграція нічого не змінює.
+DATETIME_COLUMNS = {
+    "tasks": [
+        "due_date",
+        "created_at",
+        "completed_notified_at",
+        "overdue_notified_at",
+        "overdue_claim_expires_at",
+    ],
+    "task_history": ["changed_at"],
+}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, columns in DATETIME_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table,
+                column,
+                type_=sa.DateTime(timezone=True),
+                postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, columns in DATETIME_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table,
+                column,
+                type_=sa.DateTime(),
+                postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            )
@@ -0,0 +1,80 @@
+"""add task stats counters
+
+Revision ID: b9d3f6a2c8e4
+Revises: a4c8e1f7b2d5
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "b9d3f6a2c8e4"
+down_revision: Union[str, Sequence[str], None] = "a4c8e1f7b2d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Момент виконання для вже виконаних завдань — остання зміна статусу в історії
+# (для виконаного завдання це й є виконання), інакше час створення.
+BACKFILL_COMPLETED_AT = (
+    "UPDATE tasks SET completed_at = COALESCE("
+    "(SELECT MAX(changed_at) FROM task_history "
+    "WHERE task_history.task_id = tasks.id AND event_type = 'STATUS_CHANGED'), "
+    "(SELECT MAX(changed_at) FROM task_history_archive "
+    "WHERE task_history_archive.task_id = tasks.id AND event_type = 'STATUS_CHANGED'), "
+    "created_at) "
+    "WHERE status = 'COMPLETED'"
+)
+FILL_STATUS_COUNTS = (
+    "INSERT INTO task_status_counts (status, count) "
+    "SELECT status, COUNT(*) FROM tasks WHERE status IS NOT NULL GROUP BY status"
+)
+FILL_DAILY_COUNTS = (
+    "INSERT INTO task_daily_counts (day, completed, due_pending) "
+    "SELECT day, SUM(completed), SUM(due_pending) FROM ("
+    "SELECT {completed_day} AS day, 1 AS completed, 0 AS due_pending FROM tasks "
+    "WHERE status = 'COMPLETED' AND completed_at IS NOT NULL "
+    "UNION ALL "
+    "SELECT {due_day}, 0, 1 FROM tasks WHERE status = 'PENDING' AND due_date IS NOT NULL"
+    ") AS counts GROUP BY day"
+)
+
+
+def _utc_day(column: str) -> str:
+    if op.get_bind().dialect.name == "postgresql":
+        return f"({column} AT TIME ZONE 'UTC')::date"
+    return f"date({column})"
+
+
+def upgrade() -> None:
+    # Тип taskstatus у PostgreSQL уже створено разом із tasks.
+    status = sa.Enum("PENDING", "COMPLETED", name="taskstatus").with_variant(
+        postgresql.ENUM("PENDING", "COMPLETED", name="taskstatus", create_type=False),
+        "postgresql",
+    )
+    op.add_column("tasks", sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_table(
+        "task_status_counts",
+        sa.Column("status", status, nullable=False),
+        sa.Column("count", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("status"),
+    )
+    op.create_table(
+        "task_daily_counts",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("completed", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("due_pending", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("day"),
+    )
+    op.execute(BACKFILL_COMPLETED_AT)
+    op.execute(FILL_STATUS_COUNTS)
+    op.execute(FILL_DAILY_COUNTS.format(completed_day=_utc_day("completed_at"), due_day=_utc_day("due_date")))
+
+
+def downgrade() -> None:
+    op.drop_table("task_daily_counts")
+    op.drop_table("task_status_counts")
+    op.drop_column("tasks", "completed_at")
@@ -0,0 +1,37 @@
+"""add outbox messages
+
+Revision ID: c5e8a3d1f7b6
+Revises: b9d3f6a2c8e4
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "c5e8a3d1f7b6"
+down_revision: Union[str, Sequence[str], None] = "b9d3f6a2c8e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox_messages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.Enum("TASK_COMPLETED", name="outboxkind"), nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("claim_token", sa.String(), nullable=True),
+        sa.Column("claim_expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_outbox_messages_claim_token"), "outbox_messages", ["claim_token"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_outbox_messages_claim_token"), table_name="outbox_messages")
+    op.drop_table("outbox_messages")
+    sa.Enum(name="outboxkind").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,203 @@
+"""compact task history
+
+Revision ID: d3f8a2b6c4e1
+Revises: b7c2d9e4f1a6
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import json
+import logging
+import os
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "d3f8a2b6c4e1"
+down_revision: Union[str, Sequence[str], None] = "b7c2d9e4f1a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Ті самі налаштування, що й у app/history.py; міграція не імпортує застосунок.
+CHECKPOINT_INTERVAL = int(os.getenv("HISTORY_CHECKPOINT_INTERVAL", "20"))
+COMPRESSION = os.getenv("HISTORY_COMPRESSION", "").lower() in {"1", "true", "yes", "on"}
+BATCH_SIZE = 5000
+FULL_SNAPSHOT_EVENTS = {"CREATED", "DELETED"}
+
+task_history = sa.table(
+    "task_history",
+    sa.column("id", sa.Integer),
+    sa.column("task_id", sa.Integer),
+    sa.column("event_type", sa.String),
+    sa.column("before_data", sa.JSON),
+    sa.column("after_data", sa.JSON),
+    sa.column("changed_fields", sa.JSON),
+    sa.column("is_checkpoint", sa.Boolean),
+    sa.column("compressed_snapshot", sa.LargeBinary),
+)
+
+
+def _stored_size(row: dict) -> int:
+    size = len(row["compressed_snapshot"] or b"")
+    for column in ("before_data", "after_data", "changed_fields"):
+        if row[column] is not None:
+            size += len(json.dumps(row[column], ensure_ascii=False).encode("utf-8"))
+    return size
+
+
+def _history_pages(bind, *columns):
+    """Усі рядки історії порціями, впорядковані за (task_id, id)."""
+    last = (-1, -1)
+    while True:
+        rows = bind.execute(
+            sa.select(*columns)
+            .where(sa.tuple_(task_history.c.task_id, task_history.c.id) > last)
+            .order_by(task_history.c.task_id, task_history.c.id)
+            .limit(BATCH_SIZE)
+        ).mappings().all()
+        if not rows:
+            return
+        yield rows
+        last = (rows[-1]["task_id"], rows[-1]["id"])
+
+
+def _write(bind, rows: list[dict]):
+    if rows:
+        bind.execute(
+            task_history.update()
+            .where(task_history.c.id == sa.bindparam("row_id"))
+            .values(
+                before_data=sa.bindparam("before_data"),
+                after_data=sa.bindparam("after_data"),
+                changed_fields=sa.bindparam("changed_fields"),
+                is_checkpoint=sa.bindparam("is_checkpoint"),
+                compressed_snapshot=sa.bindparam("compressed_snapshot"),
+            ),
+            rows,
+        )
+
+
+def _compact(row: dict, state: dict | None, position: int) -> dict:
+    before_data, after_data, changed_fields = row["before_data"], row["after_data"], row["changed_fields"]
+    compacted = {"row_id": row["id"], "before_data": None, "changed_fields": None, "compressed_snapshot": None}
+    if (
+        row["event_type"] not in FULL_SNAPSHOT_EVENTS
+        and position % CHECKPOINT_INTERVAL != 0
+        and state is not None
+        and before_data == state
+        and after_data is not None
+    ):
+        delta = {field: value for field, value in after_data.items() if state.get(field) != value}
+        # Дельта годиться лише тоді, коли з неї відновлюються ті самі знімки й поля.
+        if list(delta) == list(changed_fields or []) and {**state, **delta} == after_data:
+            return {**compacted, "after_data": delta, "is_checkpoint": False}
+
+    if COMPRESSION:
+        payload = {"before_data": before_data, "after_data": after_data, "changed_fields": changed_fields}
+        return {
+            **compacted,
+            "after_data": None,
+            "is_checkpoint": True,
+            "compressed_snapshot": zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8")),
+        }
+    return {
+        **compacted,
+        "before_data": before_data,
+        "after_data": after_data,
+        "changed_fields": changed_fields,
+        "is_checkpoint": True,
+    }
+
+
+def upgrade() -> None:
+    op.add_column(
+        "task_history",
+        sa.Column("is_checkpoint", sa.Boolean(), server_default=sa.true(), nullable=False),
+    )
+    op.add_column("task_history", sa.Column("compressed_snapshot", sa.LargeBinary(), nullable=True))
+    op.create_index(
+        "ix_task_history_task_id_is_checkpoint_id",
+        "task_history",
+        ["task_id", "is_checkpoint", "id"],
+        unique=False,
+    )
+
+    bind = op.get_bind()
+    task_id, state, position = None, None, 0
+    rows_total = checkpoints = bytes_before = bytes_after = 0
+    for page in _history_pages(
+        bind,
+        task_history.c.id,
+        task_history.c.task_id,
+        task_history.c.event_type,
+        task_history.c.before_data,
+        task_history.c.after_data,
+        task_history.c.changed_fields,
+    ):
+        updates = []
+        for row in page:
+            if row["task_id"] != task_id:
+                task_id, state, position = row["task_id"], None, 0
+            position += 1
+            compacted = _compact(row, state, position)
+            updates.append(compacted)
+            state = row["after_data"]
+
+            rows_total += 1
+            checkpoints += compacted["is_checkpoint"]
+            bytes_before += _stored_size({**row, "compressed_snapshot": None})
+            bytes_after += _stored_size(compacted)
+        _write(bind, updates)
+
+    saved = 100 * (bytes_before - bytes_after) / bytes_before if bytes_before else 0.0
+    logger.info(
+        "task_history: %d rows (%d checkpoints), JSON payload %d -> %d bytes, saved %.1f%%",
+        rows_total,
+        checkpoints,
+        bytes_before,
+        bytes_after,
+        saved,
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    task_id, state = None, None
+    for page in _history_pages(bind, *task_history.c):
+        updates = []
+        for row in page:
+            if row["task_id"] != task_id:
+                task_id, state = row["task_id"], None
+            if row["is_checkpoint"]:
+                before_data, after_data, changed_fields = row["before_data"], row["after_data"], row["changed_fields"]
+                if row["compressed_snapshot"] is not None:
+                    payload = json.loads(zlib.decompress(row["compressed_snapshot"]))
+                    before_data, after_data, changed_fields = (
+                        payload["before_data"],
+                        payload["after_data"],
+                        payload["changed_fields"],
+                    )
+            else:
+                before_data = state
+                after_data = {**(state or {}), **row["after_data"]}
+                changed_fields = list(row["after_data"])
+            updates.append(
+                {
+                    "row_id": row["id"],
+                    "before_data": before_data,
+                    "after_data": after_data,
+                    "changed_fields": changed_fields,
+                    "is_checkpoint": True,
+                    "compressed_snapshot": None,
+                }
+            )
+            state = after_data
+        _write(bind, updates)
+
+    op.drop_index("ix_task_history_task_id_is_checkpoint_id", table_name="task_history")
+    op.drop_column("task_history", "compressed_snapshot")
+    op.drop_column("task_history", "is_checkpoint")
@@ -0,0 +1,29 @@
+"""add outbox group key
+
+Revision ID: d7a4f1c9e2b8
+Revises: c5e8a3d1f7b6
+Create Date: 2026-10-19 01:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "d7a4f1c9e2b8"
+down_revision: Union[str, Sequence[str], None] = "c5e8a3d1f7b6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("outbox_messages", sa.Column("group_key", sa.String(), nullable=True))
+    op.create_index(
+        "ix_outbox_messages_kind_group_key", "outbox_messages", ["kind", "group_key"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_messages_kind_group_key", table_name="outbox_messages")
+    op.drop_column("outbox_messages", "group_key")
@@ -0,0 +1,58 @@
+"""add task history archive
+
+Revision ID: e6b1c9a4d7f2
+Revises: d3f8a2b6c4e1
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "e6b1c9a4d7f2"
+down_revision: Union[str, Sequence[str], None] = "d3f8a2b6c4e1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EVENT_TYPES = (
+    "CREATED",
+    "UPDATED",
+    "STATUS_CHANGED",
+    "DELETED",
+    "NOTIFIED_COMPLETED",
+    "NOTIFIED_OVERDUE",
+)
+
+
+def upgrade() -> None:
+    # Тип taskeventtype у PostgreSQL уже створено разом із task_history.
+    event_type = sa.Enum(*EVENT_TYPES, name="taskeventtype").with_variant(
+        postgresql.ENUM(*EVENT_TYPES, name="taskeventtype", create_type=False),
+        "postgresql",
+    )
+    op.create_table(
+        "task_history_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("event_type", event_type, nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("before_data", sa.JSON(), nullable=True),
+        sa.Column("after_data", sa.JSON(), nullable=True),
+        sa.Column("changed_fields", sa.JSON(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_task_history_archive_task_id_changed_at_id",
+        "task_history_archive",
+        ["task_id", "changed_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_task_history_archive_task_id_changed_at_id", table_name="task_history_archive")
+    op.drop_table("task_history_archive")
@@ -0,0 +1,61 @@
+"""add task full text search
+
+Revision ID: f2a7d5c8e3b9
+Revises: e6b1c9a4d7f2
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "f2a7d5c8e3b9"
+down_revision: Union[str, Sequence[str], None] = "e6b1c9a4d7f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Ті самі вирази, що й у app/models.py; міграція не імпортує застосунок.
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 0', prefix='2 3 4')",
+    "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        # Індексуємо наявні завдання.
+        op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    elif op.get_bind().dialect.name == "postgresql":
+        # Стовпець обчислюється для наявних рядків одразу (таблиця переписується).
+        op.execute(f"ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED")
+        op.create_index("ix_tasks_search_vector", "tasks", ["search_vector"], unique=False, postgresql_using="gin")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in ("tasks_fts_au", "tasks_fts_ad", "tasks_fts_ai"):
+            op.execute(f"DROP TRIGGER {trigger}")
+        op.execute("DROP TABLE tasks_fts")
+    elif op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_tasks_search_vector", table_name="tasks")
+        op.drop_column("tasks", "search_vector")
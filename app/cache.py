@@ -0,0 +1,199 @@
+"""Кеш відповідей для GET /tasks/{task_id} та GET /tasks/.
+
+Окреме завдання кешується під ключем ``task:{id}`` разом зі своєю версією й
+видаляється при кожному записі; читання перевіряє версію запису кешу (див.
+``valid`` у ``get_or_load``).
+Сторінки списку кешуються під ключем з найбільшим ID task_history — тим самим
+значенням, з якого будується їхній ETag. Кожен запис (з будь-якого процесу чи
+воркера Celery) додає подію в історію, тож старі сторінки стають недосяжними
+без жодного спільного лічильника, навіть у кеші ``memory``.
+
+Бекенд обирається змінною CACHE_BACKEND: ``memory`` (LRU + TTL у процесі),
+``redis`` (той самий Redis, що й брокер Celery) або ``none``.
+"""
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlencode
+
+from .config import REDIS_URL, int_env
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL_SECONDS = int_env("CACHE_TTL_SECONDS", 30)
+CACHE_MAX_ENTRIES = int_env("CACHE_MAX_ENTRIES", 10_000)
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "todo:")
+
+
+class CacheBackend:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Any | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: int):
+        raise NotImplementedError
+
+    async def delete(self, *keys: str):
+        raise NotImplementedError
+
+    async def stats(self) -> dict[str, Any]:
+        return {
+            "backend": CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class NullCache(CacheBackend):
+    async def get(self, key: str) -> Any | None:
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: int):
+        pass
+
+    async def delete(self, *keys: str):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    @property
+    def entries(self) -> int:
+        return len(self._entries)
+
+    async def stats(self) -> dict[str, Any]:
+        return {**await super().stats(), "entries": self.entries}
+
+
+class RedisCache(CacheBackend):
+    """Кеш у Redis. Помилки Redis не ламають запит: читання вважається промахом."""
+
+    def __init__(self, url: str, prefix: str):
+        super().__init__()
+        from redis import asyncio as redis_asyncio
+        from redis.exceptions import RedisError
+
+        self._redis = redis_asyncio.from_url(url)
+        self._errors = RedisError
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any | None:
+        try:
+            raw = await self._redis.get(self.prefix + key)
+        except self._errors:
+            logger.warning("Redis cache unavailable on get", exc_info=True)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: int):
+        try:
+            await self._redis.set(self.prefix + key, json.dumps(value), ex=ttl)
+        except self._errors:
+            logger.warning("Redis cache unavailable on set", exc_info=True)
+
+    async def delete(self, *keys: str):
+        if not keys:
+            return
+        try:
+            await self._redis.delete(*(self.prefix + key for key in keys))
+        except self._errors:
+            logger.warning("Redis cache unavailable on delete", exc_info=True)
+
+    async def stats(self) -> dict[str, Any]:
+        stats = await super().stats()
+        try:
+            info = await self._redis.info("stats")
+        except self._errors:
+            return stats
+        return {**stats, "evictions": info.get("evicted_keys", 0)}
+
+
+def _build_backend() -> CacheBackend:
+    if CACHE_BACKEND == "redis":
+        return RedisCache(REDIS_URL, CACHE_KEY_PREFIX)
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    return MemoryCache(CACHE_MAX_ENTRIES)
+
+
+backend = _build_backend()
+
+
+def task_key(task_id: int) -> str:
+    return f"task:{task_id}"
+
+
+def tasks_list_key(latest_history_id: int | None, **params: Any) -> str:
+    query = urlencode(sorted((name, value) for name, value in params.items() if value is not None))
+    return f"tasks:h{latest_history_id or 0}:{query}"
+
+
+async def get_or_load(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: int = CACHE_TTL_SECONDS,
+    valid: Callable[[Any], bool] | None = None,
+):
+    """Повертає значення з кешу або викликає ``loader`` і кешує його результат.
+
+    ``None`` від ``loader`` не кешується. Значення мають бути JSON-сумісними.
+    Значення з кешу, яке ``valid`` відкидає, завантажується й кешується заново.
+    """
+    value = await backend.get(key)
+    if value is not None and (valid is None or valid(value)):
+        return value
+    value = await loader()
+    if value is not None:
+        await backend.set(key, value, ttl)
+    return value
+
+
+async def invalidate_tasks(*task_ids: int):
+    await backend.delete(*(task_key(task_id) for task_id in task_ids))
+
+
+async def stats() -> dict[str, Any]:
+    return await backend.stats()
@@ -1,109 +1,554 @@
-import smtplib
-import ssl
 import os
-from email.message import EmailMessage
+import time
+import logging
 
-import asyncio
-from celery import Celery
+from celery import Celery, group
 from celery.schedules import crontab
+from celery import bootsteps
+from celery.exceptions import ImproperlyConfigured
+from celery.signals import task_postrun, task_prerun, worker_process_init, worker_process_shutdown
+from . import deadline_scheduler, history_archive, mail, metrics, outbox, worker_runtime
+from .config import REDIS_URL, int_env
 from .database import AsyncSessionLocal
 from .crud import (
+    add_mail_dead_letters,
+    archive_task_history_batch,
+    claim_outbox_groups,
+    claim_outbox_messages,
+    claim_tasks_due_for_overdue_notification,
     get_task,
-    get_tasks_due_for_overdue_notification,
+    get_tasks_by_ids,
+    get_tasks_claimed_for_overdue_notification,
     mark_task_completed_notified,
-    mark_task_overdue_notified,
+    mark_tasks_completed_notified,
+    mark_tasks_overdue_notified,
+    recipient_key,
+    reconcile_task_stats,
+    release_outbox_messages,
+    renew_overdue_claim,
+    take_outbox_messages,
 )
-from .models import TaskStatus
+from .models import OutboxKind, TaskStatus
 from datetime import datetime, timezone
 
 celery_app = Celery(
     "tasks",
-    broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/0"
+    broker=REDIS_URL,
+    backend=REDIS_URL
 )
 
 celery_app.conf.beat_schedule = {
-    "notify-overdue-tasks-every-minute": {
+    "relay-outbox": {
+        "task": "app.celery_app.relay_outbox",
+        "schedule": outbox.OUTBOX_RELAY_INTERVAL_SECONDS,
+    },
+    # З планувальником дедлайнів це лише страховка, див. app/deadline_scheduler.py.
+    "notify-overdue-tasks": {
         "task": "app.celery_app.send_overdue_deadline_notifications",
-        "schedule": crontab(minute='*'),
+        "schedule": (
+            deadline_scheduler.DEADLINE_SWEEP_SECONDS
+            if deadline_scheduler.DEADLINE_SCHEDULER_ENABLED
+            else crontab(minute='*')
+        ),
+    },
+    "archive-task-history-daily": {
+        "task": "app.celery_app.archive_task_history",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "reconcile-task-stats-daily": {
+        "task": "app.celery_app.reconcile_stats",
+        "schedule": crontab(hour=4, minute=0),
     },
 }
 celery_app.conf.timezone = "UTC"
 
+logger = logging.getLogger(__name__)
+
+
+class _RequireSingleLoopPool(bootsteps.Step):
+    """Не дає стартувати воркеру з пулом, несумісним з app/worker_runtime.py.
+
+    Крок, а не сигнал worker_init: винятки обробників сигналів Celery лише пише в журнал.
+    """
+
+    # Пули, у яких задачі процесу виконуються по одній і в тому самому потоці.
+    pools = ("celery.concurrency.prefork", "celery.concurrency.solo")
+
+    def __init__(self, worker, **kwargs):
+        super().__init__(worker, **kwargs)
+        if worker.pool_cls.__module__ not in self.pools:
+            raise ImproperlyConfigured(
+                f"Пул {worker.pool_cls.__module__} не підтримується: задачі ділять один цикл "
+                "подій процесу, запускайте воркер з -P prefork або -P solo"
+            )
+
+
+celery_app.steps["worker"].add(_RequireSingleLoopPool)
+
+
+@worker_process_init.connect
+def _start_worker_runtime(**kwargs):
+    worker_runtime.start()
+    if OVERDUE_SEND_BUDGET_SECONDS >= OVERDUE_CLAIM_LEASE_SECONDS:
+        logger.warning(
+            "Надсилання листа з повторами може тривати до %s с, довше за резерв OVERDUE_CLAIM_LEASE_SECONDS=%s с: "
+            "частину пакета можуть перезарезервувати й надіслати вдруге",
+            OVERDUE_SEND_BUDGET_SECONDS,
+            OVERDUE_CLAIM_LEASE_SECONDS,
+        )
+
+
+@worker_process_shutdown.connect
+def _stop_worker_runtime(**kwargs):
+    worker_runtime.shutdown()
+
+
+# Час початку задач за task_id; задача виконується в тому ж процесі, що й сигнали.
+_task_started: dict[str, float] = {}
+
+
+@task_prerun.connect
+def _start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _stop_task_timer(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        metrics.observe_task(task.name, state or "UNKNOWN", time.perf_counter() - started)
+
+
+OVERDUE_NOTIFICATION_BATCH_SIZE = int_env("OVERDUE_NOTIFICATION_BATCH_SIZE", 200)
+OVERDUE_CLAIM_LEASE_SECONDS = int_env("OVERDUE_CLAIM_LEASE_SECONDS", 300)
+OVERDUE_DISPATCH_MAX_BATCHES = int_env("OVERDUE_DISPATCH_MAX_BATCHES", 50)
+# Приблизно найдовше надсилання одного листа з усіма повторами. Частина пакета
+# (SMTP_POOL_SIZE листів паралельно) має вкладатися в резерв, див.
+# send_overdue_notification_batch.
+OVERDUE_SEND_BUDGET_SECONDS = (
+    mail.SMTP_RETRY_ATTEMPTS * mail.SMTP_TIMEOUT_SECONDS
+    + (mail.SMTP_RETRY_ATTEMPTS - 1) * mail.SMTP_RETRY_MAX_MS / 1000
+)
 
-def _bool_env(name: str, default: bool = False) -> bool:
-    value = os.getenv(name)
-    if value is None:
-        return default
-    return value.lower() in {"1", "true", "yes", "on"}
+# digest — один лист на одержувача з усіма завданнями, виконаними, поки його
+# група в outbox не поповнювалася COMPLETED_DIGEST_WINDOW_SECONDS (але не довше
+# COMPLETED_DIGEST_MAX_WAIT_SECONDS); immediate — окремий лист на кожне завдання
+# з першим же прогоном relay_outbox.
+COMPLETED_NOTIFICATION_MODE = os.getenv("COMPLETED_NOTIFICATION_MODE", "digest")
+COMPLETED_DIGEST_WINDOW_SECONDS = int_env("COMPLETED_DIGEST_WINDOW_SECONDS", 60)
+COMPLETED_DIGEST_MAX_WAIT_SECONDS = int_env("COMPLETED_DIGEST_MAX_WAIT_SECONDS", 600)
 
+def _completed_email(task) -> mail.Email:
+    return mail.Email(
+        recipient=task.notification_email,
+        subject=f"Завдання виконано: {task.title}",
+        body=(
+            f"Завдання '{task.title}' позначено як виконане.\n"
+            f"ID: {task.id}\n"
+            f"Дата завершення: {(task.completed_at or datetime.now(timezone.utc)).isoformat()}"
+        ),
+    )
 
-def _send_email(recipient: str, subject: str, body: str):
-    smtp_host = os.getenv("SMTP_HOST", "localhost")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    smtp_from = os.getenv("SMTP_FROM") or smtp_user or "no-reply@localhost"
-    smtp_use_tls = _bool_env("SMTP_USE_TLS", True)
 
-    message = EmailMessage()
-    message["Subject"] = subject
-    message["From"] = smtp_from
-    message["To"] = recipient
-    message.set_content(body)
+def _completed_digest_email(tasks: list) -> mail.Email:
+    """Один лист про кілька виконаних завдань того самого одержувача."""
+    lines = [
+        f"- {task.title} (ID: {task.id}, завершено {(task.completed_at or datetime.now(timezone.utc)).isoformat()})"
+        for task in tasks
+    ]
+    return mail.Email(
+        recipient=tasks[0].notification_email,
+        subject=f"Виконано завдань: {len(tasks)}",
+        body="Позначено як виконані:\n" + "\n".join(lines),
+    )
 
-    with smtplib.SMTP(smtp_host, smtp_port, timeout=30) as smtp:
-        if smtp_use_tls:
-            smtp.starttls(context=ssl.create_default_context())
-        if smtp_user and smtp_password:
-            smtp.login(smtp_user, smtp_password)
-        smtp.send_message(message)
+
+def _dead_letter(kind: str, tasks: list, delivery: mail.Delivery) -> dict:
+    return {
+        "kind": kind,
+        "task_ids": [task.id for task in tasks],
+        "recipient": delivery.email.recipient,
+        "subject": delivery.email.subject,
+        "body": delivery.email.body,
+        "smtp_code": delivery.code,
+        "error": str(delivery.error),
+        "attempts": delivery.attempts,
+    }
+
+
+async def _deliver(kind: str, letters: list[tuple[list, mail.Email]], stats: dict) -> tuple[list, list[dict]]:
+    """Надсилає листи пулом app/mail.py; ``letters`` — пари (завдання, лист про них).
+
+    Повертає завдання, з якими закінчено (лист доставлено або остаточно відхилено),
+    і записи mail_dead_letters для відхилених. Завдання листів, що не пройшли через
+    тимчасові збої, не повертаються: їх підхопить наступний прогін.
+    """
+    deliveries = await mail.transport.send_many([email for _, email in letters])
+    handled = []
+    dead_letters = []
+    for (tasks, _), delivery in zip(letters, deliveries):
+        task_ids = [task.id for task in tasks]
+        if delivery.sent:
+            handled.extend(tasks)
+            stats["sent"] += len(tasks)
+            stats["emails"] += 1
+        elif delivery.permanent:
+            logger.error("SMTP остаточно відхилив лист про завдання %s: %s", task_ids, delivery.error)
+            handled.extend(tasks)
+            dead_letters.append(_dead_letter(kind, tasks, delivery))
+            stats["dead_lettered"] += len(tasks)
+        else:
+            logger.error(
+                "Не вдалося надіслати лист про завдання %s за %s спроб: %s",
+                task_ids,
+                delivery.attempts,
+                delivery.error,
+            )
+            stats["failed"] += len(tasks)
+    return handled, dead_letters
+
+
+async def _send_completed_notification(task_id: int):
+    async with AsyncSessionLocal() as db:
+        task = await get_task(db=db, task_id=task_id)
+        if task is None:
+            return
+        if task.status != TaskStatus.COMPLETED:
+            return
+        if not task.notification_email:
+            return
+        if task.completed_notified_at is not None:
+            return
+
+        delivery = await mail.transport.send(_completed_email(task))
+        if delivery.permanent:
+            await add_mail_dead_letters(
+                db=db, dead_letters=[_dead_letter(OutboxKind.TASK_COMPLETED.value, [task], delivery)]
+            )
+        elif not delivery.sent:
+            raise delivery.error
+        await mark_task_completed_notified(db=db, task=task)
 
 
 @celery_app.task
 def send_task_completed_email(task_id: int):
-    async def run_send_completed_notification():
+    """Сповіщення про одне завдання; API тепер пише в outbox, див. send_completed_notification_batch."""
+    worker_runtime.run(_send_completed_notification(task_id))
+
+
+async def _take_completed_notifications(db, claim_token: str, stats: dict):
+    """Забирає пакет outbox і відбирає завдання, про які ще треба сповістити.
+
+    Повертає токен пакета, ID рядків без завдання для надсилання (видалене, знову
+    pending, уже сповіщене, без email, дубль) — їх просто видаляють разом з
+    обробленими — і пари ``(id рядка, завдання)`` для надсилання.
+    """
+    token, messages = await take_outbox_messages(db=db, claim_token=claim_token)
+    if not messages:
+        return token, [], []
+    tasks = {task.id: task for task in await get_tasks_by_ids(db=db, task_ids=sorted(set(messages.values())))}
+
+    done = []
+    pending = []
+    queued = set()
+    for message_id, task_id in sorted(messages.items()):
+        task = tasks.get(task_id)
+        if (
+            task is None
+            or task.status != TaskStatus.COMPLETED
+            or not task.notification_email
+            or task.completed_notified_at is not None
+            or task_id in queued
+        ):
+            done.append(message_id)
+            stats["skipped"] += 1
+        else:
+            queued.add(task_id)
+            pending.append((message_id, task))
+    return token, done, pending
+
+
+@celery_app.task
+def send_completed_notification_batch(claim_token: str):
+    """Надсилає сповіщення про виконання для пакета outbox, по листу на завдання."""
+    stats = {"sent": 0, "emails": 0, "dead_lettered": 0, "failed": 0, "skipped": 0}
+
+    async def run_send_completed_notifications():
         async with AsyncSessionLocal() as db:
-            task = await get_task(db=db, task_id=task_id)
-            if task is None:
-                return
-            if task.status != TaskStatus.COMPLETED:
+            token, done, pending = await _take_completed_notifications(db, claim_token, stats)
+            if not done and not pending:
                 return
-            if not task.notification_email:
-                return
-            if task.completed_notified_at is not None:
+
+            message_ids = {task.id: message_id for message_id, task in pending}
+            handled, dead_letters = [], []
+            try:
+                handled, dead_letters = await _deliver(
+                    OutboxKind.TASK_COMPLETED.value,
+                    [([task], _completed_email(task)) for _, task in pending],
+                    stats,
+                )
+            finally:
+                await mark_tasks_completed_notified(
+                    db=db,
+                    tasks=handled,
+                    outbox_token=token,
+                    outbox_ids=done + [message_ids[task.id] for task in handled],
+                    dead_letters=dead_letters,
+                )
+
+    worker_runtime.run(run_send_completed_notifications())
+    return stats
+
+
+@celery_app.task
+def send_completed_digest_batch(claim_token: str):
+    """Надсилає по одному листу-дайджесту на одержувача для пакета outbox.
+
+    relay_outbox резервує групи одержувачів цілими, тож усі завдання одержувача
+    потрапляють в один пакет. Завдання позначаються одним оновленням разом з
+    історією.
+    """
+    stats = {"sent": 0, "emails": 0, "dead_lettered": 0, "failed": 0, "skipped": 0}
+
+    async def run_send_completed_digests():
+        async with AsyncSessionLocal() as db:
+            token, done, pending = await _take_completed_notifications(db, claim_token, stats)
+            if not done and not pending:
                 return
 
-            _send_email(
-                recipient=task.notification_email,
-                subject=f"Завдання виконано: {task.title}",
-                body=(
-                    f"Завдання '{task.title}' позначено як виконане.\n"
-                    f"ID: {task.id}\n"
-                    f"Дата завершення: {datetime.now(timezone.utc).isoformat()}"
-                ),
+            message_ids = {task.id: message_id for message_id, task in pending}
+            recipients: dict[str, list] = {}
+            for _, task in pending:
+                recipients.setdefault(recipient_key(task.notification_email), []).append(task)
+
+            handled, dead_letters = [], []
+            try:
+                handled, dead_letters = await _deliver(
+                    OutboxKind.TASK_COMPLETED.value,
+                    [
+                        (tasks, _completed_email(tasks[0]) if len(tasks) == 1 else _completed_digest_email(tasks))
+                        for tasks in recipients.values()
+                    ],
+                    stats,
+                )
+            finally:
+                await mark_tasks_completed_notified(
+                    db=db,
+                    tasks=handled,
+                    outbox_token=token,
+                    outbox_ids=done + [message_ids[task.id] for task in handled],
+                    dead_letters=dead_letters,
+                )
+
+    worker_runtime.run(run_send_completed_digests())
+    return stats
+
+
+# Задача Celery, що обробляє пакет outbox_messages певного виду, і для
+# групованих видів — (вікно тиші, найдовше очікування) в секундах для claim_groups.
+if COMPLETED_NOTIFICATION_MODE == "immediate":
+    _COMPLETED_CONSUMER = (send_completed_notification_batch, None)
+else:
+    _COMPLETED_CONSUMER = (
+        send_completed_digest_batch,
+        (COMPLETED_DIGEST_WINDOW_SECONDS, COMPLETED_DIGEST_MAX_WAIT_SECONDS),
+    )
+
+_OUTBOX_CONSUMERS = {
+    OutboxKind.TASK_COMPLETED: _COMPLETED_CONSUMER,
+}
+
+
+@celery_app.task
+def relay_outbox():
+    """Задача beat: резервує пакети outbox_messages і ставить у чергу по задачі на пакет.
+
+    Якщо поставити пакет у чергу не вдалося, резерв знімається, і пакет забере
+    наступний прогін.
+    """
+    async def claim(kind, grouping):
+        async with AsyncSessionLocal() as db:
+            if grouping is None:
+                return await claim_outbox_messages(db=db, kind=kind, limit=outbox.OUTBOX_RELAY_BATCH_SIZE)
+            settle_seconds, max_wait_seconds = grouping
+            return await claim_outbox_groups(
+                db=db,
+                kind=kind,
+                limit=outbox.OUTBOX_RELAY_BATCH_SIZE,
+                settle_seconds=settle_seconds,
+                max_wait_seconds=max_wait_seconds,
             )
-            await mark_task_completed_notified(db=db, task=task)
 
-    asyncio.run(run_send_completed_notification())
+    async def release(token):
+        async with AsyncSessionLocal() as db:
+            await release_outbox_messages(db=db, claim_token=token)
+
+    relayed = {}
+    for kind, (consumer, grouping) in _OUTBOX_CONSUMERS.items():
+        batches = messages = 0
+        while batches < outbox.OUTBOX_RELAY_MAX_BATCHES:
+            token, count = worker_runtime.run(claim(kind, grouping))
+            if not count:
+                break
+            try:
+                consumer.delay(token)
+            except Exception:
+                worker_runtime.run(release(token))
+                raise
+            batches += 1
+            messages += count
+            if count < outbox.OUTBOX_RELAY_BATCH_SIZE:
+                break
+        relayed[kind.value] = {"batches": batches, "messages": messages}
+    return relayed
+
+
+def _overdue_email(task) -> mail.Email:
+    return mail.Email(
+        recipient=task.notification_email,
+        subject=f"Пропущено дедлайн: {task.title}",
+        body=(
+            f"У завдання '{task.title}' пропущено дедлайн.\n"
+            f"ID: {task.id}\n"
+            f"Дедлайн: {task.due_date.isoformat() if task.due_date else 'N/A'}"
+        ),
+    )
 
 
 @celery_app.task
 def send_overdue_deadline_notifications():
+    """Диспетчер beat: резервує прострочені завдання пакетами й роздає їх воркерам.
+
+    Кожен пакет резервується атомарно під власний токен з терміном дії
+    OVERDUE_CLAIM_LEASE_SECONDS, тож паралельні прогони не беруть ті самі завдання,
+    а резерви впалих воркерів після закінчення терміну підхоплюються знову.
+    """
+    async def claim_batches():
+        tokens = []
+        async with AsyncSessionLocal() as db:
+            for _ in range(OVERDUE_DISPATCH_MAX_BATCHES):
+                token, task_ids = await claim_tasks_due_for_overdue_notification(
+                    db=db,
+                    limit=OVERDUE_NOTIFICATION_BATCH_SIZE,
+                    lease_seconds=OVERDUE_CLAIM_LEASE_SECONDS,
+                )
+                if not task_ids:
+                    break
+                tokens.append((token, len(task_ids)))
+                if len(task_ids) < OVERDUE_NOTIFICATION_BATCH_SIZE:
+                    break
+        return tokens
+
+    tokens = worker_runtime.run(claim_batches())
+    if tokens:
+        group(send_overdue_notification_batch.s(token) for token, _ in tokens).apply_async()
+    return {"batches": len(tokens), "claimed": sum(count for _, count in tokens)}
+
+
+@celery_app.task
+def send_overdue_notification_batch(claim_token: str):
+    """Надсилає один зарезервований пакет через пул SMTP-з'єднань.
+
+    Пакет іде частинами по SMTP_POOL_SIZE листів. Перед кожною частиною резерв
+    решти пакета продовжується на OVERDUE_CLAIM_LEASE_SECONDS, а завдання, резерв
+    яких уже перехопив інший прогін, відкидаються ще до надсилання. Після частини
+    її завдання одразу позначаються, тож ні довгий пакет, ні час очікування в
+    черзі брокера не призводять до повторних листів.
+
+    Повертає статистику пакета (кількість, тривалість, пропускна здатність).
+    """
+    stats = {"sent": 0, "emails": 0, "dead_lettered": 0, "failed": 0, "claim_lost": 0}
+    started = time.perf_counter()
+
+    def claim_lost(task_ids: list[int], when: str):
+        stats["claim_lost"] += len(task_ids)
+        logger.warning("Резерв %s втрачено %s, завдання %s пропущено", claim_token, when, task_ids)
+
     async def run_send_overdue_notifications():
+        async with AsyncSessionLocal() as db:
+            await renew_overdue_claim(db=db, claim_token=claim_token, lease_seconds=OVERDUE_CLAIM_LEASE_SECONDS)
+            pending = await get_tasks_claimed_for_overdue_notification(db=db, claim_token=claim_token)
+            renew = False
+            while pending:
+                if renew:
+                    held = set(
+                        await renew_overdue_claim(
+                            db=db,
+                            claim_token=claim_token,
+                            lease_seconds=OVERDUE_CLAIM_LEASE_SECONDS,
+                            task_ids=[task.id for task in pending],
+                        )
+                    )
+                    lost = [task.id for task in pending if task.id not in held]
+                    if lost:
+                        claim_lost(lost, "до надсилання")
+                        pending = [task for task in pending if task.id in held]
+                renew = True
+                chunk, pending = pending[:mail.transport.pool_size], pending[mail.transport.pool_size:]
+
+                handled, dead_letters = [], []
+                try:
+                    handled, dead_letters = await _deliver(
+                        "task_overdue", [([task], _overdue_email(task)) for task in chunk], stats
+                    )
+                finally:
+                    marked = await mark_tasks_overdue_notified(
+                        db=db, tasks=handled, claim_token=claim_token, dead_letters=dead_letters
+                    )
+                    # Резерв могли перехопити й під час надсилання частини (вона довша
+                    # за резерв) або користувач змінив завдання: лист міг піти двічі.
+                    lost = sorted({task.id for task in handled} - {task.id for task in marked})
+                    if lost:
+                        claim_lost(lost, "під час надсилання")
+
+    worker_runtime.run(run_send_overdue_notifications())
+    duration = time.perf_counter() - started
+    return {
+        **stats,
+        "duration_seconds": round(duration, 3),
+        "throughput_per_second": round(stats["sent"] / duration, 2) if duration else 0.0,
+    }
+
+
+@celery_app.task
+def archive_task_history():
+    """Переносить в архів записи історії за політиками з app/history_archive.py.
+
+    Працює пакетами по HISTORY_ARCHIVE_BATCH_SIZE, кожен у власній короткій
+    транзакції, щоб не тримати блокування запису; не більше
+    HISTORY_ARCHIVE_MAX_BATCHES пакетів за прогін, решту забере наступний.
+    """
+    async def run_archive():
+        archived = batches = 0
         now = datetime.now(timezone.utc)
         async with AsyncSessionLocal() as db:
-            tasks = await get_tasks_due_for_overdue_notification(db=db, now=now)
-            for task in tasks:
-                _send_email(
-                    recipient=task.notification_email,
-                    subject=f"Пропущено дедлайн: {task.title}",
-                    body=(
-                        f"У завдання '{task.title}' пропущено дедлайн.\n"
-                        f"ID: {task.id}\n"
-                        f"Дедлайн: {task.due_date.isoformat() if task.due_date else 'N/A'}"
-                    ),
+            while batches < history_archive.HISTORY_ARCHIVE_MAX_BATCHES:
+                count = await archive_task_history_batch(
+                    db=db,
+                    now=now,
+                    limit=history_archive.HISTORY_ARCHIVE_BATCH_SIZE,
                 )
-                await mark_task_overdue_notified(db=db, task=task)
+                archived += count
+                batches += 1
+                if count < history_archive.HISTORY_ARCHIVE_BATCH_SIZE:
+                    break
+        return {"archived": archived, "batches": batches}
+
+    return worker_runtime.run(run_archive())
+
+
+@celery_app.task
+def reconcile_stats():
+    """Перераховує лічильники GET /tasks/stats з таблиці tasks і виправляє розбіжності.
+
+    Розбіжності з'являються лише через зміни в обхід crud (ручні правки, відновлення
+    з резервної копії), тож їхню кількість пишемо в журнал як попередження.
+    """
+    async def run_reconcile():
+        async with AsyncSessionLocal() as db:
+            return await reconcile_task_stats(db=db)
 
-    asyncio.run(run_send_overdue_notifications())
\ No newline at end of file
+    corrected = worker_runtime.run(run_reconcile())
+    if corrected:
+        logger.warning("Статистика завдань розійшлася з таблицею tasks: виправлено %s лічильників", corrected)
+    return {"corrected": corrected}
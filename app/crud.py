@@ -1,13 +1,24 @@
+import uuid
+
+from sqlalchemy import and_, bindparam, case, delete, func, insert, or_, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from . import models, schemas
-from datetime import datetime, timezone
-from typing import Any
+from sqlalchemy.orm.attributes import set_committed_value
+from . import cache, database, deadline_scheduler, events, history, history_archive, models, outbox, schemas, search, stats
+from datetime import datetime, timedelta, timezone
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Collection, TypeVar
+
+T = TypeVar("T")
 
 
 def _normalize_value(value: Any):
     if isinstance(value, datetime):
-        return value.isoformat()
+        # SQLite повертає наївний UTC-час, тож знімки до й після запису мають збігатися формат у формат.
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
     if isinstance(value, models.TaskStatus):
         return value.value
     return value
@@ -27,6 +38,17 @@ def _task_snapshot(task: models.Task) -> dict[str, Any]:
     }
 
 
+def _history_row(
+    task_id: int,
+    event_type: models.TaskEventType,
+    before_data: dict[str, Any] | None,
+    after_data: dict[str, Any] | None,
+    changed_fields: list[str] | None,
+    version: int | None = None,
+) -> dict[str, Any]:
+    return history.encode_row(task_id, event_type, before_data, after_data, changed_fields, version)
+
+
 async def _add_task_history(
     db: AsyncSession,
     task_id: int,
@@ -34,95 +56,600 @@ async def _add_task_history(
     before_data: dict[str, Any] | None,
     after_data: dict[str, Any] | None,
     changed_fields: list[str] | None,
+    version: int | None = None,
 ):
-    history = models.TaskHistory(
-        task_id=task_id,
-        event_type=event_type,
-        before_data=before_data,
-        after_data=after_data,
-        changed_fields=changed_fields,
-    )
-    db.add(history)
+    db.add(models.TaskHistory(**_history_row(task_id, event_type, before_data, after_data, changed_fields, version)))
 
-async def create_task(db: AsyncSession, task: schemas.TaskCreate):
-    db_task = models.Task(**task.model_dump())
-    db.add(db_task)
-    await db.flush()
-    after_data = _task_snapshot(db_task)
-    await _add_task_history(
-        db=db,
-        task_id=db_task.id,
-        event_type=models.TaskEventType.CREATED,
-        before_data=None,
-        after_data=after_data,
-        changed_fields=list(after_data.keys()),
-    )
+
+async def _insert_task_history(db: AsyncSession, rows: list[dict[str, Any]]):
+    if rows:
+        await db.execute(insert(models.TaskHistory), rows)
+
+
+async def _run_write(db: AsyncSession, operation: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """Виконує операцію запису та фіксує її.
+
+    У режимі SQLITE_CONCURRENT_MODE операція передається єдиному записувачу,
+    який групує чергу операцій в одну транзакцію; інакше виконується в ``db``.
+    Операція не викликає commit сама.
+    """
+    if database.sqlite_writer is not None:
+        return await database.sqlite_writer.submit(operation)
+    result = await operation(db)
     await db.commit()
-    await db.refresh(db_task)
-    return db_task
+    return result
+
+async def _tasks_changed(*task_ids: int):
+    """Після фіксації запису: скидає кеш завдань, будить стрічку подій і планувальник дедлайнів."""
+    await cache.invalidate_tasks(*task_ids)
+    await events.notify()
+    await deadline_scheduler.notify(*task_ids)
+
+def _completed_at(status: models.TaskStatus) -> datetime | None:
+    return datetime.now(timezone.utc) if status == models.TaskStatus.COMPLETED else None
 
-async def get_tasks(db: AsyncSession, skip: int = 0, limit: int = 10, status: models.TaskStatus = None):
-    query = select(models.Task).offset(skip).limit(limit)
+def _needs_completed_notification(status, notification_email, completed_notified_at) -> bool:
+    return status == models.TaskStatus.COMPLETED and bool(notification_email) and completed_notified_at is None
 
+def recipient_key(notification_email: str) -> str:
+    """Ключ одержувача для групування сповіщень у дайджест."""
+    return notification_email.strip().lower()
+
+async def create_task(db: AsyncSession, task: schemas.TaskCreate):
+    async def operation(session: AsyncSession):
+        db_task = models.Task(**task.model_dump())
+        session.add(db_task)
+        await session.flush()
+        after_data = _task_snapshot(db_task)
+        await _add_task_history(
+            db=session,
+            task_id=db_task.id,
+            event_type=models.TaskEventType.CREATED,
+            before_data=None,
+            after_data=after_data,
+            changed_fields=list(after_data.keys()),
+        )
+        await stats.apply(session, stats.task_contribution(db_task))
+        await session.flush()
+        await session.refresh(db_task)
+        return db_task
+
+    db_task = await _run_write(db, operation)
+    await _tasks_changed(db_task.id)
+    return db_task
+
+def _task_filters(
+    status: models.TaskStatus | None = None,
+    due_from: datetime | None = None,
+    due_to: datetime | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    overdue: bool | None = None,
+    has_email: bool | None = None,
+    now: datetime | None = None,
+) -> list:
+    """Умови WHERE для списку завдань; межі ``*_from`` включні, ``*_to`` — ні."""
+    task = models.Task
+    conditions = []
     if status:
-        query = query.filter(models.Task.status == status)
+        conditions.append(task.status == status)
+    if due_from is not None:
+        conditions.append(task.due_date >= due_from)
+    if due_to is not None:
+        conditions.append(task.due_date < due_to)
+    if created_from is not None:
+        conditions.append(task.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(task.created_at < created_to)
+    if overdue is not None:
+        now = now or datetime.now(timezone.utc)
+        if overdue:
+            conditions.append(and_(task.status == models.TaskStatus.PENDING, task.due_date < now))
+        else:
+            # Явне заперечення: NOT (due_date < now) для завдань без терміну дає NULL.
+            conditions.append(
+                or_(task.status != models.TaskStatus.PENDING, task.due_date.is_(None), task.due_date >= now)
+            )
+    if has_email is not None:
+        email = task.notification_email
+        conditions.append(email.is_not(None) if has_email else email.is_(None))
+    return conditions
+
+
+def _after(column, descending: bool, after: tuple[Any, int]):
+    key = tuple_(column, models.Task.id)
+    return key < after if descending else key > after
 
+
+def _ordering(column, descending: bool):
+    return (column.desc(), models.Task.id.desc()) if descending else (column, models.Task.id)
+
+
+async def get_tasks(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 10,
+    status: models.TaskStatus = None,
+    after: tuple[datetime | None, int] | None = None,
+    sort: schemas.TaskSort = "created_at",
+    due_from: datetime | None = None,
+    due_to: datetime | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    overdue: bool | None = None,
+    has_email: bool | None = None,
+    now: datetime | None = None,
+    columns: Collection[str] | None = None,
+):
+    """Сторінка завдань за фільтрами ``_task_filters`` у порядку ``sort``.
+
+    ``after`` — значення поля сортування та ID останнього завдання попередньої
+    сторінки. За сортування ``due_date`` завдання без дедлайну йдуть після решти
+    в обох напрямках, упорядковані за ID; у їхньому курсорі замість дати ``None``.
+
+    З ``columns`` повертає рядки лише з цими колонками замість об'єктів ORM
+    (без identity map); для курсора до них мають входити ``id`` і поле сортування.
+    """
+    descending = sort.startswith("-")
+    column = getattr(models.Task, sort.lstrip("-"))
+
+    async def fetch(statement):
+        result = await db.execute(statement)
+        return result.scalars().all() if columns is None else result.all()
+
+    entity = [models.Task] if columns is None else [getattr(models.Task, name) for name in columns]
+    query = select(*entity).where(
+        *_task_filters(
+            status=status,
+            due_from=due_from,
+            due_to=due_to,
+            created_from=created_from,
+            created_to=created_to,
+            overdue=overdue,
+            has_email=has_email,
+            now=now,
+        )
+    )
+
+    if column is not models.Task.due_date:
+        if after is not None:
+            query = query.where(_after(column, descending, after))
+        query = query.order_by(*_ordering(column, descending)).offset(skip).limit(limit)
+        return await fetch(query)
+
+    tasks = []
+    if after is None or after[0] is not None:
+        dated = query.where(column.is_not(None))
+        if after is not None:
+            dated = dated.where(_after(column, descending, after))
+        page = dated.order_by(*_ordering(column, descending)).offset(skip).limit(limit)
+        tasks = await fetch(page)
+        if len(tasks) == limit:
+            return tasks
+        if skip and not tasks:
+            # OFFSET пропустив усі завдання з дедлайном; решту пропускаємо серед завдань без нього.
+            dated_count = await db.execute(select(func.count()).select_from(dated.subquery()))
+            skip = max(0, skip - dated_count.scalar_one())
+        else:
+            skip = 0
+        after = None
+
+    undated = query.where(column.is_(None))
+    if after is not None:
+        undated = undated.where(models.Task.id > after[1])
+    undated = undated.order_by(models.Task.id).offset(skip).limit(limit - len(tasks))
+    return [*tasks, *await fetch(undated)]
+
+async def search_tasks(
+    db: AsyncSession,
+    q: str,
+    limit: int = 20,
+    status: models.TaskStatus = None,
+    after: tuple[float, int] | None = None,
+) -> list[tuple[models.Task, float]]:
+    """Завдання, що відповідають запиту ``q``, від релевантніших, разом з оцінкою для курсора."""
+    words = search.terms(q)
+    if not words:
+        return []
+    query, score = search.ranked_tasks(db.bind.dialect.name, words, status)
+
+    if after is not None:
+        query = query.filter(tuple_(score, models.Task.id) > after)
+
+    query = query.order_by(score, models.Task.id).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    return [tuple(row) for row in result]
+
+async def search_truncated(db: AsyncSession, q: str, status: models.TaskStatus = None) -> bool:
+    """Чи є в ``q`` збіги поза SEARCH_MAX_CANDIDATES кандидатами, яких пошук не показує."""
+    words = search.terms(q)
+    query = search.truncated(db.bind.dialect.name, words, status) if words else None
+    if query is None:
+        return False
+    result = await db.execute(query)
+    return result.first() is not None
 
 async def get_task(db: AsyncSession, task_id: int):
     query = select(models.Task).filter(models.Task.id == task_id)
     result = await db.execute(query)
     return result.scalars().first()
 
-async def update_task(db: AsyncSession, task_id: int, task_update: schemas.TaskUpdate):
-    db_task = await get_task(db, task_id)
-    if not db_task:
+async def get_task_version(db: AsyncSession, task_id: int) -> int | None:
+    result = await db.execute(select(models.Task.version).where(models.Task.id == task_id))
+    return result.scalar_one_or_none()
+
+async def get_latest_history_id(db: AsyncSession, task_id: int | None = None) -> int | None:
+    """Найбільший ID в історії: змінюється при кожному записі, тому годиться як версія списку."""
+    query = select(func.max(models.TaskHistory.id))
+    if task_id is not None:
+        query = query.where(models.TaskHistory.task_id == task_id)
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+class VersionConflictError(Exception):
+    """Версія завдання не збігається з очікуваною (If-Match)."""
+
+    def __init__(self, task_id: int, version: int):
+        super().__init__(f"Завдання {task_id} вже змінено, поточна версія {version}")
+        self.task_id = task_id
+        self.version = version
+
+
+_TASK_COLUMNS = tuple(models.Task.__table__.c.keys())
+# Запити оновлення за (діалект, поля, перевірка версії): будувати CTE й ключ
+# кешу SQLAlchemy для кожного PATCH заново дорожче за сам запит.
+_UPDATE_STATEMENTS: dict[tuple[str, tuple[str, ...], bool], tuple[Any, Any]] = {}
+
+
+def _update_statements(dialect: str, fields: tuple[str, ...], check_version: bool) -> tuple[Any, Any]:
+    """``(select старого рядка або None, UPDATE ... RETURNING)`` з параметрами
+    ``task_id``, ``new_<поле>``, ``new_completed_at`` і ``expected_versions``."""
+    key = (dialect, fields, check_version)
+    if key in _UPDATE_STATEMENTS:
+        return _UPDATE_STATEMENTS[key]
+
+    table = models.Task.__table__
+    task = models.Task
+    task_id = bindparam("task_id", type_=table.c.id.type)
+    values = {field: bindparam(f"new_{field}", type_=table.c[field].type) for field in fields}
+    conditions = [task.id == task_id, or_(*(getattr(task, field).is_distinct_from(values[field]) for field in fields))]
+    if check_version:
+        conditions.append(task.version.in_(bindparam("expected_versions", expanding=True)))
+    set_values = {**values, "version": task.version + 1}
+    if "status" in fields:
+        set_values["completed_at"] = case(
+            (
+                task.status.is_distinct_from(values["status"]),
+                bindparam("new_completed_at", type_=table.c.completed_at.type),
+            ),
+            else_=task.completed_at,
+        )
+    statement = update(task).where(*conditions).values(set_values).execution_options(synchronize_session=False)
+
+    if dialect == "postgresql":
+        old = select(table).where(table.c.id == task_id).with_for_update().cte("old_task")
+        statements = (
+            None,
+            statement.where(task.id == old.c.id).returning(
+                task, *(old.c[name].label(f"old_{name}") for name in _TASK_COLUMNS)
+            ),
+        )
+    else:
+        statements = (select(table).where(table.c.id == task_id), statement.returning(task))
+    _UPDATE_STATEMENTS[key] = statements
+    return statements
+
+
+async def _update_task_returning(
+    session: AsyncSession,
+    task_id: int,
+    values: dict[str, Any],
+    expected_versions: Collection[int] | None,
+) -> tuple[SimpleNamespace, models.Task] | None:
+    """Застосовує ``values`` одним UPDATE ... RETURNING і повертає рядок до й після.
+
+    UPDATE спрацьовує, лише якщо хоча б одне значення справді змінюється (і версія
+    входить до ``expected_versions``); інакше повертає ``None``. У PostgreSQL старі
+    значення повертає той самий запит із CTE, що блокує рядок. SQLite не дозволяє
+    посилатися в RETURNING на інші таблиці, тож там їх читає окремий SELECT; до
+    SQLite це виклик у межах процесу, а не мережевий обмін.
+    """
+    select_old, statement = _update_statements(
+        session.bind.dialect.name, tuple(sorted(values)), expected_versions is not None
+    )
+    params = {"task_id": task_id, **{f"new_{field}": value for field, value in values.items()}}
+    if "status" in values:
+        params["new_completed_at"] = _completed_at(values["status"])
+    if expected_versions is not None:
+        params["expected_versions"] = list(expected_versions)
+    options = {"populate_existing": True}
+
+    if select_old is None:
+        row = (await session.execute(statement, params, execution_options=options)).first()
+        if row is None:
+            return None
+        before = SimpleNamespace(**{name: getattr(row, f"old_{name}") for name in _TASK_COLUMNS})
+        return before, row[0]
+
+    old_row = (await session.execute(select_old, {"task_id": task_id})).first()
+    if old_row is None:
         return None
+    db_task = (await session.execute(statement, params, execution_options=options)).scalars().first()
+    if db_task is None:
+        return None
+    return SimpleNamespace(**old_row._asdict()), db_task
+
 
-    before_data = _task_snapshot(db_task)
+async def update_task(
+    db: AsyncSession,
+    task_id: int,
+    task_update: schemas.TaskUpdate,
+    expected_versions: Collection[int] | None = None,
+):
+    """Оновлює завдання; ``None``, якщо його немає.
+
+    З ``expected_versions`` (версії з If-Match) зміна застосовується, лише якщо
+    поточна версія серед них, інакше — VersionConflictError. Історія й лічильники
+    рахуються зі старого й нового рядків, які повертає сам UPDATE.
+    """
     update_data = task_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_task, key, value)
 
-    after_data = _task_snapshot(db_task)
-    changed_fields = [
-        field for field in after_data.keys() if before_data.get(field) != after_data.get(field)
-    ]
+    async def operation(session: AsyncSession):
+        updated = await _update_task_returning(session, task_id, update_data, expected_versions) if update_data else None
+        if updated is None:
+            # Змін немає: завдання відсутнє, версія не та, або значення ті самі.
+            db_task = await get_task(session, task_id)
+            if db_task is None:
+                return None, []
+            if expected_versions is not None and db_task.version not in expected_versions:
+                raise VersionConflictError(task_id, db_task.version)
+            return db_task, []
 
-    if changed_fields:
+        before, db_task = updated
+        before_data = _task_snapshot(before)
+        after_data = _task_snapshot(db_task)
+        changed_fields = [
+            field for field in after_data.keys() if before_data.get(field) != after_data.get(field)
+        ]
         event_type = models.TaskEventType.UPDATED
         if "status" in changed_fields:
             event_type = models.TaskEventType.STATUS_CHANGED
+            if _needs_completed_notification(db_task.status, db_task.notification_email, db_task.completed_notified_at):
+                await outbox.add(
+                    session,
+                    models.OutboxKind.TASK_COMPLETED,
+                    [(db_task.id, recipient_key(db_task.notification_email))],
+                )
         await _add_task_history(
-            db=db,
+            db=session,
             task_id=db_task.id,
             event_type=event_type,
             before_data=before_data,
             after_data=after_data,
             changed_fields=changed_fields,
+            version=db_task.version,
         )
+        delta = stats.task_contribution(db_task)
+        delta.subtract(stats.task_contribution(before))
+        await stats.apply(session, delta)
+        return db_task, changed_fields
 
-    await db.commit()
-    await db.refresh(db_task)
+    db_task, changed_fields = await _run_write(db, operation)
+    if changed_fields:
+        await _tasks_changed(db_task.id)
     return db_task
 
 async def delete_task(db: AsyncSession, task_id: int):
-    db_task = await get_task(db, task_id)
-    if db_task:
+    async def operation(session: AsyncSession):
+        db_task = await get_task(session, task_id)
+        if not db_task:
+            return False
         before_data = _task_snapshot(db_task)
         await _add_task_history(
-            db=db,
+            db=session,
             task_id=db_task.id,
             event_type=models.TaskEventType.DELETED,
             before_data=before_data,
             after_data=None,
             changed_fields=list(before_data.keys()),
         )
-        await db.delete(db_task)
-        await db.commit()
+        delta = Counter()
+        delta.subtract(stats.task_contribution(db_task))
+        await stats.apply(session, delta)
+        await session.delete(db_task)
+        await session.flush()
         return True
-    return False
+
+    deleted = await _run_write(db, operation)
+    if deleted:
+        await _tasks_changed(task_id)
+    return deleted
+
+
+async def create_tasks_bulk(db: AsyncSession, tasks: list[schemas.TaskCreate]):
+    """Створює пакет завдань одним багаторядковим INSERT і записує історію в тій самій транзакції."""
+    async def operation(session: AsyncSession):
+        result = await session.execute(
+            insert(models.Task).returning(models.Task, sort_by_parameter_order=True),
+            [task.model_dump() for task in tasks],
+        )
+        db_tasks = result.scalars().all()
+
+        history_rows = []
+        for db_task in db_tasks:
+            after_data = _task_snapshot(db_task)
+            history_rows.append(
+                _history_row(
+                    task_id=db_task.id,
+                    event_type=models.TaskEventType.CREATED,
+                    before_data=None,
+                    after_data=after_data,
+                    changed_fields=list(after_data.keys()),
+                )
+            )
+        await _insert_task_history(session, history_rows)
+        delta = Counter()
+        for db_task in db_tasks:
+            delta.update(stats.task_contribution(db_task))
+        await stats.apply(session, delta)
+        return db_tasks
+
+    db_tasks = await _run_write(db, operation)
+    await _tasks_changed(*(db_task.id for db_task in db_tasks))
+    return db_tasks
+
+
+async def update_tasks_bulk(db: AsyncSession, items: list[schemas.TaskBulkUpdateItem]):
+    """Оновлює пакет завдань однією транзакцією.
+
+    Повертає список ``(task_id, task, changed_fields)`` у порядку запиту;
+    ``task`` дорівнює ``None``, якщо завдання не знайдено.
+    """
+    async def operation(session: AsyncSession):
+        ids = [item.id for item in items]
+        # Версія, знімки й лічильники рахуються з цього читання, тож рядки блокуються
+        # до кінця транзакції (у порядку id, щоб паралельні пакети не взаємоблокувались).
+        result = await session.execute(
+            select(models.Task)
+            .where(models.Task.id.in_(ids))
+            .order_by(models.Task.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        existing = {db_task.id: db_task for db_task in result.scalars()}
+
+        outcomes = []
+        update_rows = []
+        history_rows = []
+        completed = []
+        delta = Counter()
+        for item in items:
+            db_task = existing.get(item.id)
+            if db_task is None:
+                outcomes.append((item.id, None, []))
+                continue
+
+            before_data = _task_snapshot(db_task)
+            update_data = item.model_dump(exclude_unset=True, exclude={"id"})
+            changed_values = {
+                key: value
+                for key, value in update_data.items()
+                if before_data.get(key) != _normalize_value(value)
+            }
+            changed_fields = [field for field in before_data.keys() if field in changed_values]
+            outcomes.append((db_task.id, db_task, changed_fields))
+            if not changed_fields:
+                continue
+
+            after_data = {**before_data, **{key: _normalize_value(value) for key, value in changed_values.items()}}
+            event_type = models.TaskEventType.UPDATED
+            if "status" in changed_fields:
+                event_type = models.TaskEventType.STATUS_CHANGED
+            update_row = {"id": db_task.id, "version": db_task.version + 1, **changed_values}
+            if "status" in changed_values:
+                update_row["completed_at"] = _completed_at(changed_values["status"])
+                notification_email = update_row.get("notification_email", db_task.notification_email)
+                if _needs_completed_notification(
+                    changed_values["status"], notification_email, db_task.completed_notified_at
+                ):
+                    completed.append((db_task.id, recipient_key(notification_email)))
+            update_rows.append(update_row)
+            delta.subtract(stats.task_contribution(db_task))
+            delta.update(
+                stats.contribution(
+                    update_row.get("status", db_task.status),
+                    update_row.get("due_date", db_task.due_date),
+                    update_row.get("completed_at", db_task.completed_at),
+                )
+            )
+            history_rows.append(
+                _history_row(
+                    task_id=db_task.id,
+                    event_type=event_type,
+                    before_data=before_data,
+                    after_data=after_data,
+                    changed_fields=changed_fields,
+                    version=db_task.version + 1,
+                )
+            )
+
+        if update_rows:
+            await session.execute(update(models.Task), update_rows)
+            for row in update_rows:
+                db_task = existing[row["id"]]
+                for key, value in row.items():
+                    set_committed_value(db_task, key, value)
+        await _insert_task_history(session, history_rows)
+        await stats.apply(session, delta)
+        await outbox.add(session, models.OutboxKind.TASK_COMPLETED, completed)
+        return outcomes, update_rows
+
+    outcomes, update_rows = await _run_write(db, operation)
+    if update_rows:
+        await _tasks_changed(*(row["id"] for row in update_rows))
+    return outcomes
+
+
+async def delete_tasks_bulk(db: AsyncSession, task_ids: list[int]) -> set[int]:
+    """Видаляє пакет завдань однією транзакцією і повертає ID фактично видалених."""
+    async def operation(session: AsyncSession):
+        result = await session.execute(
+            select(models.Task)
+            .where(models.Task.id.in_(task_ids))
+            .order_by(models.Task.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        db_tasks = result.scalars().all()
+        if not db_tasks:
+            return set()
+
+        history_rows = []
+        delta = Counter()
+        for db_task in db_tasks:
+            before_data = _task_snapshot(db_task)
+            delta.subtract(stats.task_contribution(db_task))
+            history_rows.append(
+                _history_row(
+                    task_id=db_task.id,
+                    event_type=models.TaskEventType.DELETED,
+                    before_data=before_data,
+                    after_data=None,
+                    changed_fields=list(before_data.keys()),
+                )
+            )
+        deleted_ids = {db_task.id for db_task in db_tasks}
+        await _insert_task_history(session, history_rows)
+        await session.execute(delete(models.Task).where(models.Task.id.in_(deleted_ids)))
+        await stats.apply(session, delta)
+        return deleted_ids
+
+    deleted_ids = await _run_write(db, operation)
+    if deleted_ids:
+        await _tasks_changed(*deleted_ids)
+    return deleted_ids
+
+
+async def get_task_stats(db: AsyncSession, days: int = 30, now: datetime | None = None) -> dict:
+    return await stats.read(db, now or datetime.now(timezone.utc), days)
+
+
+async def reconcile_task_stats(db: AsyncSession) -> int:
+    """Перераховує лічильники статистики з tasks; повертає кількість виправлених."""
+    return await _run_write(db, stats.reconcile)
+
+
+_HISTORY_COLUMNS = (
+    models.TaskHistory.id,
+    models.TaskHistory.task_id,
+    models.TaskHistory.event_type,
+    models.TaskHistory.changed_at,
+    models.TaskHistory.is_checkpoint,
+    models.TaskHistory.before_data,
+    models.TaskHistory.after_data,
+    models.TaskHistory.changed_fields,
+    models.TaskHistory.compressed_snapshot,
+)
 
 
 async def get_task_history(
@@ -131,58 +658,513 @@ async def get_task_history(
     skip: int = 0,
     limit: int = 50,
     event_type: models.TaskEventType | None = None,
+    after: tuple[datetime, int] | None = None,
 ):
-    query = select(models.TaskHistory).where(models.TaskHistory.task_id == task_id)
+    # Колонки замість об'єктів ORM: рядки потрібні лише для history.restore.
+    query = select(*_HISTORY_COLUMNS).where(models.TaskHistory.task_id == task_id)
     if event_type:
         query = query.where(models.TaskHistory.event_type == event_type)
+    if after is not None:
+        query = query.where(tuple_(models.TaskHistory.changed_at, models.TaskHistory.id) < after)
 
-    query = query.order_by(models.TaskHistory.changed_at.desc()).offset(skip).limit(limit)
+    query = query.order_by(
+        models.TaskHistory.changed_at.desc(),
+        models.TaskHistory.id.desc(),
+    ).offset(skip).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    return await history.restore(db, result.all())
+
+
+async def stream_tasks(
+    db: AsyncSession,
+    status: models.TaskStatus | None = None,
+    due_from: datetime | None = None,
+    due_to: datetime | None = None,
+    yield_per: int = 1000,
+):
+    """Усі завдання за фільтрами через серверний курсор, порціями по ``yield_per`` рядків."""
+    query = select(models.Task).where(*_task_filters(status=status, due_from=due_from, due_to=due_to))
+    query = query.order_by(models.Task.id).execution_options(yield_per=yield_per)
+    async for task in await db.stream_scalars(query):
+        yield task
+
+
+async def stream_task_history(
+    db: AsyncSession,
+    task_id: int,
+    event_type: models.TaskEventType | None = None,
+    yield_per: int = 1000,
+):
+    """Уся історія завдання від старших записів до новіших з повними знімками.
+
+    Рядки читаються серверним курсором, а дельти застосовуються на льоту, тож
+    пам'ять не залежить від довжини історії. Фільтр ``event_type`` застосовується
+    після відновлення, бо для нього потрібні й відфільтровані дельти.
+    """
+    query = (
+        select(*_HISTORY_COLUMNS)
+        .where(models.TaskHistory.task_id == task_id)
+        .order_by(models.TaskHistory.id)
+        .execution_options(yield_per=yield_per)
+    )
+    state = None
+    async for row in await db.stream(query):
+        before_data, after_data, changed_fields = history.apply(state, row)
+        state = after_data
+        if event_type is None or row.event_type == event_type:
+            yield schemas.TaskHistoryResponse(
+                id=row.id,
+                task_id=row.task_id,
+                event_type=row.event_type,
+                changed_at=row.changed_at,
+                before_data=before_data,
+                after_data=after_data,
+                changed_fields=changed_fields,
+            )
+
+
+async def get_archived_task_history(
+    db: AsyncSession,
+    task_id: int,
+    skip: int = 0,
+    limit: int = 50,
+    after: tuple[datetime, int] | None = None,
+):
+    return await history_archive.backend.read(db, task_id, skip=skip, limit=limit, after=after)
+
+
+async def _checkpoint_rows_after(session: AsyncSession, removed: list[models.TaskHistory]):
+    """Перетворює на контрольні точки дельти, що йдуть одразу після видалених записів.
+
+    Інакше після видалення ланцюжок дельт втратив би зміни з архівованих записів.
+    """
+    removed_ids = {row.id for row in removed}
+    result = await session.execute(
+        select(models.TaskHistory.id, models.TaskHistory.task_id, models.TaskHistory.is_checkpoint)
+        .where(
+            models.TaskHistory.task_id.in_({row.task_id for row in removed}),
+            models.TaskHistory.id >= min(removed_ids),
+        )
+        .order_by(models.TaskHistory.task_id, models.TaskHistory.id)
+    )
 
-async def get_tasks_due_for_overdue_notification(db: AsyncSession, now: datetime | None = None):
+    materialize = []
+    current_task, after_removed = None, False
+    for row_id, task_id, is_checkpoint in result:
+        if task_id != current_task:
+            current_task, after_removed = task_id, False
+        if row_id in removed_ids:
+            after_removed = True
+            continue
+        if after_removed and not is_checkpoint:
+            materialize.append(row_id)
+        after_removed = False
+    if not materialize:
+        return
+
+    result = await session.execute(select(models.TaskHistory).where(models.TaskHistory.id.in_(materialize)))
+    entries = await history.restore(session, result.scalars().all())
+    await session.execute(
+        update(models.TaskHistory),
+        [
+            {
+                "id": entry.id,
+                "is_checkpoint": True,
+                **history.checkpoint_columns(entry.before_data, entry.after_data, entry.changed_fields),
+            }
+            for entry in entries
+        ],
+    )
+
+
+async def archive_task_history_batch(
+    db: AsyncSession,
+    now: datetime | None = None,
+    limit: int = history_archive.HISTORY_ARCHIVE_BATCH_SIZE,
+) -> int:
+    """Переносить в архів до ``limit`` найстаріших записів, що підпадають під політики зберігання.
+
+    Кожен пакет — окрема коротка транзакція. Повертає кількість перенесених записів.
+    """
+    condition = history_archive.archivable(now or datetime.now(timezone.utc))
+    if condition is None:
+        return 0
+
+    async def operation(session: AsyncSession):
+        result = await session.execute(
+            select(models.TaskHistory).where(condition).order_by(models.TaskHistory.id).limit(limit)
+        )
+        rows = result.scalars().all()
+        if not rows:
+            return 0
+
+        entries = await history.restore(session, rows)
+        await _checkpoint_rows_after(session, rows)
+        await history_archive.backend.write(session, entries)
+        await session.execute(
+            delete(models.TaskHistory)
+            .where(models.TaskHistory.id.in_([row.id for row in rows]))
+            .execution_options(synchronize_session=False)
+        )
+        return len(rows)
+
+    return await _run_write(db, operation)
+
+async def get_tasks_due_for_overdue_notification(
+    db: AsyncSession,
+    now: datetime | None = None,
+    limit: int | None = None,
+    after_id: int | None = None,
+):
     now = now or datetime.now(timezone.utc)
-    query = select(models.Task).where(
+    query = select(models.Task).where(_due_for_overdue_notification(now))
+    if after_id is not None:
+        query = query.where(models.Task.id > after_id)
+
+    query = query.order_by(models.Task.id).limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+def _awaiting_overdue_notification():
+    return and_(
         models.Task.due_date.is_not(None),
-        models.Task.due_date < now,
         models.Task.status == models.TaskStatus.PENDING,
         models.Task.notification_email.is_not(None),
         models.Task.overdue_notified_at.is_(None),
     )
 
+
+def _due_for_overdue_notification(now: datetime):
+    return and_(_awaiting_overdue_notification(), models.Task.due_date < now)
+
+
+async def get_overdue_notification_schedule(
+    db: AsyncSession,
+    task_ids: Collection[int] | None = None,
+) -> list[tuple[int, datetime]]:
+    """Пари ``(id, due_date)`` завдань, які ще чекають сповіщення про прострочення.
+
+    Без ``task_ids`` — усі такі завдання (індекс ix_tasks_overdue_notification),
+    для app/deadline_scheduler.py.
+    """
+    query = select(models.Task.id, models.Task.due_date).where(_awaiting_overdue_notification())
+    if task_ids is not None:
+        query = query.where(models.Task.id.in_(task_ids))
+    result = await db.execute(query.order_by(models.Task.id))
+    return result.all()
+
+
+async def claim_tasks_due_for_overdue_notification(
+    db: AsyncSession,
+    limit: int,
+    lease_seconds: int,
+    now: datetime | None = None,
+    task_ids: Collection[int] | None = None,
+) -> tuple[str, list[int]]:
+    """Атомарно резервує до ``limit`` прострочених завдань під новий токен.
+
+    Резерв діє ``lease_seconds``; після цього завдання, яке так і не позначили,
+    знову може бути зарезервоване. ``task_ids`` обмежує вибір цими завданнями.
+    Повертає токен і ID зарезервованих завдань.
+    """
+    now = now or datetime.now(timezone.utc)
+    token = uuid.uuid4().hex
+    claimable = and_(
+        _due_for_overdue_notification(now),
+        or_(
+            models.Task.overdue_claim_token.is_(None),
+            models.Task.overdue_claim_expires_at < now,
+        ),
+    )
+    if task_ids is not None:
+        claimable = and_(claimable, models.Task.id.in_(task_ids))
+    # CTE виконується рівно один раз; підзапит у WHERE id IN (...) PostgreSQL може
+    # перевиконувати для кожного рядка, і тоді LIMIT перестає обмежувати пакет.
+    candidates = (
+        select(models.Task.id)
+        .where(claimable)
+        .order_by(models.Task.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte("overdue_candidates")
+    )
+    statement = (
+        update(models.Task)
+        .where(models.Task.id == candidates.c.id, claimable)
+        .values(
+            overdue_claim_token=token,
+            overdue_claim_expires_at=now + timedelta(seconds=lease_seconds),
+        )
+        .returning(models.Task.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    async def operation(session: AsyncSession):
+        result = await session.execute(statement)
+        return sorted(result.scalars().all())
+
+    task_ids = await _run_write(db, operation)
+    return token, task_ids
+
+
+async def renew_overdue_claim(
+    db: AsyncSession,
+    claim_token: str,
+    lease_seconds: int,
+    task_ids: Collection[int] | None = None,
+    now: datetime | None = None,
+) -> list[int]:
+    """Продовжує резерв ``claim_token`` на ``lease_seconds`` від ``now``.
+
+    Продовжуються лише ще не позначені завдання, які досі утримує цей токен,
+    зокрема й ті, чий резерв минув, але ще не перехоплений іншим резервом
+    (перехоплення змінює токен). ``task_ids`` обмежує вибір цими завданнями.
+    Повертає ID завдань, резерв яких продовжено.
+    """
+    now = now or datetime.now(timezone.utc)
+    conditions = [
+        models.Task.overdue_claim_token == claim_token,
+        models.Task.overdue_notified_at.is_(None),
+    ]
+    if task_ids is not None:
+        conditions.append(models.Task.id.in_(task_ids))
+    statement = (
+        update(models.Task)
+        .where(*conditions)
+        .values(overdue_claim_expires_at=now + timedelta(seconds=lease_seconds))
+        .returning(models.Task.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    async def operation(session: AsyncSession):
+        result = await session.execute(statement)
+        return sorted(result.scalars().all())
+
+    return await _run_write(db, operation)
+
+
+async def get_tasks_claimed_for_overdue_notification(
+    db: AsyncSession,
+    claim_token: str,
+    now: datetime | None = None,
+):
+    now = now or datetime.now(timezone.utc)
+    query = (
+        select(models.Task)
+        .where(
+            models.Task.overdue_claim_token == claim_token,
+            models.Task.overdue_claim_expires_at >= now,
+            models.Task.overdue_notified_at.is_(None),
+        )
+        .order_by(models.Task.id)
+    )
     result = await db.execute(query)
     return result.scalars().all()
 
 
 async def mark_task_overdue_notified(db: AsyncSession, task: models.Task):
-    before_data = _task_snapshot(task)
-    task.overdue_notified_at = datetime.now(timezone.utc)
-    after_data = _task_snapshot(task)
-    await _add_task_history(
-        db=db,
-        task_id=task.id,
-        event_type=models.TaskEventType.NOTIFIED_OVERDUE,
-        before_data=before_data,
-        after_data=after_data,
-        changed_fields=["overdue_notified_at"],
-    )
-    await db.commit()
-    await db.refresh(task)
-    return task
+    marked = await _mark_tasks_notified(db, [task], "overdue_notified_at", models.TaskEventType.NOTIFIED_OVERDUE)
+    return marked[0] if marked else None
 
 
 async def mark_task_completed_notified(db: AsyncSession, task: models.Task):
-    before_data = _task_snapshot(task)
-    task.completed_notified_at = datetime.now(timezone.utc)
-    after_data = _task_snapshot(task)
-    await _add_task_history(
-        db=db,
-        task_id=task.id,
-        event_type=models.TaskEventType.NOTIFIED_COMPLETED,
-        before_data=before_data,
-        after_data=after_data,
-        changed_fields=["completed_notified_at"],
+    marked = await _mark_tasks_notified(db, [task], "completed_notified_at", models.TaskEventType.NOTIFIED_COMPLETED)
+    return marked[0] if marked else None
+
+
+# Стовпці знімка історії (_task_snapshot) і версія, які повертає UPDATE позначки.
+_NOTIFIED_RETURNING = (
+    models.Task.id,
+    models.Task.version,
+    models.Task.title,
+    models.Task.description,
+    models.Task.status,
+    models.Task.due_date,
+    models.Task.created_at,
+    models.Task.notification_email,
+    models.Task.completed_notified_at,
+    models.Task.overdue_notified_at,
+)
+
+
+async def _mark_tasks_notified(
+    db: AsyncSession,
+    tasks: list[models.Task],
+    field: str,
+    event_type: models.TaskEventType,
+    conditions: tuple = (),
+    values: dict[str, Any] | None = None,
+    also: Callable[[AsyncSession], Awaitable[None]] | None = None,
+):
+    """Позначає пакет завдань одним UPDATE та одним багаторядковим INSERT в історію.
+
+    UPDATE змінює лише стовпець позначки й версію (в SQL), а знімки для історії
+    будуються з рядків, які він повертає: об'єкти ``tasks`` могли застаріти,
+    поки йшло надсилання, і переписувати ними рядок не можна.
+    ``conditions`` і ``values`` доповнюють UPDATE, ``also`` виконується в тій самій
+    транзакції. Повертає фактично позначені завдання.
+    """
+    if not tasks:
+        if also is not None:
+            await _run_write(db, also)
+        return []
+
+    notified_at = datetime.now(timezone.utc)
+    statement = (
+        update(models.Task)
+        .where(models.Task.id.in_([task.id for task in tasks]), *conditions)
+        .values({field: notified_at, "version": models.Task.version + 1, **(values or {})})
+        .returning(*_NOTIFIED_RETURNING)
+        .execution_options(synchronize_session=False)
+    )
+
+    async def operation(session: AsyncSession):
+        result = await session.execute(statement)
+        rows = {row.id: row for row in result}
+        marked = [task for task in tasks if task.id in rows]
+
+        history_rows = []
+        for task in marked:
+            row = rows[task.id]
+            after_data = _task_snapshot(row)
+            before_data = {**after_data, field: _normalize_value(getattr(task, field))}
+            history_rows.append(
+                _history_row(
+                    task_id=task.id,
+                    event_type=event_type,
+                    before_data=before_data,
+                    after_data=after_data,
+                    changed_fields=[field],
+                    version=row.version,
+                )
+            )
+        await _insert_task_history(session, history_rows)
+        if also is not None:
+            await also(session)
+        return marked, rows
+
+    marked, rows = await _run_write(db, operation)
+    if marked:
+        await _tasks_changed(*(task.id for task in marked))
+    for task in marked:
+        for column in _NOTIFIED_RETURNING:
+            set_committed_value(task, column.key, getattr(rows[task.id], column.key))
+    return marked
+
+
+async def _insert_mail_dead_letters(session: AsyncSession, dead_letters: list[dict[str, Any]]):
+    if dead_letters:
+        await session.execute(insert(models.MailDeadLetter), dead_letters)
+
+
+async def add_mail_dead_letters(db: AsyncSession, dead_letters: list[dict[str, Any]]):
+    """Записує остаточно відхилені листи (рядки для models.MailDeadLetter)."""
+    await _run_write(db, lambda session: _insert_mail_dead_letters(session, dead_letters))
+
+
+async def mark_tasks_overdue_notified(
+    db: AsyncSession,
+    tasks: list[models.Task],
+    claim_token: str | None = None,
+    dead_letters: list[dict[str, Any]] | None = None,
+):
+    """Позначає пакет завдань як сповіщені про прострочення.
+
+    З ``claim_token`` позначаються лише завдання, які все ще утримує цей резерв,
+    і резерв знімається. ``dead_letters`` записуються тією ж транзакцією.
+    Повертає фактично позначені завдання.
+    """
+    conditions = ()
+    values = None
+    if claim_token is not None:
+        conditions = (models.Task.overdue_claim_token == claim_token,)
+        values = {"overdue_claim_token": None, "overdue_claim_expires_at": None}
+    return await _mark_tasks_notified(
+        db,
+        tasks,
+        "overdue_notified_at",
+        models.TaskEventType.NOTIFIED_OVERDUE,
+        conditions=conditions,
+        values=values,
+        also=(lambda session: _insert_mail_dead_letters(session, dead_letters)) if dead_letters else None,
+    )
+
+
+async def claim_outbox_messages(
+    db: AsyncSession,
+    kind: models.OutboxKind,
+    limit: int,
+    now: datetime | None = None,
+) -> tuple[str, int]:
+    """Резервує пакет outbox_messages для relay; повертає токен і розмір пакета."""
+    now = now or datetime.now(timezone.utc)
+    return await _run_write(db, lambda session: outbox.claim(session, kind, limit, now))
+
+
+async def claim_outbox_groups(
+    db: AsyncSession,
+    kind: models.OutboxKind,
+    limit: int,
+    settle_seconds: int,
+    max_wait_seconds: int,
+    now: datetime | None = None,
+) -> tuple[str, int]:
+    """Резервує цілі групи outbox_messages, що не поповнювалися ``settle_seconds``, див. outbox.claim_groups."""
+    now = now or datetime.now(timezone.utc)
+    return await _run_write(
+        db,
+        lambda session: outbox.claim_groups(
+            session,
+            kind,
+            limit,
+            now,
+            settled_before=now - timedelta(seconds=settle_seconds),
+            due_before=now - timedelta(seconds=max_wait_seconds),
+        ),
+    )
+
+
+async def release_outbox_messages(db: AsyncSession, claim_token: str):
+    await _run_write(db, lambda session: outbox.release(session, claim_token))
+
+
+async def take_outbox_messages(
+    db: AsyncSession,
+    claim_token: str,
+    now: datetime | None = None,
+) -> tuple[str, dict[int, int]]:
+    """Забирає зарезервований пакет для обробки, див. outbox.take."""
+    now = now or datetime.now(timezone.utc)
+    return await _run_write(db, lambda session: outbox.take(session, claim_token, now))
+
+
+async def get_tasks_by_ids(db: AsyncSession, task_ids: list[int]) -> list[models.Task]:
+    result = await db.execute(select(models.Task).where(models.Task.id.in_(task_ids)).order_by(models.Task.id))
+    return result.scalars().all()
+
+
+async def mark_tasks_completed_notified(
+    db: AsyncSession,
+    tasks: list[models.Task],
+    outbox_token: str,
+    outbox_ids: list[int],
+    dead_letters: list[dict[str, Any]] | None = None,
+):
+    """Позначає завдання як сповіщені про виконання й видаляє оброблені рядки outbox.
+
+    Усі зміни, разом із ``dead_letters``, фіксуються однією транзакцією.
+    Повертає фактично позначені завдання.
+    """
+    async def also(session: AsyncSession):
+        await outbox.remove(session, outbox_ids, outbox_token)
+        await _insert_mail_dead_letters(session, dead_letters or [])
+
+    return await _mark_tasks_notified(
+        db,
+        tasks,
+        "completed_notified_at",
+        models.TaskEventType.NOTIFIED_COMPLETED,
+        conditions=(models.Task.completed_notified_at.is_(None),),
+        also=also,
     )
-    await db.commit()
-    await db.refresh(task)
-    return task
\ No newline at end of file
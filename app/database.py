@@ -1,20 +1,122 @@
+import os
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./todo.db"
+from .config import bool_env, int_env
+from .sqlite_writer import SQLiteWriter
+
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./todo.db")
+
+DB_ECHO = bool_env("DB_ECHO", False)
+DB_POOL_SIZE = int_env("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = int_env("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = int_env("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = int_env("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = bool_env("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = int_env("DB_STATEMENT_TIMEOUT_MS", 30_000)
+
+SQLITE_CONCURRENT_MODE = bool_env("SQLITE_CONCURRENT_MODE", False)
+SQLITE_BUSY_TIMEOUT_MS = int_env("SQLITE_BUSY_TIMEOUT_MS", 5_000)
+SQLITE_MMAP_SIZE = int_env("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+SQLITE_WRITE_BATCH_SIZE = int_env("SQLITE_WRITE_BATCH_SIZE", 64)
+
+
+def _engine_options(url: str) -> dict:
+    """Параметри create_async_engine для SQLite (aiosqlite) або PostgreSQL (asyncpg)."""
+    database_url = make_url(url)
+    # Колонки JSON (знімки task_history) розбираються orjson: на сторінках історії
+    # це основна частина часу. Запис лишається через json.dumps, формат у базі не змінюється.
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING, "json_deserializer": orjson.loads}
+
+    if database_url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if database_url.database in (None, "", ":memory:"):
+            return options
+    elif database_url.get_driver_name() == "asyncpg":
+        server_settings = {"application_name": "todo-api"}
+        if DB_STATEMENT_TIMEOUT_MS:
+            server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        options["connect_args"] = {"server_settings": server_settings}
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def _is_sqlite_file(url: str) -> bool:
+    database_url = make_url(url)
+    return database_url.get_backend_name() == "sqlite" and database_url.database not in (None, "", ":memory:")
 
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    echo=True,
-    connect_args={"check_same_thread": False}
-)
 
+def _read_only_url(url: str) -> str:
+    database_url = make_url(url)
+    return database_url.set(
+        database=f"file:{database_url.database}",
+        query={**database_url.query, "mode": "ro", "uri": "true"},
+    ).render_as_string(hide_password=False)
+
+
+def _configure_sqlite_concurrency(sqlite_engine, writer: bool):
+    """WAL, synchronous=NORMAL, mmap і busy timeout на кожному з'єднанні.
+
+    Записувач відкриває транзакцію через BEGIN IMMEDIATE (блокування береться
+    одразу) і сам керує BEGIN, щоб SAVEPOINT працювали з драйвером sqlite3.
+    """
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if writer:
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        if writer:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+    if writer:
+        @event.listens_for(sqlite_engine.sync_engine, "begin")
+        def begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+read_engine = engine
+sqlite_writer: SQLiteWriter | None = None
+
+if SQLITE_CONCURRENT_MODE and _is_sqlite_file(SQLALCHEMY_DATABASE_URL):
+    # Одне з'єднання на запис (усі записи йдуть через sqlite_writer) і окремий пул
+    # з'єднань лише для читання, які в режимі WAL не блокуються записувачем.
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        **{**_engine_options(SQLALCHEMY_DATABASE_URL), "pool_size": 1, "max_overflow": 0},
+    )
+    _configure_sqlite_concurrency(engine, writer=True)
+    read_url = _read_only_url(SQLALCHEMY_DATABASE_URL)
+    read_engine = create_async_engine(read_url, **_engine_options(read_url))
+    _configure_sqlite_concurrency(read_engine, writer=False)
+
+# Сесії для запитів і задач Celery; у режимі SQLITE_CONCURRENT_MODE вони лише читають.
 AsyncSessionLocal = async_sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
+WriteSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+if read_engine is not engine:
+    sqlite_writer = SQLiteWriter(WriteSessionLocal, SQLITE_WRITE_BATCH_SIZE)
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
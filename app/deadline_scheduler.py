@@ -0,0 +1,218 @@
+"""Планувальник сповіщень про прострочення з точністю до секунди.
+
+Окремий процес (``python -m app.deadline_scheduler``) тримає в пам'яті
+мін-купу дедлайнів завдань, які ще чекають сповіщення, і спить до найближчого
+з них. Коли дедлайн настає, завдання резервуються тим самим атомарним
+``crud.claim_tasks_due_for_overdue_notification`` (з ``task_ids``), а пакет
+віддається задачі ``send_overdue_notification_batch``. Поки нічого не настало
+й нічого не змінилося, процес до бази не звертається.
+
+Купу живлять шляхи запису: ``notify`` викликається з ``crud._tasks_changed``
+після кожної фіксації й публікує ID змінених завдань у канал Redis
+DEADLINE_SCHEDULER_CHANNEL. Планувальник перечитує за первинним ключем лише ці
+завдання. Після кожної (пере)підписки на канал купа будується заново одним
+запитом за індексом ix_tasks_overdue_notification, тож сигнали, втрачені, поки
+планувальник не слухав, не губляться.
+
+Запускати кількох планувальників безпечно: резерв атомарний, тож лист піде
+один. З DEADLINE_SCHEDULER_ENABLED задача beat ``send_overdue_deadline_notifications``
+замість щохвилинного опитування проходить раз на DEADLINE_SWEEP_SECONDS як
+страховка: вона підбирає завдання, сигнал про які не дійшов (Redis був
+недоступний під час запису), і резерви, що прострочилися після збою
+надсилання.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Callable, Iterable
+
+from . import crud
+from .config import REDIS_URL, bool_env, int_env
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_SCHEDULER_ENABLED = bool_env("DEADLINE_SCHEDULER_ENABLED", False)
+DEADLINE_SCHEDULER_CHANNEL = os.getenv("DEADLINE_SCHEDULER_CHANNEL", "todo:task-deadlines")
+DEADLINE_SCHEDULER_RETRY_SECONDS = int_env("DEADLINE_SCHEDULER_RETRY_SECONDS", 5)
+DEADLINE_SWEEP_SECONDS = int_env("DEADLINE_SWEEP_SECONDS", 900)
+
+# Резерв бере завдання з due_date < now, тож будимося трохи після дедлайну.
+_FIRE_DELAY_SECONDS = 0.001
+
+_redis = None
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        from redis import asyncio as redis_asyncio
+
+        _redis = redis_asyncio.from_url(REDIS_URL)
+    return _redis
+
+
+async def notify(*task_ids: int):
+    """Сигнал планувальнику, що ці завдання змінилися (або видалені)."""
+    if not DEADLINE_SCHEDULER_ENABLED or not task_ids:
+        return
+    from redis.exceptions import RedisError
+
+    try:
+        await _redis_client().publish(DEADLINE_SCHEDULER_CHANNEL, ",".join(map(str, task_ids)))
+    except RedisError:
+        logger.warning(
+            "Redis недоступний, планувальник дедлайнів не отримав зміни завдань %s; їх підбере прохід beat",
+            list(task_ids),
+            exc_info=True,
+        )
+
+
+class DeadlineScheduler:
+    def __init__(self, dispatch: Callable[[str], object], batch_size: int, lease_seconds: int):
+        self.dispatch = dispatch
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        # Купа (дедлайн, id) з лінивим видаленням: актуальний дедлайн завдання — у _due.
+        self._heap: list[tuple[float, int]] = []
+        self._due: dict[int, float] = {}
+        self._changed: set[int] = set()
+        self._resync = False
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def changed(self, task_ids: Iterable[int]):
+        self._changed.update(task_ids)
+        self._wakeup.set()
+
+    def resync(self):
+        self._resync = True
+        self._wakeup.set()
+
+    def _schedule(self, rows: Iterable[tuple[int, datetime]]):
+        for task_id, due_date in rows:
+            due_at = due_date.timestamp()
+            if self._due.get(task_id) != due_at:
+                self._due[task_id] = due_at
+                heapq.heappush(self._heap, (due_at, task_id))
+
+    def _next_due(self) -> float | None:
+        while self._heap:
+            due_at, task_id = self._heap[0]
+            if self._due.get(task_id) == due_at:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self, now: float) -> list[int]:
+        task_ids = []
+        while (due_at := self._next_due()) is not None and due_at < now:
+            _, task_id = heapq.heappop(self._heap)
+            del self._due[task_id]
+            task_ids.append(task_id)
+        return task_ids
+
+    async def _refresh(self, db):
+        if self._resync:
+            self._resync = False
+            self._changed.clear()
+            self._heap = []
+            self._due = {}
+            self._schedule(await crud.get_overdue_notification_schedule(db))
+            logger.info("Планувальник дедлайнів: у черзі %s завдань", len(self._due))
+        elif self._changed:
+            task_ids, self._changed = sorted(self._changed), set()
+            rows = await crud.get_overdue_notification_schedule(db, task_ids)
+            for task_id in set(task_ids).difference(task_id for task_id, _ in rows):
+                self._due.pop(task_id, None)
+            self._schedule(rows)
+            if len(self._heap) > 2 * len(self._due) + 1000:
+                self._heap = [(due_at, task_id) for task_id, due_at in self._due.items()]
+                heapq.heapify(self._heap)
+
+    async def _fire(self, db, task_ids: list[int]):
+        for start in range(0, len(task_ids), self.batch_size):
+            chunk = task_ids[start:start + self.batch_size]
+            token, claimed = await crud.claim_tasks_due_for_overdue_notification(
+                db=db,
+                limit=len(chunk),
+                lease_seconds=self.lease_seconds,
+                task_ids=chunk,
+            )
+            if claimed:
+                await asyncio.to_thread(self.dispatch, token)
+
+    async def step(self):
+        """Застосовує зміни й резервує все, що настало; далі спить до наступного дедлайну."""
+        async with AsyncSessionLocal() as db:
+            await self._refresh(db)
+            due = self._pop_due(time.time())
+            if due:
+                await self._fire(db, due)
+
+    async def run(self):
+        while True:
+            due_at = self._next_due()
+            timeout = None if due_at is None else max(0.0, due_at - time.time() + _FIRE_DELAY_SECONDS)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.step()
+            except Exception:
+                # Незарезервовані завдання повернуться в купу з бази.
+                logger.exception(
+                    "Планувальник дедлайнів: помилка, повна синхронізація за %s с", DEADLINE_SCHEDULER_RETRY_SECONDS
+                )
+                self._resync = True
+                await asyncio.sleep(DEADLINE_SCHEDULER_RETRY_SECONDS)
+
+    async def listen(self):
+        """Слухає канал змін; після кожної (пере)підписки просить повну синхронізацію."""
+        from redis.exceptions import RedisError
+
+        while True:
+            try:
+                async with _redis_client().pubsub() as pubsub:
+                    await pubsub.subscribe(DEADLINE_SCHEDULER_CHANNEL)
+                    self.resync()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.changed(int(task_id) for task_id in message["data"].split(b","))
+            except RedisError:
+                logger.warning(
+                    "Канал планувальника дедлайнів недоступний, повтор за %s с",
+                    DEADLINE_SCHEDULER_RETRY_SECONDS,
+                    exc_info=True,
+                )
+                await asyncio.sleep(DEADLINE_SCHEDULER_RETRY_SECONDS)
+
+
+async def _serve():
+    # celery_app імпортує crud, а crud — цей модуль, тож задачу беремо лише тут.
+    from .celery_app import OVERDUE_CLAIM_LEASE_SECONDS, OVERDUE_NOTIFICATION_BATCH_SIZE, send_overdue_notification_batch
+
+    scheduler = DeadlineScheduler(
+        dispatch=send_overdue_notification_batch.delay,
+        batch_size=OVERDUE_NOTIFICATION_BATCH_SIZE,
+        lease_seconds=OVERDUE_CLAIM_LEASE_SECONDS,
+    )
+    await asyncio.gather(scheduler.listen(), scheduler.run())
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    if not DEADLINE_SCHEDULER_ENABLED:
+        logger.warning("DEADLINE_SCHEDULER_ENABLED вимкнено: шляхи запису не надсилатимуть зміни планувальнику")
+    asyncio.run(_serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""ETag, умовні GET-запити (If-None-Match → 304) та If-Match для PATCH."""
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+
+def task_etag(task_id: int, version: int) -> str:
+    return f'W/"task-{task_id}-{version}"'
+
+
+def if_match_versions(header: str | None, task_id: int) -> list[int] | None:
+    """Версії завдання, перелічені в If-Match; ``None`` — умови немає (або ``*``).
+
+    Теги інших завдань чи іншого формату не збігаються ні з якою версією.
+    """
+    if header is None or header.strip() == "*":
+        return None
+    prefix = f'"task-{task_id}-'
+    versions = []
+    for tag in header.split(","):
+        tag = _opaque(tag)
+        if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+            versions.append(int(tag[len(prefix):-1]))
+    return versions
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Слабке порівняння If-None-Match з поточним ETag (RFC 9110, 13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,314 @@
+"""Стрічка змін завдань для GET /tasks/stream (SSE) і WebSocket /tasks/ws.
+
+Подія — це запис task_history з повними знімками (history.restore), а її ID —
+позиція в стрічці. Один насос на процес читає нові записи пакетами й роздає
+їх підписникам через черги в пам'яті, тож кількість запитів до бази не
+залежить від кількості підключених клієнтів.
+
+Насос прокидається від ``notify``, який crud викликає після кожного запису.
+EVENTS_BACKEND обирає, куди йде сигнал: ``memory`` — лише насосу цього процесу,
+``redis`` — у канал Redis, який слухають насоси всіх процесів (воркери uvicorn,
+Celery). Без сигналу насос опитує базу раз на EVENTS_POLL_SECONDS, тож записи
+з інших процесів у режимі memory теж доходять, лише пізніше.
+
+ID в PostgreSQL видаються до фіксації транзакції, тож запис із меншим ID може
+з'явитися пізніше за більший. Насос не переходить через пропуск у ID, доки той
+не заповниться або не мине EVENTS_GAP_SECONDS (ID відкоченої транзакції не
+з'явиться ніколи), і віддає події строго за зростанням ID.
+
+Відновлення: клієнт передає ID останньої отриманої події (``after`` або
+Last-Event-ID), пропущене дочитується з бази, далі йдуть живі події. Якщо
+пропущено понад EVENTS_MAX_BACKLOG подій або їх уже перенесено в архів, клієнт
+отримує подію ``reset`` і має перечитати список завдань. Так само клієнт, що
+не встигає читати, доганяє стрічку з бази, а не з черги.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+
+from . import history, models
+from .config import REDIS_URL, int_env
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "todo:task-events")
+EVENTS_POLL_SECONDS = int_env("EVENTS_POLL_SECONDS", 5)
+EVENTS_GAP_SECONDS = int_env("EVENTS_GAP_SECONDS", 2)
+EVENTS_HEARTBEAT_SECONDS = int_env("EVENTS_HEARTBEAT_SECONDS", 15)
+EVENTS_BATCH_SIZE = int_env("EVENTS_BATCH_SIZE", 500)
+EVENTS_QUEUE_SIZE = int_env("EVENTS_QUEUE_SIZE", 1000)
+EVENTS_MAX_BACKLOG = int_env("EVENTS_MAX_BACKLOG", 10_000)
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    task_id: int
+    event_type: str
+    # TaskHistoryResponse у JSON: серіалізується один раз для всіх підписників.
+    data: str
+
+
+RESET = Event(id=0, task_id=0, event_type="reset", data='{"event_type":"reset"}')
+
+
+class Subscription:
+    def __init__(self):
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(EVENTS_QUEUE_SIZE)
+        # Черга переповнилася: підписник дочитає пропущене з бази.
+        self.lagging = False
+
+    def put(self, event: Event):
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagging = True
+
+    def catch_up(self):
+        self.lagging = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+async def _read(db, after: int, until: int | None = None, task_id: int | None = None) -> list[Event]:
+    query = select(models.TaskHistory).where(models.TaskHistory.id > after)
+    if until is not None:
+        query = query.where(models.TaskHistory.id <= until)
+    if task_id is not None:
+        query = query.where(models.TaskHistory.task_id == task_id)
+    result = await db.execute(query.order_by(models.TaskHistory.id).limit(EVENTS_BATCH_SIZE))
+    return [
+        Event(id=item.id, task_id=item.task_id, event_type=item.event_type.value, data=item.model_dump_json())
+        for item in await history.restore(db, result.scalars().all())
+    ]
+
+
+class Feed:
+    """Насос подій процесу; запускається з першим підписником на поточному циклі подій."""
+
+    def __init__(self):
+        self.position: int | None = None
+        self._subscriptions: set[Subscription] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._started: asyncio.Task | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._gap_since: float | None = None
+
+    def _ensure_started(self) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        failed = self._started is not None and self._started.done() and self._started.exception() is not None
+        if self._loop is not loop or failed:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._subscriptions = set()
+            self._started = loop.create_task(self._start())
+        return self._started
+
+    async def _start(self):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(func.coalesce(func.max(models.TaskHistory.id), 0)))
+            self.position = result.scalar_one()
+        self._tasks = [asyncio.create_task(self._pump(), name="task-events-pump")]
+        if EVENTS_BACKEND == "redis":
+            self._tasks.append(asyncio.create_task(_listen_redis(self.wake), name="task-events-redis"))
+
+    async def subscribe(self) -> Subscription:
+        await self._ensure_started()
+        subscription = Subscription()
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def wake(self):
+        if self._wakeup is not None and self._loop is asyncio.get_running_loop():
+            self._wakeup.set()
+
+    async def _pump(self):
+        while True:
+            timeout = EVENTS_GAP_SECONDS if self._gap_since is not None else EVENTS_POLL_SECONDS
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._subscriptions:
+                continue
+            try:
+                async with AsyncSessionLocal() as db:
+                    while await self._advance(db):
+                        pass
+            except Exception:
+                logger.exception("Не вдалося прочитати нові події історії завдань")
+
+    async def _advance(self, db) -> bool:
+        """Роздає наступний пакет подій; True, якщо за ним можуть бути ще."""
+        events = await _read(db, self.position)
+        for event in events:
+            if event.id != self.position + 1:
+                now = time.monotonic()
+                self._gap_since = self._gap_since or now
+                if now - self._gap_since < EVENTS_GAP_SECONDS:
+                    return False
+            self._gap_since = None
+            self.position = event.id
+            for subscription in list(self._subscriptions):
+                subscription.put(event)
+        return len(events) == EVENTS_BATCH_SIZE
+
+
+feed = Feed()
+
+
+async def _backlog(after: int, until: int, task_id: int | None) -> AsyncIterator[Event]:
+    async with AsyncSessionLocal() as db:
+        while after < until:
+            events = await _read(db, after, until, task_id)
+            for event in events:
+                yield event
+            if len(events) < EVENTS_BATCH_SIZE:
+                return
+            after = events[-1].id
+
+
+async def _can_resume(after: int) -> bool:
+    if feed.position - after > EVENTS_MAX_BACKLOG:
+        return False
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(func.min(models.TaskHistory.id)))
+        oldest = result.scalar_one_or_none()
+    # Записи до oldest перенесено в архів.
+    return oldest is None or after >= oldest - 1
+
+
+async def stream(after: int | None = None, task_id: int | None = None) -> AsyncIterator[Event | None]:
+    """Події з ID більшим за ``after`` (без нього — лише нові); ``None`` — час надіслати heartbeat."""
+    subscription = await feed.subscribe()
+    try:
+        last = feed.position if after is None else after
+        catching_up = after is not None
+        while True:
+            if catching_up or subscription.lagging:
+                subscription.catch_up()
+                catching_up = False
+                # Новіші за until події вже йдуть у чергу підписки.
+                until = feed.position
+                if not await _can_resume(last):
+                    yield RESET
+                    last = until
+                async for event in _backlog(last, until, task_id):
+                    yield event
+                last = max(last, until)
+                continue
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), EVENTS_HEARTBEAT_SECONDS)
+            except TimeoutError:
+                yield None
+                continue
+            if event.id <= last:
+                continue
+            last = event.id
+            if task_id is None or event.task_id == task_id:
+                yield event
+    finally:
+        feed.unsubscribe(subscription)
+
+
+def _sse(event: Event | None) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    if event is RESET:
+        return f"event: reset\ndata: {event.data}\n\n"
+    return f"id: {event.id}\nevent: {event.event_type}\ndata: {event.data}\n\n"
+
+
+def sse_response(after: int | None, task_id: int | None) -> StreamingResponse:
+    async def body():
+        yield f"retry: {EVENTS_HEARTBEAT_SECONDS * 1000}\n\n"
+        async for event in stream(after, task_id):
+            yield _sse(event)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def serve_websocket(websocket: WebSocket, after: int | None, task_id: int | None):
+    """Надсилає події JSON-повідомленнями, доки клієнт не від'єднається."""
+    async def send():
+        async for event in stream(after, task_id):
+            if event is not None:
+                await websocket.send_text(event.data)
+
+    async def receive():
+        # Вхідні повідомлення не потрібні; читаємо, щоб помітити від'єднання.
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+_redis = None
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        from redis import asyncio as redis_asyncio
+
+        _redis = redis_asyncio.from_url(REDIS_URL)
+    return _redis
+
+
+async def _listen_redis(wake):
+    from redis.exceptions import RedisError
+
+    while True:
+        try:
+            async with _redis_client().pubsub() as pubsub:
+                await pubsub.subscribe(EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        wake()
+        except RedisError:
+            logger.warning("Канал подій Redis недоступний, повтор за %s с", EVENTS_POLL_SECONDS, exc_info=True)
+            await asyncio.sleep(EVENTS_POLL_SECONDS)
+
+
+async def notify():
+    """Сигнал насосам, що в task_history з'явилися нові записи."""
+    if EVENTS_BACKEND != "redis":
+        feed.wake()
+        return
+    from redis.exceptions import RedisError
+
+    try:
+        await _redis_client().publish(EVENTS_CHANNEL, "1")
+    except RedisError:
+        logger.warning("Redis недоступний, сигнал подій отримає лише насос цього процесу", exc_info=True)
+        feed.wake()
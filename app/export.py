@@ -0,0 +1,80 @@
+"""Потокове вивантаження завдань та історії у форматах NDJSON і CSV.
+
+Рядки читаються з бази серверним курсором і віддаються клієнту порціями по
+EXPORT_CHUNK_ROWS, тож пам'ять процесу не залежить від розміру вивантаження.
+Генератор відкриває власну сесію: сесія з ``get_db`` закривається раніше, ніж
+``StreamingResponse`` закінчить передавання.
+"""
+import csv
+import io
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Literal
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import int_env
+from .database import AsyncSessionLocal
+
+EXPORT_CHUNK_ROWS = int_env("EXPORT_CHUNK_ROWS", 500)
+EXPORT_YIELD_PER = int_env("EXPORT_YIELD_PER", 1000)
+
+ExportFormat = Literal["ndjson", "csv"]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+Loader = Callable[[AsyncSession], AsyncIterable[Any]]
+
+
+async def _items(load: Loader, schema: type[BaseModel]) -> AsyncIterator[BaseModel]:
+    async with AsyncSessionLocal() as db:
+        async for row in load(db):
+            yield row if isinstance(row, schema) else schema.model_validate(row)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def _ndjson(items: AsyncIterator[BaseModel]) -> AsyncIterator[str]:
+    chunk = []
+    async for item in items:
+        chunk.append(item.model_dump_json())
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+async def _csv(items: AsyncIterator[BaseModel], fields: list[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+    async for item in items:
+        data = item.model_dump(mode="json")
+        writer.writerow([_csv_value(data[field]) for field in fields])
+        rows += 1
+        if rows >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def streaming_response(load: Loader, schema: type[BaseModel], format: ExportFormat, filename: str) -> StreamingResponse:
+    """Відповідь, що вивантажує рядки ``load(db)`` у форматі ``format``, перетворені на ``schema``."""
+    items = _items(load, schema)
+    body = _ndjson(items) if format == "ndjson" else _csv(items, list(schema.model_fields))
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
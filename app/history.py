@@ -0,0 +1,200 @@
+"""Компактний формат історії завдань.
+
+Більшість подій змінює одне-два поля, тож звичайний запис історії (дельта)
+зберігає в ``after_data`` лише нові значення змінених полів, а ``before_data``
+і ``changed_fields`` лишаються порожніми. Повний знімок (контрольна точка)
+записується для подій created/deleted і для кожної версії завдання, кратної
+HISTORY_CHECKPOINT_INTERVAL. З HISTORY_COMPRESSION=1 контрольна точка
+зберігається стиснутою zlib у ``compressed_snapshot``.
+
+Під час читання повні ``before_data``/``after_data`` відновлюються проходом від
+найближчої попередньої контрольної точки, тож відповідь API не змінюється.
+"""
+import bisect
+import json
+import zlib
+from itertools import groupby
+from typing import Any, Iterable
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas
+from .config import bool_env, int_env
+
+HISTORY_CHECKPOINT_INTERVAL = int_env("HISTORY_CHECKPOINT_INTERVAL", 20)
+HISTORY_COMPRESSION = bool_env("HISTORY_COMPRESSION", False)
+
+_FULL_SNAPSHOT_EVENTS = {models.TaskEventType.CREATED, models.TaskEventType.DELETED}
+
+
+def is_checkpoint(event_type: models.TaskEventType, version: int | None) -> bool:
+    return (
+        event_type in _FULL_SNAPSHOT_EVENTS
+        or version is None
+        or version % HISTORY_CHECKPOINT_INTERVAL == 0
+    )
+
+
+def encode_row(
+    task_id: int,
+    event_type: models.TaskEventType,
+    before_data: dict[str, Any] | None,
+    after_data: dict[str, Any] | None,
+    changed_fields: list[str] | None,
+    version: int | None,
+) -> dict[str, Any]:
+    """Перетворює повні знімки до/після на рядок task_history у компактному форматі.
+
+    ``version`` — версія завдання після події; ``None`` завжди дає контрольну точку.
+    """
+    row = {
+        "task_id": task_id,
+        "event_type": event_type,
+        "is_checkpoint": is_checkpoint(event_type, version),
+        "before_data": None,
+        "after_data": None,
+        "changed_fields": None,
+        "compressed_snapshot": None,
+    }
+    if not row["is_checkpoint"]:
+        row["after_data"] = {field: after_data[field] for field in changed_fields}
+    else:
+        row.update(checkpoint_columns(before_data, after_data, changed_fields))
+    return row
+
+
+def checkpoint_columns(
+    before_data: dict[str, Any] | None,
+    after_data: dict[str, Any] | None,
+    changed_fields: list[str] | None,
+) -> dict[str, Any]:
+    """Значення колонок рядка-контрольної точки з повними знімками."""
+    if HISTORY_COMPRESSION:
+        return {
+            "before_data": None,
+            "after_data": None,
+            "changed_fields": None,
+            "compressed_snapshot": compress_snapshot(before_data, after_data, changed_fields),
+        }
+    return {
+        "before_data": before_data,
+        "after_data": after_data,
+        "changed_fields": changed_fields,
+        "compressed_snapshot": None,
+    }
+
+
+def compress_snapshot(
+    before_data: dict[str, Any] | None,
+    after_data: dict[str, Any] | None,
+    changed_fields: list[str] | None,
+) -> bytes:
+    payload = {"before_data": before_data, "after_data": after_data, "changed_fields": changed_fields}
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def _checkpoint_data(row) -> tuple[dict | None, dict | None, list[str] | None]:
+    if row.compressed_snapshot is not None:
+        payload = json.loads(zlib.decompress(row.compressed_snapshot))
+        return payload["before_data"], payload["after_data"], payload["changed_fields"]
+    return row.before_data, row.after_data, row.changed_fields
+
+
+def replay(rows: Iterable) -> dict[int, tuple[dict | None, dict | None, list[str] | None]]:
+    """Відновлює ``(before_data, after_data, changed_fields)`` для рядків одного завдання.
+
+    Рядки мають іти за зростанням id і починатися з контрольної точки; без неї
+    дельти накладаються на порожній стан, і знімки будуть неповними.
+    """
+    state: dict[str, Any] | None = None
+    restored = {}
+    for row in rows:
+        restored[row.id] = apply(state, row)
+        state = restored[row.id][1]
+    return restored
+
+
+def apply(state: dict[str, Any] | None, row) -> tuple[dict | None, dict | None, list[str] | None]:
+    """Застосовує рядок історії до стану завдання ``state`` (``after_data`` попереднього рядка)."""
+    if row.is_checkpoint:
+        return _checkpoint_data(row)
+    before_data = dict(state) if state is not None else None
+    return before_data, {**(state or {}), **row.after_data}, list(row.after_data.keys())
+
+
+def _merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+async def _load_chain(db: AsyncSession, task_id: int, delta_ids: list[int]) -> list:
+    """Завантажує рядки від найближчої контрольної точки до кожної з дельт ``delta_ids``."""
+    history = models.TaskHistory
+    first_checkpoint = (
+        select(func.coalesce(func.max(history.id), 0))
+        .where(history.task_id == task_id, history.is_checkpoint.is_(True), history.id <= delta_ids[0])
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(history.id)
+        .where(
+            history.task_id == task_id,
+            history.is_checkpoint.is_(True),
+            history.id >= first_checkpoint,
+            history.id <= delta_ids[-1],
+        )
+        .order_by(history.id)
+    )
+    checkpoint_ids = result.scalars().all()
+
+    ranges = []
+    for delta_id in delta_ids:
+        position = bisect.bisect_right(checkpoint_ids, delta_id)
+        ranges.append((checkpoint_ids[position - 1] if position else 0, delta_id))
+
+    result = await db.execute(
+        select(
+            history.id,
+            history.is_checkpoint,
+            history.before_data,
+            history.after_data,
+            history.changed_fields,
+            history.compressed_snapshot,
+        )
+        .where(
+            history.task_id == task_id,
+            or_(*(and_(history.id >= start, history.id <= end) for start, end in _merge_ranges(ranges))),
+        )
+        .order_by(history.id)
+    )
+    return result.all()
+
+
+async def restore(db: AsyncSession, rows: list[models.TaskHistory]) -> list[schemas.TaskHistoryResponse]:
+    """Повертає записи історії з повними знімками в тому ж порядку, що й ``rows``."""
+    restored: dict[int, tuple] = {}
+    for task_id, task_rows in groupby(sorted(rows, key=lambda row: (row.task_id, row.id)), key=lambda row: row.task_id):
+        task_rows = list(task_rows)
+        delta_ids = [row.id for row in task_rows if not row.is_checkpoint]
+        if delta_ids:
+            restored.update(replay(await _load_chain(db, task_id, delta_ids)))
+        restored.update((row.id, _checkpoint_data(row)) for row in task_rows if row.is_checkpoint)
+
+    return [
+        schemas.TaskHistoryResponse(
+            id=row.id,
+            task_id=row.task_id,
+            event_type=row.event_type,
+            changed_at=row.changed_at,
+            before_data=restored[row.id][0],
+            after_data=restored[row.id][1],
+            changed_fields=restored[row.id][2],
+        )
+        for row in rows
+    ]
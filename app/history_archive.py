@@ -0,0 +1,192 @@
+"""Політики зберігання історії та архів для перенесених записів task_history.
+
+Запис підпадає під архівацію, якщо виконується хоча б одна з політик:
+
+* HISTORY_RETENTION_DAYS — старший за N днів (0 вимикає);
+* HISTORY_RETENTION_DAYS_BY_EVENT — окремий вік для типів подій, напр.
+  ``notified_overdue=30,notified_completed=30`` (замість загального віку);
+* HISTORY_KEEP_LAST_PER_TASK — не входить до N останніх записів завдання (0 вимикає);
+* HISTORY_DELETED_TASK_RETENTION_DAYS — завдання вже видалене, а запис старший
+  за N днів (0 вимикає).
+
+Архів обирається змінною HISTORY_ARCHIVE_BACKEND: ``table`` (таблиця
+task_history_archive у тій самій базі) або ``jsonl`` (файли JSONL, стиснуті gzip,
+у теці HISTORY_ARCHIVE_DIR, по одному файлу на HISTORY_ARCHIVE_SHARD_SIZE завдань).
+В архів потрапляють повні знімки, тож архівні записи читаються без ланцюжка дельт.
+
+Найновіший запис task_history не архівується ніколи. Без AUTOINCREMENT SQLite
+видає новому рядку max(id) + 1, тож після видалення найновіших записів їхні ID
+дісталися б новим подіям: найбільший ID (ETag списків, курсор Last-Event-ID
+стрічки /tasks/stream) пішов би назад, а архівна таблиця отримала б дублікати
+ключа.
+"""
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, exists, func, insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from . import models, schemas
+from .config import int_env
+
+
+def _parse_event_days(value: str) -> dict[models.TaskEventType, int]:
+    policies = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, days = item.partition("=")
+        try:
+            policies[models.TaskEventType(name.strip())] = int(days)
+        except ValueError as exc:
+            raise ValueError(f"Некоректна політика HISTORY_RETENTION_DAYS_BY_EVENT: {item!r}") from exc
+    return policies
+
+
+HISTORY_RETENTION_DAYS = int_env("HISTORY_RETENTION_DAYS", 0)
+HISTORY_RETENTION_DAYS_BY_EVENT = _parse_event_days(os.getenv("HISTORY_RETENTION_DAYS_BY_EVENT", ""))
+HISTORY_KEEP_LAST_PER_TASK = int_env("HISTORY_KEEP_LAST_PER_TASK", 0)
+HISTORY_DELETED_TASK_RETENTION_DAYS = int_env("HISTORY_DELETED_TASK_RETENTION_DAYS", 30)
+
+HISTORY_ARCHIVE_BACKEND = os.getenv("HISTORY_ARCHIVE_BACKEND", "table")
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "./history-archive")
+HISTORY_ARCHIVE_SHARD_SIZE = int_env("HISTORY_ARCHIVE_SHARD_SIZE", 1000)
+HISTORY_ARCHIVE_BATCH_SIZE = int_env("HISTORY_ARCHIVE_BATCH_SIZE", 1000)
+HISTORY_ARCHIVE_MAX_BATCHES = int_env("HISTORY_ARCHIVE_MAX_BATCHES", 100)
+
+
+def archivable(now: datetime):
+    """Умова WHERE для записів task_history, які час перенести в архів, або ``None``."""
+    history = models.TaskHistory
+    conditions = []
+
+    for event_type, days in HISTORY_RETENTION_DAYS_BY_EVENT.items():
+        conditions.append(and_(history.event_type == event_type, history.changed_at < now - timedelta(days=days)))
+    if HISTORY_RETENTION_DAYS:
+        age = history.changed_at < now - timedelta(days=HISTORY_RETENTION_DAYS)
+        if HISTORY_RETENTION_DAYS_BY_EVENT:
+            age = and_(history.event_type.not_in(list(HISTORY_RETENTION_DAYS_BY_EVENT)), age)
+        conditions.append(age)
+
+    if HISTORY_KEEP_LAST_PER_TASK:
+        newer = aliased(models.TaskHistory)
+        # Порядок той самий, що в get_task_history: у PostgreSQL changed_at — час
+        # початку транзакції, тож за одним id він може розходитися з порядком вставки.
+        oldest_kept = (
+            select(newer.changed_at, newer.id)
+            .where(newer.task_id == history.task_id)
+            .order_by(newer.changed_at.desc(), newer.id.desc())
+            .offset(HISTORY_KEEP_LAST_PER_TASK - 1)
+            .limit(1)
+            .scalar_subquery()
+        )
+        conditions.append(tuple_(history.changed_at, history.id) < oldest_kept)
+
+    if HISTORY_DELETED_TASK_RETENTION_DAYS:
+        conditions.append(
+            and_(
+                history.changed_at < now - timedelta(days=HISTORY_DELETED_TASK_RETENTION_DAYS),
+                ~exists().where(models.Task.id == history.task_id),
+            )
+        )
+
+    if not conditions:
+        return None
+    newest = select(func.max(history.id)).scalar_subquery()
+    return and_(or_(*conditions), history.id < newest)
+
+
+class ArchiveBackend:
+    async def write(self, db: AsyncSession, entries: list[schemas.TaskHistoryResponse]):
+        """Зберігає записи в архіві. Для ``table`` — у транзакції ``db``."""
+        raise NotImplementedError
+
+    async def read(
+        self,
+        db: AsyncSession,
+        task_id: int,
+        skip: int = 0,
+        limit: int = 50,
+        after: tuple[datetime, int] | None = None,
+    ) -> list[schemas.TaskHistoryResponse]:
+        """Архівні записи завдання від новіших до старіших, як у get_task_history."""
+        raise NotImplementedError
+
+
+class TableArchive(ArchiveBackend):
+    async def write(self, db: AsyncSession, entries: list[schemas.TaskHistoryResponse]):
+        if entries:
+            archived_at = datetime.now(timezone.utc)
+            await db.execute(
+                insert(models.TaskHistoryArchive),
+                [{**entry.model_dump(), "archived_at": archived_at} for entry in entries],
+            )
+
+    async def read(self, db, task_id, skip=0, limit=50, after=None):
+        archive = models.TaskHistoryArchive
+        query = select(archive).where(archive.task_id == task_id)
+        if after is not None:
+            query = query.where(tuple_(archive.changed_at, archive.id) < after)
+        query = query.order_by(archive.changed_at.desc(), archive.id.desc()).offset(skip).limit(limit)
+        result = await db.execute(query)
+        return [schemas.TaskHistoryResponse.model_validate(row) for row in result.scalars()]
+
+
+class JsonlArchive(ArchiveBackend):
+    """Архів у файлах ``history-{shard}.jsonl.gz``; кожен пакет дописується окремим gzip-членом.
+
+    Файл дописується й синхронізується на диск до видалення рядків із бази. Якщо
+    після цього транзакція впаде, наступний прогін допише ті самі записи ще раз,
+    тому під час читання дублікати за id відкидаються.
+    """
+
+    def __init__(self, directory: str, shard_size: int):
+        self.directory = directory
+        self.shard_size = shard_size
+
+    def _path(self, task_id: int) -> str:
+        return os.path.join(self.directory, f"history-{task_id // self.shard_size:06d}.jsonl.gz")
+
+    def _append(self, entries: list[schemas.TaskHistoryResponse]):
+        os.makedirs(self.directory, exist_ok=True)
+        shards: dict[str, list[str]] = {}
+        for entry in entries:
+            shards.setdefault(self._path(entry.task_id), []).append(entry.model_dump_json())
+        for path, lines in shards.items():
+            with open(path, "ab") as file:
+                file.write(gzip.compress(("\n".join(lines) + "\n").encode("utf-8")))
+                file.flush()
+                os.fsync(file.fileno())
+
+    def _load(self, task_id: int) -> list[schemas.TaskHistoryResponse]:
+        path = self._path(task_id)
+        if not os.path.exists(path):
+            return []
+        entries = {}
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                record = json.loads(line)
+                if record["task_id"] == task_id:
+                    entries[record["id"]] = schemas.TaskHistoryResponse.model_validate(record)
+        return sorted(entries.values(), key=lambda entry: (entry.changed_at, entry.id), reverse=True)
+
+    async def write(self, db, entries):
+        if entries:
+            await asyncio.to_thread(self._append, entries)
+
+    async def read(self, db, task_id, skip=0, limit=50, after=None):
+        entries = await asyncio.to_thread(self._load, task_id)
+        if after is not None:
+            entries = [entry for entry in entries if (entry.changed_at, entry.id) < after]
+        return entries[skip:skip + limit]
+
+
+def _build_backend() -> ArchiveBackend:
+    if HISTORY_ARCHIVE_BACKEND == "jsonl":
+        return JsonlArchive(HISTORY_ARCHIVE_DIR, HISTORY_ARCHIVE_SHARD_SIZE)
+    return TableArchive()
+
+
+backend = _build_backend()
@@ -0,0 +1,242 @@
+"""Асинхронне надсилання листів через пул SMTP-з'єднань (aiosmtplib).
+
+Налаштування SMTP_* читаються один раз під час імпорту. ``transport`` тримає до
+SMTP_POOL_SIZE з'єднань (STARTTLS і логін — один раз на з'єднання) і стільки ж
+листів надсилає одночасно. Перед повторним використанням з'єднання перевіряється:
+старше SMTP_CONNECTION_MAX_AGE_SECONDS або після SMTP_CONNECTION_MAX_MESSAGES
+листів воно закривається, а таке, що простоювало довше SMTP_IDLE_CHECK_SECONDS,
+спершу відповідає на NOOP.
+
+Тимчасові збої (відповіді 4xx, обрив з'єднання, тайм-аут) повторюються до
+SMTP_RETRY_ATTEMPTS спроб з експоненційною затримкою від SMTP_RETRY_BASE_MS до
+SMTP_RETRY_MAX_MS і випадковим розкидом (full jitter), щоб воркери не
+повторювали синхронно. Відмову 5xx на відправника, одержувача чи вміст листа
+не повторюють: ``send_many`` повертає її як постійну, а виклик записує лист у
+mail_dead_letters (див. crud.add_mail_dead_letters).
+
+Пул належить циклу подій, на якому його вперше використали (у воркері Celery —
+цикл app/worker_runtime.py, який і закриває пул). Якщо виклик прийшов з іншого
+циклу, старі з'єднання відкидаються й пул наповнюється заново.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage
+
+import aiosmtplib
+
+from . import metrics
+from .config import bool_env, int_env
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int_env("SMTP_PORT", 587)
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USER or "no-reply@localhost"
+SMTP_USE_TLS = bool_env("SMTP_USE_TLS", True)
+SMTP_TIMEOUT_SECONDS = int_env("SMTP_TIMEOUT_SECONDS", 30)
+SMTP_POOL_SIZE = int_env("SMTP_POOL_SIZE", 4)
+SMTP_CONNECTION_MAX_AGE_SECONDS = int_env("SMTP_CONNECTION_MAX_AGE_SECONDS", 300)
+SMTP_CONNECTION_MAX_MESSAGES = int_env("SMTP_CONNECTION_MAX_MESSAGES", 100)
+SMTP_IDLE_CHECK_SECONDS = int_env("SMTP_IDLE_CHECK_SECONDS", 30)
+SMTP_RETRY_ATTEMPTS = int_env("SMTP_RETRY_ATTEMPTS", 4)
+SMTP_RETRY_BASE_MS = int_env("SMTP_RETRY_BASE_MS", 500)
+SMTP_RETRY_MAX_MS = int_env("SMTP_RETRY_MAX_MS", 30_000)
+
+# Відмови, що стосуються саме цього листа; з'єднання після них лишається придатним.
+_MESSAGE_ERRORS = (
+    aiosmtplib.SMTPRecipientsRefused,
+    aiosmtplib.SMTPSenderRefused,
+    aiosmtplib.SMTPDataError,
+)
+
+
+@dataclass(frozen=True)
+class Email:
+    recipient: str
+    subject: str
+    body: str
+
+
+@dataclass
+class Delivery:
+    """Результат надсилання одного листа з ``send_many``."""
+
+    email: Email
+    attempts: int
+    error: Exception | None = None
+    permanent: bool = False
+
+    @property
+    def sent(self) -> bool:
+        return self.error is None
+
+    @property
+    def code(self) -> int | None:
+        return _response_code(self.error) if self.error is not None else None
+
+
+def _response_code(error: Exception) -> int | None:
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return max((refused.code for refused in error.recipients), default=None)
+    return getattr(error, "code", None)
+
+
+def _is_permanent(error: Exception) -> bool:
+    code = _response_code(error)
+    return isinstance(error, _MESSAGE_ERRORS) and code is not None and 500 <= code < 600
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """Затримка перед спробою ``attempt + 1``: full jitter над експонентою."""
+    ceiling = min(SMTP_RETRY_MAX_MS, SMTP_RETRY_BASE_MS * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling) / 1000
+
+
+def _build_message(email: Email) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = email.subject
+    message["From"] = SMTP_FROM
+    message["To"] = email.recipient
+    message.set_content(email.body)
+    return message
+
+
+class _Connection:
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.created_at = self.last_used = time.monotonic()
+        self.messages = 0
+
+    def expired(self, now: float) -> bool:
+        return (
+            not self.client.is_connected
+            or now - self.created_at >= SMTP_CONNECTION_MAX_AGE_SECONDS
+            or self.messages >= SMTP_CONNECTION_MAX_MESSAGES
+        )
+
+
+class MailTransport:
+    def __init__(self, pool_size: int = SMTP_POOL_SIZE):
+        self.pool_size = pool_size
+        self._idle: list[_Connection] = []
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # З'єднання іншого циклу тут не придатні, а закрити їх можна лише на
+            # тому циклі, який, можливо, вже закрито: лишаємо їх збирачу сміття.
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.pool_size)
+            self._loop = loop
+
+    async def _connect(self) -> _Connection:
+        client = aiosmtplib.SMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            username=SMTP_USER if SMTP_USER and SMTP_PASSWORD else None,
+            password=SMTP_PASSWORD if SMTP_USER and SMTP_PASSWORD else None,
+            start_tls=SMTP_USE_TLS,
+            timeout=SMTP_TIMEOUT_SECONDS,
+        )
+        await client.connect()
+        return _Connection(client)
+
+    async def _discard(self, connection: _Connection):
+        try:
+            await connection.client.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            connection.client.close()
+
+    async def _acquire(self) -> _Connection:
+        while self._idle:
+            connection = self._idle.pop()
+            now = time.monotonic()
+            if connection.expired(now):
+                await self._discard(connection)
+                continue
+            if now - connection.last_used >= SMTP_IDLE_CHECK_SECONDS:
+                try:
+                    await connection.client.noop()
+                except (aiosmtplib.SMTPException, OSError):
+                    connection.client.close()
+                    continue
+            return connection
+        return await self._connect()
+
+    def _release(self, connection: _Connection):
+        connection.last_used = time.monotonic()
+        if len(self._idle) < self.pool_size:
+            self._idle.append(connection)
+        else:
+            connection.client.close()
+
+    async def _attempt(self, message: EmailMessage):
+        connection = await self._acquire()
+        try:
+            await connection.client.send_message(message)
+        except _MESSAGE_ERRORS:
+            # Сервер відхилив лист, але з'єднання живе (aiosmtplib уже надіслав RSET).
+            connection.messages += 1
+            self._release(connection)
+            raise
+        except BaseException:
+            connection.client.close()
+            raise
+        connection.messages += 1
+        self._release(connection)
+
+    async def _deliver(self, email: Email) -> Delivery:
+        message = _build_message(email)
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.perf_counter()
+            async with self._slots:
+                try:
+                    await self._attempt(message)
+                except (aiosmtplib.SMTPException, OSError) as error:
+                    permanent = _is_permanent(error)
+                    final = permanent or attempt >= SMTP_RETRY_ATTEMPTS
+                    outcome = "rejected" if permanent else ("error" if final else "retry")
+                    metrics.observe_smtp_send(outcome, time.perf_counter() - started)
+                    if final:
+                        return Delivery(email, attempt, error, permanent)
+                    logger.warning(
+                        "Тимчасова помилка SMTP для %s (спроба %s з %s): %s",
+                        email.recipient,
+                        attempt,
+                        SMTP_RETRY_ATTEMPTS,
+                        error,
+                    )
+                else:
+                    metrics.observe_smtp_send("sent", time.perf_counter() - started)
+                    return Delivery(email, attempt)
+            await asyncio.sleep(_backoff_seconds(attempt))
+
+    async def send_many(self, emails: list[Email]) -> list[Delivery]:
+        """Надсилає листи паралельно (не більше ``pool_size`` одночасно), результати — в порядку ``emails``."""
+        if not emails:
+            return []
+        self._bind()
+        return list(await asyncio.gather(*(self._deliver(email) for email in emails)))
+
+    async def send(self, email: Email) -> Delivery:
+        return (await self.send_many([email]))[0]
+
+    async def close(self):
+        if self._loop is not asyncio.get_running_loop():
+            return
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection)
+
+
+transport = MailTransport()
@@ -1,80 +1,387 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
 from typing import List, Optional
 
-from . import models, schemas, crud
+from . import cache, events, export, metrics, models, schemas, serialization, crud
 from .database import get_db
+from .etag import etag_matches, if_match_versions, make_etag, not_modified, task_etag
+from .pagination import InvalidCursorError, decode_cursor, encode_cursor
+from .rate_limit import limiter
 
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+app = FastAPI(title="To-Do List API", description="REST API для управління завданнями")
 
-limiter = Limiter(key_func=get_remote_address)
+app.add_middleware(metrics.MetricsMiddleware)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+SEARCH_TRUNCATED_HEADER = "X-Search-Truncated"
+
+
+def _parse_fields(fields: Optional[str], schema) -> tuple[str, ...]:
+    try:
+        return serialization.parse_fields(fields, schema)
+    except serialization.UnknownFieldsError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-app = FastAPI(title="To-Do List API", description="REST API для управління завданнями")
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+def _parse_cursor(after: Optional[str], value_type=datetime):
+    if after is None:
+        return None
+    try:
+        return decode_cursor(after, value_type, int)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-@app.post("/tasks/", response_model=schemas.TaskResponse, status_code=201)
-@limiter.limit("5/minute")  
-async def create_task(request: Request, task: schemas.TaskCreate, db: AsyncSession = Depends(get_db)):
+
+@app.post(
+    "/tasks/",
+    response_model=schemas.TaskResponse,
+    status_code=201,
+    dependencies=[Depends(limiter.limit("create_task", "5/minute"))],
+)
+async def create_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_db)):
     """Створення нового завдання."""
     return await crud.create_task(db=db, task=task)
 
+@app.post(
+    "/tasks/bulk",
+    response_model=List[schemas.TaskBulkResult],
+    status_code=201,
+    dependencies=[Depends(limiter.limit("create_tasks_bulk", "10/minute"))],
+)
+async def create_tasks_bulk(payload: schemas.TaskBulkCreate, db: AsyncSession = Depends(get_db)):
+    """Пакетне створення завдань однією транзакцією."""
+    tasks = await crud.create_tasks_bulk(db=db, tasks=payload.items)
+    return [
+        schemas.TaskBulkResult(index=index, id=task.id, result="created", task=task)
+        for index, task in enumerate(tasks)
+    ]
+
+
+@app.patch(
+    "/tasks/bulk",
+    response_model=List[schemas.TaskBulkResult],
+    dependencies=[Depends(limiter.limit("update_tasks_bulk", "10/minute"))],
+)
+async def update_tasks_bulk(payload: schemas.TaskBulkUpdate, db: AsyncSession = Depends(get_db)):
+    """Пакетне оновлення завдань однією транзакцією."""
+    outcomes = await crud.update_tasks_bulk(db=db, items=payload.items)
+
+    results = []
+    for index, (task_id, task, changed_fields) in enumerate(outcomes):
+        if task is None:
+            results.append(schemas.TaskBulkResult(index=index, id=task_id, result="not_found"))
+            continue
+        results.append(
+            schemas.TaskBulkResult(
+                index=index,
+                id=task_id,
+                result="updated" if changed_fields else "unchanged",
+                task=task,
+            )
+        )
+    return results
+
+
+@app.delete(
+    "/tasks/bulk",
+    response_model=List[schemas.TaskBulkResult],
+    dependencies=[Depends(limiter.limit("delete_tasks_bulk", "10/minute"))],
+)
+async def delete_tasks_bulk(payload: schemas.TaskBulkDelete, db: AsyncSession = Depends(get_db)):
+    """Пакетне видалення завдань однією транзакцією."""
+    deleted_ids = await crud.delete_tasks_bulk(db=db, task_ids=payload.ids)
+    return [
+        schemas.TaskBulkResult(
+            index=index,
+            id=task_id,
+            result="deleted" if task_id in deleted_ids else "not_found",
+        )
+        for index, task_id in enumerate(payload.ids)
+    ]
+
+
+@app.get("/tasks/export")
+async def export_tasks(
+    format: export.ExportFormat = Query("ndjson", description="Формат: ndjson або csv"),
+    status: Optional[models.TaskStatus] = Query(None, description="Фільтр за статусом"),
+    due_from: Optional[datetime] = Query(None, description="Дедлайн не раніше (включно)"),
+    due_to: Optional[datetime] = Query(None, description="Дедлайн раніше ніж (не включно)"),
+):
+    """Потокове вивантаження всіх завдань за фільтрами в NDJSON або CSV."""
+    return export.streaming_response(
+        lambda db: crud.stream_tasks(
+            db=db,
+            status=status,
+            due_from=due_from,
+            due_to=due_to,
+            yield_per=export.EXPORT_YIELD_PER,
+        ),
+        schemas.TaskResponse,
+        format,
+        "tasks",
+    )
+
+
+@app.get("/tasks/search", response_model=List[schemas.TaskResponse])
+async def search_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Слова для пошуку в назві та описі"),
+    limit: int = Query(20, ge=1, le=100, description="Кількість записів на сторінку"),
+    status: Optional[models.TaskStatus] = Query(None, description="Фільтр за статусом"),
+    after: Optional[str] = Query(None, description="Курсор наступної сторінки із заголовка X-Next-Cursor"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Повнотекстовий пошук завдань, від релевантніших до менш релевантних."""
+    cursor = None
+    if after is not None:
+        try:
+            cursor = decode_cursor(after, float, int)
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    results = await crud.search_tasks(db=db, q=q, limit=limit, status=status, after=cursor)
+    if results and len(results) == limit:
+        task, score = results[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(score, task.id)
+    elif await crud.search_truncated(db=db, q=q, status=status):
+        # Остання сторінка серед кандидатів, але збігів більше (search.SEARCH_MAX_CANDIDATES).
+        response.headers[SEARCH_TRUNCATED_HEADER] = "true"
+    return [task for task, _ in results]
+
+
+@app.get("/tasks/stats", response_model=schemas.TaskStats)
+async def read_task_stats(
+    days: int = Query(30, ge=1, le=366, description="За скільки останніх днів показати виконані завдання"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Кількість завдань за статусами, прострочених і виконаних по днях.
+
+    Читається з лічильників, які оновлюються разом із завданнями, тож час
+    відповіді не залежить від кількості завдань.
+    """
+    return await crud.get_task_stats(db=db, days=days)
+
+
+@app.get("/tasks/stream")
+async def stream_task_events(
+    after: Optional[int] = Query(None, ge=0, description="ID останньої отриманої події"),
+    task_id: Optional[int] = Query(None, description="Лише події одного завдання"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Зміни завдань у реальному часі через Server-Sent Events.
+
+    Подія — запис історії у форматі GET /tasks/{task_id}/history, її ``id`` —
+    ID запису, тож EventSource після обриву сам продовжить із Last-Event-ID.
+    Без ``after`` надходять лише нові події.
+    """
+    if after is None and last_event_id is not None:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Некоректний Last-Event-ID")
+    return events.sse_response(after, task_id)
+
+
+@app.websocket("/tasks/ws")
+async def task_events_websocket(
+    websocket: WebSocket,
+    after: Optional[int] = Query(None, ge=0),
+    task_id: Optional[int] = Query(None),
+):
+    """Ті самі події, що й GET /tasks/stream, JSON-повідомленнями через WebSocket."""
+    await websocket.accept()
+    await events.serve_websocket(websocket, after, task_id)
+
+
 @app.get("/tasks/", response_model=List[schemas.TaskResponse])
 async def read_tasks(
+    request: Request,
     skip: int = Query(0, description="Пропустити N записів"),
     limit: int = Query(10, description="Кількість записів на сторінку"),
     status: Optional[models.TaskStatus] = Query(None, description="Фільтр за статусом: pending або completed"),
+    due_from: Optional[datetime] = Query(None, description="Дедлайн не раніше (включно)"),
+    due_to: Optional[datetime] = Query(None, description="Дедлайн раніше ніж (не включно)"),
+    created_from: Optional[datetime] = Query(None, description="Створене не раніше (включно)"),
+    created_to: Optional[datetime] = Query(None, description="Створене раніше ніж (не включно)"),
+    overdue: Optional[bool] = Query(None, description="true — лише прострочені невиконані, false — решта"),
+    has_email: Optional[bool] = Query(None, description="Наявність email для сповіщень"),
+    sort: schemas.TaskSort = Query("created_at", description="created_at, due_date; «-» — за спаданням"),
+    after: Optional[str] = Query(None, description="Курсор наступної сторінки із заголовка X-Next-Cursor"),
+    fields: Optional[str] = Query(None, description="Поля відповіді через кому, напр. id,title,status"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Отримання списку завдань із пагінацією та фільтром статусу."""
-    return await crud.get_tasks(db=db, skip=skip, limit=limit, status=status)
+    """Отримання списку завдань із пагінацією, фільтрами та сортуванням."""
+    sort_field = sort.lstrip("-")
+    cursor = _parse_cursor(after, (datetime, type(None)) if sort_field == "due_date" else datetime)
+    selected = _parse_fields(fields, schemas.TaskResponse)
+    now = None
+    if overdue is not None:
+        # Прострочення змінюється з часом без жодного запису, тож поточна хвилина
+        # входить в ETag і ключ кешу.
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    filters = {
+        "status": status,
+        "due_from": due_from,
+        "due_to": due_to,
+        "created_from": created_from,
+        "created_to": created_to,
+        "overdue": overdue,
+        "has_email": has_email,
+        "now": now,
+    }
+
+    latest_history_id = await crud.get_latest_history_id(db=db)
+    etag = make_etag("tasks", latest_history_id, skip, limit, sort, after, selected, *filters.values())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    async def load_page():
+        columns = dict.fromkeys((*selected, "id", sort_field))
+        tasks = await crud.get_tasks(
+            db=db, skip=skip, limit=limit, after=cursor, sort=sort, columns=columns, **filters
+        )
+        next_cursor = None
+        if tasks and len(tasks) == limit:
+            next_cursor = encode_cursor(getattr(tasks[-1], sort_field), tasks[-1].id)
+        # Кешується готовий JSON: влучання в кеш не серіалізує сторінку заново.
+        return {"body": serialization.dump_rows(tasks, selected).decode(), "next_cursor": next_cursor}
+
+    key = cache.tasks_list_key(
+        latest_history_id, skip=skip, limit=limit, sort=sort, after=after, fields=",".join(selected), **filters
+    )
+    page = await cache.get_or_load(key, load_page)
+    headers = {"ETag": etag}
+    if page["next_cursor"]:
+        headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return serialization.json_response(page["body"], headers)
 
 @app.get("/tasks/{task_id}", response_model=schemas.TaskResponse)
-async def read_task(task_id: int, db: AsyncSession = Depends(get_db)):
+async def read_task(task_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Отримання конкретного завдання за ID."""
-    task = await crud.get_task(db=db, task_id=task_id)
-    if task is None:
+    version = await crud.get_task_version(db=db, task_id=task_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Завдання не знайдено")
+    etag = task_etag(task_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    async def load_task():
+        task = await crud.get_task(db=db, task_id=task_id)
+        if task is None:
+            return None
+        return {"version": task.version, "task": schemas.TaskResponse.model_validate(task).model_dump(mode="json")}
+
+    # Читання, що перетнулося із записом, могло покласти в кеш старе тіло вже
+    # після скидання ключа, тож версію запису кешу звіряємо з ETag.
+    entry = await cache.get_or_load(
+        cache.task_key(task_id), load_task, valid=lambda entry: entry.get("version") == version
+    )
+    if entry is None:
         raise HTTPException(status_code=404, detail="Завдання не знайдено")
-    return task
+    if entry["version"] != version:
+        # Завдання змінили між двома читаннями: ETag має описувати саме це тіло.
+        response.headers["ETag"] = task_etag(task_id, entry["version"])
+    return entry["task"]
 
 
 @app.get("/tasks/{task_id}/history", response_model=List[schemas.TaskHistoryResponse])
 async def read_task_history(
     task_id: int,
+    request: Request,
     skip: int = Query(0, ge=0, description="Пропустити N записів історії"),
     limit: int = Query(50, ge=1, le=200, description="Кількість записів історії"),
     event_type: Optional[models.TaskEventType] = Query(None, description="Фільтр за типом події"),
+    after: Optional[str] = Query(None, description="Курсор наступної сторінки із заголовка X-Next-Cursor"),
+    fields: Optional[str] = Query(None, description="Поля відповіді через кому, напр. id,event_type,changed_at"),
     db: AsyncSession = Depends(get_db),
 ):
+    cursor = _parse_cursor(after)
+    selected = _parse_fields(fields, schemas.TaskHistoryResponse)
+    latest_history_id = await crud.get_latest_history_id(db=db, task_id=task_id)
+    etag = make_etag("history", task_id, latest_history_id, skip, limit, event_type, after, selected)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     history = await crud.get_task_history(
         db=db,
         task_id=task_id,
         skip=skip,
         limit=limit,
         event_type=event_type,
+        after=cursor,
+    )
+    headers = {"ETag": etag}
+    if history and len(history) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(history[-1].changed_at, history[-1].id)
+    return serialization.json_response(serialization.dump_rows(history, selected), headers)
+
+
+@app.get("/tasks/{task_id}/history/export")
+async def export_task_history(
+    task_id: int,
+    format: export.ExportFormat = Query("ndjson", description="Формат: ndjson або csv"),
+    event_type: Optional[models.TaskEventType] = Query(None, description="Фільтр за типом події"),
+):
+    """Потокове вивантаження всієї історії завдання від старших записів до новіших."""
+    return export.streaming_response(
+        lambda db: crud.stream_task_history(
+            db=db,
+            task_id=task_id,
+            event_type=event_type,
+            yield_per=export.EXPORT_YIELD_PER,
+        ),
+        schemas.TaskHistoryResponse,
+        format,
+        f"task-{task_id}-history",
     )
+
+
+@app.get("/tasks/{task_id}/history/archive", response_model=List[schemas.TaskHistoryResponse])
+async def read_archived_task_history(
+    task_id: int,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Пропустити N записів архіву"),
+    limit: int = Query(50, ge=1, le=200, description="Кількість записів архіву"),
+    after: Optional[str] = Query(None, description="Курсор наступної сторінки із заголовка X-Next-Cursor"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Історія завдання, перенесена в архів задачею archive_task_history."""
+    cursor = _parse_cursor(after)
+    history = await crud.get_archived_task_history(db=db, task_id=task_id, skip=skip, limit=limit, after=cursor)
+    if history and len(history) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(history[-1].changed_at, history[-1].id)
     return history
 
 @app.patch("/tasks/{task_id}", response_model=schemas.TaskResponse)
-async def update_task(task_id: int, task: schemas.TaskUpdate, db: AsyncSession = Depends(get_db)):
-    """Оновлення завдання."""
-    existing_task = await crud.get_task(db=db, task_id=task_id)
-    if existing_task is None:
-        raise HTTPException(status_code=404, detail="Завдання не знайдено")
+async def update_task(
+    task_id: int,
+    task: schemas.TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag завдання з GET: зміна лише якщо його ніхто не змінив"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Оновлення завдання; сповіщення про виконання ставиться в outbox тією ж транзакцією.
 
-    status_before = existing_task.status
-    updated_task = await crud.update_task(db=db, task_id=task_id, task_update=task)
+    Якщо з If-Match завдання вже змінили, повертається 409 з актуальним ETag.
+    """
+    try:
+        updated_task = await crud.update_task(
+            db=db,
+            task_id=task_id,
+            task_update=task,
+            expected_versions=if_match_versions(if_match, task_id),
+        )
+    except crud.VersionConflictError as exc:
+        raise HTTPException(
+            status_code=409,
+            detail="Завдання вже змінено, отримайте актуальну версію",
+            headers={"ETag": task_etag(task_id, exc.version)},
+        )
     if updated_task is None:
         raise HTTPException(status_code=404, detail="Завдання не знайдено")
-
-    if status_before != models.TaskStatus.COMPLETED and updated_task.status == models.TaskStatus.COMPLETED:
-        from .celery_app import send_task_completed_email
-
-        send_task_completed_email.delay(updated_task.id)
-
+    response.headers["ETag"] = task_etag(updated_task.id, updated_task.version)
     return updated_task
 
 @app.delete("/tasks/{task_id}", status_code=204)
@@ -82,4 +389,16 @@ async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """Видалення завдання."""
     success = await crud.delete_task(db=db, task_id=task_id)
     if not success:
-        raise HTTPException(status_code=404, detail="Завдання не знайдено")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="Завдання не знайдено")
+
+
+@app.get("/cache/stats")
+async def read_cache_stats():
+    """Лічильники влучань, промахів і витіснень кешу."""
+    return await cache.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Метрики у форматі Prometheus."""
+    return metrics.metrics_response()
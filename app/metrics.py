@@ -0,0 +1,232 @@
+"""Метрики Prometheus для API і воркерів Celery, ендпоінт GET /metrics.
+
+* ``MetricsMiddleware`` — гістограма тривалості HTTP-запитів за шаблоном
+  маршруту (``/tasks/{task_id}``, а не конкретний ID), методом і статусом, а
+  також кількість запитів до БД і час у БД на один HTTP-запит.
+* Обробники подій SQLAlchemy на ``engine`` і ``read_engine`` — тривалість
+  кожного запиту до БД; запити довші за SLOW_QUERY_MS пишуться в журнал.
+  Записи через sqlite_writer (SQLITE_CONCURRENT_MODE) виконуються в задачі
+  записувача, тож враховуються в загальних метриках БД, але не в метриках
+  HTTP-запиту, який їх поставив у чергу.
+* ``observe_task`` / ``observe_smtp_send`` — тривалість задач Celery і
+  надсилання листів; викликаються з app/celery_app.py.
+* Пул з'єднань і кеш зчитуються в момент збирання метрик, без накладних
+  витрат на запит.
+
+Воркери uvicorn і Celery — окремі процеси. Щоб GET /metrics показував їх
+разом, усім процесам задається спільний каталог PROMETHEUS_MULTIPROC_DIR
+(режим multiprocess бібліотеки prometheus_client); пул і кеш у такому разі
+показуються для процесу, що відповів на запит. SERVER_TIMING=1 додає до
+відповідей заголовок Server-Timing із часом у БД і загальним часом обробки.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from starlette.responses import Response
+
+from . import cache
+from .config import bool_env, int_env
+from .database import engine, read_engine
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = bool_env("METRICS_ENABLED", True)
+SERVER_TIMING = bool_env("SERVER_TIMING", False)
+SLOW_QUERY_MS = int_env("SLOW_QUERY_MS", 500)
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Маршрут не знайдено (404): не плодимо окрему серію на кожен довільний шлях.
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Тривалість обробки HTTP-запиту",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Кількість запитів до БД на один HTTP-запит",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 25, 50, 100),
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Сумарний час запитів до БД на один HTTP-запит",
+    ["method", "route"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Тривалість одного запиту до БД",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries",
+    "Запити до БД, довші за SLOW_QUERY_MS",
+    ["engine"],
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Тривалість виконання задачі Celery",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+SMTP_SEND_DURATION = Histogram(
+    "smtp_send_duration_seconds",
+    "Тривалість однієї спроби надсилання листа, разом із підключенням до SMTP",
+    ["outcome"],
+)
+
+
+@dataclass
+class RequestTiming:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+_request_timing: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def _instrument_engine(instrumented_engine, name: str):
+    sync_engine = instrumented_engine.sync_engine
+    duration = DB_QUERY_DURATION.labels(name)
+    slow = DB_SLOW_QUERIES.labels(name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_started")
+        duration.observe(elapsed)
+        timing = _request_timing.get()
+        if timing is not None:
+            timing.queries += 1
+            timing.db_seconds += elapsed
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            slow.inc()
+            logger.warning("Повільний запит до БД (%s, %.1f мс): %s", name, elapsed * 1000, statement)
+
+
+class _StateCollector:
+    """Пул з'єднань і кеш цього процесу на момент збирання метрик."""
+
+    def collect(self):
+        pool_metrics = {
+            "size": GaugeMetricFamily("db_pool_size", "Розмір пулу з'єднань", labels=["engine"]),
+            "checkedout": GaugeMetricFamily("db_pool_checked_out", "З'єднання, видані з пулу", labels=["engine"]),
+            "checkedin": GaugeMetricFamily("db_pool_checked_in", "Вільні з'єднання в пулі", labels=["engine"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "З'єднання понад розмір пулу", labels=["engine"]),
+        }
+        for name, pool_engine in _engines():
+            pool = pool_engine.sync_engine.pool
+            if isinstance(pool, QueuePool):
+                for method, metric in pool_metrics.items():
+                    # overflow() від'ємний, доки пул не заповнено до pool_size.
+                    metric.add_metric([name], max(0, getattr(pool, method)()))
+        yield from pool_metrics.values()
+
+        backend = cache.backend
+        labels = ["backend"]
+        for metric_name, documentation, value in (
+            ("cache_hits", "Влучання в кеш", backend.hits),
+            ("cache_misses", "Промахи кешу", backend.misses),
+            ("cache_evictions", "Витіснення з кешу", backend.evictions),
+        ):
+            metric = CounterMetricFamily(metric_name, documentation, labels=labels)
+            metric.add_metric([cache.CACHE_BACKEND], value)
+            yield metric
+        entries = getattr(backend, "entries", None)
+        if entries is not None:
+            metric = GaugeMetricFamily("cache_entries", "Записи в кеші процесу", labels=labels)
+            metric.add_metric([cache.CACHE_BACKEND], entries)
+            yield metric
+
+
+def _engines():
+    if read_engine is engine:
+        return [("primary", engine)]
+    return [("primary", engine), ("read", read_engine)]
+
+
+def _build_registry() -> CollectorRegistry:
+    state = _StateCollector()
+    if not MULTIPROC_DIR:
+        REGISTRY.register(state)
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    registry.register(state)
+    return registry
+
+
+if METRICS_ENABLED:
+    for _name, _engine in _engines():
+        _instrument_engine(_engine, _name)
+    _registry = _build_registry()
+
+
+def metrics_response() -> Response:
+    if not METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(generate_latest(_registry), media_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """Чистий ASGI-middleware: не буферизує тіло відповіді, тож не заважає SSE."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timing = RequestTiming()
+        token = _request_timing.set(timing)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    header = (
+                        f'db;dur={timing.db_seconds * 1000:.2f};desc="{timing.queries} queries", '
+                        f"app;dur={elapsed_ms:.2f}"
+                    )
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timing.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, route_path, str(status)).observe(time.perf_counter() - started)
+            HTTP_REQUEST_DB_QUERIES.labels(method, route_path).observe(timing.queries)
+            HTTP_REQUEST_DB_SECONDS.labels(method, route_path).observe(timing.db_seconds)
+
+
+def observe_task(task_name: str, state: str, seconds: float):
+    if METRICS_ENABLED:
+        CELERY_TASK_DURATION.labels(task_name, state).observe(seconds)
+
+
+def observe_smtp_send(outcome: str, seconds: float):
+    if METRICS_ENABLED:
+        SMTP_SEND_DURATION.labels(outcome).observe(seconds)
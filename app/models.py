@@ -1,8 +1,30 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, JSON
+from sqlalchemy import DDL, Boolean, and_, Column, Date, Integer, String, DateTime, Enum, JSON, Index, LargeBinary, event, true
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime, timezone
 import enum
 from .database import Base
 
+
+class UTCDateTime(TypeDecorator):
+    """Дата й час у UTC: timestamptz у PostgreSQL, наївний UTC-час у SQLite.
+
+    Наївні значення вважаються UTC, значення з іншим поясом переводяться в UTC.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        value = value.astimezone(timezone.utc)
+        if dialect.name == "sqlite":
+            value = value.replace(tzinfo=None)
+        return value
+
+
 class TaskStatus(str, enum.Enum):
     PENDING = "pending"
     COMPLETED = "completed"
@@ -16,6 +38,43 @@ class TaskEventType(str, enum.Enum):
     NOTIFIED_COMPLETED = "notified_completed"
     NOTIFIED_OVERDUE = "notified_overdue"
 
+
+class OutboxKind(str, enum.Enum):
+    TASK_COMPLETED = "task_completed"
+
+# Повнотекстовий пошук (app/search.py) спирається на структури поза моделлю Task.
+# У PostgreSQL це збережений згенерований стовпець search_vector з GIN-індексом:
+# конфігурація 'simple' лише переводить слова в нижній регістр (стемера для
+# української немає), назва має вагу 'A', опис — 'B'.
+TASK_SEARCH_POSTGRESQL_DDL = (
+    "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+)
+
+# У SQLite — FTS5-таблиця із зовнішнім вмістом (content='tasks'), яку синхронізують
+# тригери. remove_diacritics 0 зберігає «й» і «ї» окремими літерами, префіксні
+# індекси прискорюють пошук за початком слова.
+TASK_SEARCH_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 0', prefix='2 3 4')",
+    "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+)
+
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -23,11 +82,48 @@ class Task(Base):
     title = Column(String, index=True, nullable=False)
     description = Column(String, nullable=True)
     status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, index=True)
-    due_date = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    due_date = Column(UTCDateTime, nullable=True)
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
     notification_email = Column(String, nullable=True)
-    completed_notified_at = Column(DateTime, nullable=True)
-    overdue_notified_at = Column(DateTime, nullable=True)
+    completed_notified_at = Column(UTCDateTime, nullable=True)
+    overdue_notified_at = Column(UTCDateTime, nullable=True)
+    overdue_claim_token = Column(String, nullable=True, index=True)
+    overdue_claim_expires_at = Column(UTCDateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Коли завдання востаннє перевели в completed; для статистики, див. app/stats.py.
+    completed_at = Column(UTCDateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_tasks_due_date_id", "due_date", "id"),
+        Index("ix_tasks_status_due_date_id", "status", "due_date", "id"),
+        # Частковий індекс для фільтра has_email=true: завдань з email зазвичай меншість.
+        Index(
+            "ix_tasks_with_email_created_at_id",
+            "created_at",
+            "id",
+            sqlite_where=notification_email.is_not(None),
+            postgresql_where=notification_email.is_not(None),
+        ),
+        # Кандидати на сповіщення про прострочення (crud._due_for_overdue_notification)
+        # у порядку id, як їх обходить задача; умова без параметрів, тож SQLite
+        # застосовує індекс і до запиту з прив'язаним статусом.
+        Index(
+            "ix_tasks_overdue_notification",
+            "status",
+            "id",
+            "due_date",
+            sqlite_where=and_(notification_email.is_not(None), overdue_notified_at.is_(None)),
+            postgresql_where=and_(notification_email.is_not(None), overdue_notified_at.is_(None)),
+        ),
+    )
+
+
+for statement in TASK_SEARCH_POSTGRESQL_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in TASK_SEARCH_SQLITE_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
 
 
 class TaskHistory(Base):
@@ -36,7 +132,91 @@ class TaskHistory(Base):
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, index=True, nullable=False)
     event_type = Column(Enum(TaskEventType), nullable=False, index=True)
-    changed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    changed_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     before_data = Column(JSON, nullable=True)
     after_data = Column(JSON, nullable=True)
-    changed_fields = Column(JSON, nullable=True)
\ No newline at end of file
+    changed_fields = Column(JSON, nullable=True)
+    # Дельта чи повний знімок, див. app/history.py.
+    is_checkpoint = Column(Boolean, nullable=False, default=True, server_default=true())
+    compressed_snapshot = Column(LargeBinary, nullable=True)
+
+    __table_args__ = (
+        Index("ix_task_history_task_id_changed_at_id", "task_id", "changed_at", "id"),
+        Index("ix_task_history_task_id_is_checkpoint_id", "task_id", "is_checkpoint", "id"),
+    )
+
+
+class TaskHistoryArchive(Base):
+    """Записи історії, перенесені завданням archive_task_history, з повними знімками."""
+
+    __tablename__ = "task_history_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    task_id = Column(Integer, nullable=False)
+    event_type = Column(Enum(TaskEventType), nullable=False)
+    changed_at = Column(UTCDateTime, nullable=False)
+    before_data = Column(JSON, nullable=True)
+    after_data = Column(JSON, nullable=True)
+    changed_fields = Column(JSON, nullable=True)
+    archived_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        Index("ix_task_history_archive_task_id_changed_at_id", "task_id", "changed_at", "id"),
+    )
+
+
+class TaskStatusCount(Base):
+    """Кількість завдань у статусі; оновлюється разом із завданнями, див. app/stats.py."""
+
+    __tablename__ = "task_status_counts"
+
+    status = Column(Enum(TaskStatus), primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class TaskDailyCount(Base):
+    """Денні лічильники (UTC): виконані того дня завдання й невиконані з дедлайном на цей день."""
+
+    __tablename__ = "task_daily_counts"
+
+    day = Column(Date, primary_key=True)
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+    due_pending = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class OutboxMessage(Base):
+    """Повідомлення для Celery, записане в транзакції зміни завдання, див. app/outbox.py."""
+
+    __tablename__ = "outbox_messages"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(Enum(OutboxKind), nullable=False)
+    task_id = Column(Integer, nullable=False)
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    claim_token = Column(String, nullable=True, index=True)
+    claim_expires_at = Column(UTCDateTime, nullable=True)
+    # Повідомлення з однаковим ключем резервуються разом (напр. email одержувача дайджесту).
+    group_key = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_messages_kind_group_key", "kind", "group_key"),
+    )
+
+
+class MailDeadLetter(Base):
+    """Лист, який SMTP-сервер остаточно відхилив (5xx), див. app/mail.py."""
+
+    __tablename__ = "mail_dead_letters"
+
+    id = Column(Integer, primary_key=True)
+    # Вид сповіщення: task_completed, task_overdue тощо.
+    kind = Column(String, nullable=False)
+    # Завдання, про які був лист (дайджест охоплює кілька).
+    task_ids = Column(JSON, nullable=False)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    smtp_code = Column(Integer, nullable=True)
+    error = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
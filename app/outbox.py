@@ -0,0 +1,164 @@
+"""Transactional outbox: повідомлення для Celery, записані разом зі зміною завдання.
+
+Запит не звертається до брокера. crud додає рядок outbox_messages у тій самій
+транзакції, що й зміну (напр. перехід у completed), тож повідомлення з'являється
+тоді й лише тоді, коли зміну зафіксовано. Задача beat relay_outbox
+(app/celery_app.py) кожні OUTBOX_RELAY_INTERVAL_SECONDS резервує пакети по
+OUTBOX_RELAY_BATCH_SIZE рядків під новий токен і ставить у чергу одну задачу
+Celery на пакет.
+
+Доставка рівно один раз тримається на токені: задача-споживач спершу забирає
+пакет, атомарно замінюючи токен із повідомлення на свій (``take``). Повторна
+доставка того самого повідомлення чи прострочений резерв, який relay уже
+віддав заново, нічого не забирають. Рядки видаляються в одній транзакції з
+позначкою про надсилання. Необроблені рядки (помилка SMTP, падіння воркера)
+після OUTBOX_CLAIM_LEASE_SECONDS резервуються знову.
+
+Повідомлення можна групувати за ``group_key`` (для дайджестів — email
+одержувача): ``claim_groups`` резервує групи лише цілими і лише після того, як
+у групі якийсь час не з'являлося нових повідомлень.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import int_env
+
+OUTBOX_RELAY_INTERVAL_SECONDS = int_env("OUTBOX_RELAY_INTERVAL_SECONDS", 5)
+OUTBOX_RELAY_BATCH_SIZE = int_env("OUTBOX_RELAY_BATCH_SIZE", 200)
+OUTBOX_RELAY_MAX_BATCHES = int_env("OUTBOX_RELAY_MAX_BATCHES", 50)
+OUTBOX_CLAIM_LEASE_SECONDS = int_env("OUTBOX_CLAIM_LEASE_SECONDS", 300)
+
+
+async def add(session: AsyncSession, kind: models.OutboxKind, messages: list[tuple[int, str | None]]):
+    """Додає повідомлення — пари ``(task_id, group_key)``."""
+    if messages:
+        await session.execute(
+            insert(models.OutboxMessage),
+            [{"kind": kind, "task_id": task_id, "group_key": group_key} for task_id, group_key in messages],
+        )
+
+
+def _claimable(kind: models.OutboxKind, now: datetime) -> tuple:
+    message = models.OutboxMessage
+    return (
+        message.kind == kind,
+        or_(message.claim_token.is_(None), message.claim_expires_at < now),
+    )
+
+
+def _claim_values(token: str, now: datetime) -> dict:
+    return {"claim_token": token, "claim_expires_at": now + timedelta(seconds=OUTBOX_CLAIM_LEASE_SECONDS)}
+
+
+async def claim(session: AsyncSession, kind: models.OutboxKind, limit: int, now: datetime) -> tuple[str, int]:
+    """Резервує до ``limit`` вільних або прострочених рядків; повертає токен і їхню кількість."""
+    message = models.OutboxMessage
+    token = uuid.uuid4().hex
+    claimable = _claimable(kind, now)
+    # Як і в crud.claim_tasks_due_for_overdue_notification: CTE виконується один раз.
+    candidates = (
+        select(message.id)
+        .where(*claimable)
+        .order_by(message.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte("outbox_candidates")
+    )
+    result = await session.execute(
+        update(message)
+        .where(message.id == candidates.c.id, *claimable)
+        .values(**_claim_values(token, now))
+        .returning(message.id)
+        .execution_options(synchronize_session=False)
+    )
+    return token, len(result.all())
+
+
+async def claim_groups(
+    session: AsyncSession,
+    kind: models.OutboxKind,
+    limit: int,
+    now: datetime,
+    settled_before: datetime,
+    due_before: datetime,
+) -> tuple[str, int]:
+    """Резервує цілі групи повідомлень; повертає токен і кількість повідомлень.
+
+    Група готова, коли її найновіше повідомлення створене до ``settled_before``
+    (нових не було протягом вікна) або найстаріше — до ``due_before`` (група
+    не чекає безкінечно, якщо повідомлення надходять постійно). Груп береться
+    стільки, щоб разом було не більше ``limit`` повідомлень, але щонайменше одна.
+    """
+    message = models.OutboxMessage
+    token = uuid.uuid4().hex
+    claimable = _claimable(kind, now)
+    result = await session.execute(
+        select(message.group_key, func.count())
+        .where(*claimable)
+        .group_by(message.group_key)
+        .having(or_(func.max(message.created_at) < settled_before, func.min(message.created_at) < due_before))
+        .order_by(func.min(message.id))
+        .limit(limit)
+    )
+    keys = []
+    total = 0
+    for group_key, count in result:
+        if keys and total + count > limit:
+            break
+        keys.append(group_key)
+        total += count
+    if not keys:
+        return token, 0
+
+    in_groups = message.group_key.in_([key for key in keys if key is not None])
+    if None in keys:
+        in_groups = or_(in_groups, message.group_key.is_(None))
+    result = await session.execute(
+        update(message)
+        .where(*claimable, in_groups)
+        .values(**_claim_values(token, now))
+        .returning(message.id)
+        .execution_options(synchronize_session=False)
+    )
+    return token, len(result.all())
+
+
+async def release(session: AsyncSession, token: str):
+    """Знімає резерв, якщо пакет так і не вдалося поставити в чергу."""
+    await session.execute(
+        update(models.OutboxMessage)
+        .where(models.OutboxMessage.claim_token == token)
+        .values(claim_token=None, claim_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def take(session: AsyncSession, token: str, now: datetime) -> tuple[str, dict[int, int]]:
+    """Забирає пакет під новий токен; повертає його і ``{id рядка: task_id}``.
+
+    Якщо резерв уже забрано чи він прострочений, пакет порожній.
+    """
+    message = models.OutboxMessage
+    taken = uuid.uuid4().hex
+    result = await session.execute(
+        update(message)
+        .where(message.claim_token == token, message.claim_expires_at >= now)
+        .values(claim_token=taken, claim_expires_at=now + timedelta(seconds=OUTBOX_CLAIM_LEASE_SECONDS))
+        .returning(message.id, message.task_id)
+        .execution_options(synchronize_session=False)
+    )
+    return taken, dict(result.all())
+
+
+async def remove(session: AsyncSession, ids: list[int], token: str):
+    """Видаляє оброблені рядки, які все ще утримує ``token``."""
+    if ids:
+        await session.execute(
+            delete(models.OutboxMessage)
+            .where(models.OutboxMessage.id.in_(ids), models.OutboxMessage.claim_token == token)
+            .execution_options(synchronize_session=False)
+        )
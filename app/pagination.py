@@ -0,0 +1,49 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(*values: Any) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, *types: type | tuple[type, ...]) -> tuple[Any, ...]:
+    """Розбір курсора, створеного encode_cursor, з перевіркою типів значень.
+
+    Тип ``(datetime, type(None))`` допускає також ``None`` на цьому місці.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursorError("Некоректний курсор") from exc
+
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise InvalidCursorError("Некоректний курсор")
+
+    values = []
+    for value, expected in zip(payload, types):
+        if isinstance(expected, tuple):
+            if value is None and type(None) in expected:
+                values.append(None)
+                continue
+            expected = expected[0]
+        try:
+            if expected is datetime:
+                value = datetime.fromisoformat(value)
+            elif expected is float and isinstance(value, int):
+                value = float(value)
+            elif not isinstance(value, expected) or isinstance(value, bool):
+                raise TypeError
+        except (TypeError, ValueError) as exc:
+            raise InvalidCursorError("Некоректний курсор") from exc
+        values.append(value)
+    return tuple(values)
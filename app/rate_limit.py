@@ -0,0 +1,197 @@
+"""Обмеження частоти запитів, спільне для всіх процесів API.
+
+Ліміт рахується для пари (маршрут, клієнт). Клієнт — це API-ключ із
+заголовка X-API-Key, якщо ключ є в RATE_LIMIT_API_KEYS, інакше IP-адреса.
+Невідомі ключі ігноруються, інакше новий ключ на кожен запит обходив би ліміт.
+IP береться з X-Forwarded-For лише тоді, коли з'єднання прийшло від довіреного
+проксі (RATE_LIMIT_TRUSTED_PROXIES): адреси читаються справа наліво, і першою
+недовіреною вважається адреса клієнта. Записи лівіше клієнт може підробити.
+
+Ліміт за замовчуванням задається в main.py для кожного маршруту. RATE_LIMITS
+перевизначає його для маршруту або рівня клієнта. Формат:
+``маршрут=ліміт;маршрут:рівень=ліміт;*:рівень=ліміт``, де ліміт — рядок
+бібліотеки limits (``5/minute``) або ``unlimited``. Клієнти за IP мають рівень
+``anonymous``, рівні API-ключів задає RATE_LIMIT_API_KEYS (``ключ=рівень,...``).
+
+RATE_LIMIT_BACKEND=redis зберігає лічильники в Redis, тож ліміт спільний для
+всіх воркерів uvicorn. Перевірка й збільшення лічильника — один атомарний
+Lua-скрипт бібліотеки limits. Стратегію обирає RATE_LIMIT_STRATEGY: типово
+``sliding-window-counter`` (два лічильники на ключ), ще ``moving-window`` і
+``fixed-window``. Коли Redis недоступний, ліміт на RATE_LIMIT_REDIS_RETRY_SECONDS
+рахується в пам'яті процесу, тобто окремо для кожного воркера.
+"""
+import hashlib
+import ipaddress
+import logging
+import math
+import os
+import time
+from typing import Callable
+
+from fastapi import HTTPException, Request
+from limits import RateLimitItem, parse
+from limits.aio.storage import MemoryStorage, RedisStorage
+from limits.aio.strategies import STRATEGIES, RateLimiter as StrategyLimiter
+from limits.errors import StorageError
+
+from .config import REDIS_URL, bool_env, int_env
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = bool_env("RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter")
+RATE_LIMIT_KEY_PREFIX = os.getenv("RATE_LIMIT_KEY_PREFIX", "todo:ratelimit")
+RATE_LIMIT_REDIS_TIMEOUT_MS = int_env("RATE_LIMIT_REDIS_TIMEOUT_MS", 100)
+RATE_LIMIT_REDIS_RETRY_SECONDS = int_env("RATE_LIMIT_REDIS_RETRY_SECONDS", 30)
+RATE_LIMIT_TRUSTED_PROXIES = os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "")
+RATE_LIMIT_API_KEYS = os.getenv("RATE_LIMIT_API_KEYS", "")
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")
+
+API_KEY_HEADER = "X-API-Key"
+ANONYMOUS_TIER = "anonymous"
+UNLIMITED = "unlimited"
+
+
+def _parse_limit(value: str) -> RateLimitItem | None:
+    value = value.strip()
+    return None if value == UNLIMITED else parse(value)
+
+
+def _parse_overrides(value: str) -> dict[tuple[str, str | None], RateLimitItem | None]:
+    """``маршрут[:рівень]=ліміт;...`` -> {(маршрут, рівень або None): ліміт}."""
+    overrides = {}
+    for entry in filter(None, (part.strip() for part in value.split(";"))):
+        target, _, limit = entry.partition("=")
+        route, _, tier = target.strip().partition(":")
+        overrides[(route, tier or None)] = _parse_limit(limit)
+    return overrides
+
+
+def _parse_api_keys(value: str) -> dict[str, str]:
+    keys = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        key, _, tier = entry.partition("=")
+        keys[key.strip()] = tier.strip() or ANONYMOUS_TIER
+    return keys
+
+
+def _parse_networks(value: str) -> list[ipaddress.IPv4Network | ipaddress.IPv6Network]:
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        backend: str,
+        strategy: str,
+        overrides: dict[tuple[str, str | None], RateLimitItem | None],
+        api_keys: dict[str, str],
+        trusted_proxies: list,
+    ):
+        self.enabled = RATE_LIMIT_ENABLED
+        self.overrides = overrides
+        self.api_keys = api_keys
+        self.trusted_proxies = trusted_proxies
+        self._strategy = STRATEGIES[strategy]
+        self._memory = self._strategy(MemoryStorage())
+        self._redis: StrategyLimiter | None = None
+        if backend == "redis":
+            self._redis = self._strategy(
+                RedisStorage(
+                    f"async+{REDIS_URL}",
+                    wrap_exceptions=True,
+                    implementation="redispy",
+                    key_prefix=RATE_LIMIT_KEY_PREFIX,
+                    socket_timeout=RATE_LIMIT_REDIS_TIMEOUT_MS / 1000,
+                    socket_connect_timeout=RATE_LIMIT_REDIS_TIMEOUT_MS / 1000,
+                )
+            )
+        self._redis_retry_at = 0.0
+
+    def _is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_ip(self, request: Request) -> str:
+        peer = request.client.host if request.client else "unknown"
+        if not self._is_trusted(peer):
+            return peer
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        for address in reversed(forwarded):
+            if not self._is_trusted(address):
+                return address
+        return forwarded[0] if forwarded else peer
+
+    def identify(self, request: Request) -> tuple[str, str]:
+        """Ключ лічильника і рівень клієнта."""
+        api_key = request.headers.get(API_KEY_HEADER)
+        tier = self.api_keys.get(api_key) if api_key else None
+        if tier is not None:
+            # Сам ключ у сховище лімітів не потрапляє.
+            return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32], tier
+        return "ip:" + self.client_ip(request), ANONYMOUS_TIER
+
+    def limit_for(self, route: str, tier: str, default: RateLimitItem | None) -> RateLimitItem | None:
+        for target in ((route, tier), ("*", tier), (route, None)):
+            if target in self.overrides:
+                return self.overrides[target]
+        return default
+
+    def _limiter(self) -> StrategyLimiter:
+        if self._redis is not None and time.monotonic() >= self._redis_retry_at:
+            return self._redis
+        return self._memory
+
+    async def hit(self, item: RateLimitItem, *identifiers: str) -> tuple[bool, StrategyLimiter]:
+        limiter = self._limiter()
+        try:
+            return await limiter.hit(item, *identifiers), limiter
+        except StorageError:
+            logger.warning(
+                "Redis недоступний для лімітів запитів, %s с рахуємо в пам'яті процесу",
+                RATE_LIMIT_REDIS_RETRY_SECONDS,
+                exc_info=True,
+            )
+            self._redis_retry_at = time.monotonic() + RATE_LIMIT_REDIS_RETRY_SECONDS
+            return await self._memory.hit(item, *identifiers), self._memory
+
+    async def _retry_after(self, limiter: StrategyLimiter, item: RateLimitItem, *identifiers: str) -> int:
+        try:
+            stats = await limiter.get_window_stats(item, *identifiers)
+        except StorageError:
+            return item.get_expiry()
+        return max(1, math.ceil(stats.reset_time - time.time()))
+
+    def limit(self, route: str, default: str) -> Callable:
+        """Залежність FastAPI, що відхиляє запит із 429, коли ліміт маршруту вичерпано."""
+        default_item = _parse_limit(default)
+
+        async def check_rate_limit(request: Request):
+            if not self.enabled:
+                return
+            key, tier = self.identify(request)
+            item = self.limit_for(route, tier, default_item)
+            if item is None:
+                return
+            allowed, limiter = await self.hit(item, route, key)
+            if not allowed:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Перевищено ліміт запитів: {item}",
+                    headers={"Retry-After": str(await self._retry_after(limiter, item, route, key))},
+                )
+
+        return check_rate_limit
+
+
+limiter = RateLimiter(
+    backend=RATE_LIMIT_BACKEND,
+    strategy=RATE_LIMIT_STRATEGY,
+    overrides=_parse_overrides(RATE_LIMITS),
+    api_keys=_parse_api_keys(RATE_LIMIT_API_KEYS),
+    trusted_proxies=_parse_networks(RATE_LIMIT_TRUSTED_PROXIES),
+)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional, Any, List
+from pydantic import BaseModel, Field, field_validator
+from datetime import date, datetime
+from typing import Optional, Any, List, Literal
 from .models import TaskStatus, TaskEventType
 from pydantic import EmailStr
 
@@ -20,6 +20,18 @@ class TaskUpdate(BaseModel):
     due_date: Optional[datetime] = None
     notification_email: Optional[EmailStr] = None
 
+    @field_validator("title", "status")
+    @classmethod
+    def not_null(cls, value):
+        # Поле можна пропустити, але не очистити: у таблиці воно NOT NULL.
+        if value is None:
+            raise ValueError("Поле не може бути null")
+        return value
+
+# Поле сортування списку завдань; «-» на початку — за спаданням.
+TaskSort = Literal["created_at", "-created_at", "due_date", "-due_date"]
+
+
 class TaskResponse(TaskBase):
     id: int
     status: TaskStatus
@@ -29,6 +41,51 @@ class TaskResponse(TaskBase):
         from_attributes = True
 
 
+BULK_MAX_ITEMS = 1000
+
+
+class TaskBulkCreate(BaseModel):
+    items: List[TaskCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int
+
+
+class TaskBulkUpdate(BaseModel):
+    items: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+    @field_validator("items")
+    @classmethod
+    def ids_must_be_unique(cls, items: List[TaskBulkUpdateItem]):
+        if len({item.id for item in items}) != len(items):
+            raise ValueError("ID завдань у пакеті не повинні повторюватися")
+        return items
+
+
+class TaskBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    result: Literal["created", "updated", "unchanged", "deleted", "not_found"]
+    task: Optional[TaskResponse] = None
+
+
+class TaskDayCompleted(BaseModel):
+    day: date
+    completed: int
+
+
+class TaskStats(BaseModel):
+    total: int
+    by_status: dict[TaskStatus, int]
+    overdue: int = Field(..., description="Невиконані завдання з дедлайном у минулому")
+    completed_per_day: List[TaskDayCompleted] = Field(..., description="Виконані завдання по днях (UTC), від найдавнішого")
+
+
 class TaskHistoryResponse(BaseModel):
     id: int
     task_id: int
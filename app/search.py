@@ -0,0 +1,94 @@
+"""Повнотекстовий пошук завдань за назвою та описом.
+
+У SQLite запит іде до FTS5-таблиці tasks_fts, у PostgreSQL — до стовпця
+search_vector з GIN-індексом (див. models.TASK_SEARCH_*_DDL). Усі слова запиту
+мають бути в документі; останнє шукається як префікс («завдан» знайде
+«завдання» і «завдань»), щоб пошук працював під час набору, якщо в ньому
+хоча б дві літери.
+
+Службові слова (SEARCH_STOPWORDS) та однолітерні слова відкидаються, якщо в
+запиті є інші: вони трапляються майже в кожному завданні й лише сповільнюють
+ранжування.
+
+Оцінка ``score`` менша для релевантніших завдань в обох базах, тож сторінки
+впорядковуються за (score, id) за зростанням. Ранжування потребує оцінки кожного знайденого рядка, і для частих слів це
+сотні тисяч рядків. Тому оцінюються лише SEARCH_MAX_CANDIDATES найновіших
+збігів (за id); якщо збігів менше, порядок точний. 0 вимикає обмеження.
+Фільтр за статусом застосовується ще до обмеження, тож воно не ховає завдань
+потрібного статусу. Курсор сторінки діє всередині того самого набору
+кандидатів, щоб сторінки не перетиналися й не пропускали завдань. Якщо збігів
+більше, ніж кандидатів, остання сторінка позначається заголовком
+X-Search-Truncated (див. ``truncated``).
+
+База PostgreSQL має бути в кодуванні UTF8 з LC_CTYPE, що знає кирилицю (напр.
+C.UTF-8): за SQL_ASCII чи LC_CTYPE=C to_tsvector відкидає кириличні слова.
+"""
+import re
+
+from sqlalchemy import Integer, column, func, literal_column, select, table, text
+
+from . import models
+from .config import int_env
+
+SEARCH_MAX_TERMS = int_env("SEARCH_MAX_TERMS", 8)
+SEARCH_MAX_CANDIDATES = int_env("SEARCH_MAX_CANDIDATES", 1000)
+SEARCH_STOPWORDS = frozenset(
+    "а або але в від для до з за зі і із й на не по при про та то у це чи що як".split()
+)
+# Вага назви відносно опису; у PostgreSQL її задають ваги 'A' і 'B' у ts_rank.
+TITLE_WEIGHT = 2.5
+
+_TERM = re.compile(r"[^\W_]+")
+
+tasks_fts = table("tasks_fts", column("rowid", Integer))
+search_vector = literal_column("tasks.search_vector")
+
+
+def terms(q: str) -> list[str]:
+    """Слова запиту в нижньому регістрі без службових символів FTS і tsquery."""
+    words = _TERM.findall(q.lower())
+    meaningful = [word for word in words if len(word) > 1 and word not in SEARCH_STOPWORDS]
+    return (meaningful or words)[:SEARCH_MAX_TERMS]
+
+
+def _matches(dialect: str, words: list[str], status: models.TaskStatus | None):
+    """SELECT (id, score) усіх збігів і стовпець id, за яким обираються кандидати."""
+    prefix = len(words[-1]) > 1
+    if dialect == "sqlite":
+        fts = literal_column("tasks_fts")
+        match = " ".join(f'"{word}"' for word in words) + ("*" if prefix else "")
+        task_id = tasks_fts.c.rowid
+        matches = select(task_id.label("id"), func.bm25(fts, TITLE_WEIGHT, 1.0).label("score")).where(
+            fts.op("MATCH")(match)
+        )
+        if status:
+            matches = matches.join(models.Task, models.Task.id == task_id)
+    else:
+        tsquery = func.to_tsquery(text("'simple'"), " & ".join(words) + (":*" if prefix else ""))
+        task_id = models.Task.id
+        matches = select(task_id, (-func.ts_rank(search_vector, tsquery)).label("score")).where(
+            search_vector.op("@@")(tsquery)
+        )
+    if status:
+        matches = matches.where(models.Task.status == status)
+    return matches, task_id
+
+
+def ranked_tasks(dialect: str, words: list[str], status: models.TaskStatus | None = None):
+    """SELECT (Task, score) для завдань, що містять усі ``words``, і сам вираз score."""
+    matches, task_id = _matches(dialect, words, status)
+    if SEARCH_MAX_CANDIDATES:
+        matches = matches.order_by(task_id.desc()).limit(SEARCH_MAX_CANDIDATES)
+
+    matches = matches.subquery()
+    query = select(models.Task, matches.c.score).join(matches, models.Task.id == matches.c.id)
+    return query, matches.c.score
+
+
+def truncated(dialect: str, words: list[str], status: models.TaskStatus | None = None):
+    """SELECT, що повертає рядок, лише якщо збігів більше за SEARCH_MAX_CANDIDATES; None без обмеження."""
+    if not SEARCH_MAX_CANDIDATES:
+        return None
+    matches, task_id = _matches(dialect, words, status)
+    # Оцінка тут не потрібна: лишаємо тільки id, щоб не рахувати bm25/ts_rank.
+    return matches.with_only_columns(task_id).order_by(task_id.desc()).offset(SEARCH_MAX_CANDIDATES).limit(1)
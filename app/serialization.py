@@ -0,0 +1,54 @@
+"""Серіалізація сторінок завдань та історії одразу в байти JSON.
+
+Звичайний шлях FastAPI для ``response_model`` перевіряє кожен об'єкт через
+pydantic, перетворює його на словник і лише потім кодує JSON. Для сторінок
+GET /tasks/ і GET /tasks/{id}/history ендпоінти читають з бази лише потрібні
+колонки як рядки й кодують їх orjson, а готові байти віддають через
+``json_response``. Вихід збігається з попереднім байт у байт: ті самі поля в
+порядку схеми, компактний JSON без екранування не-ASCII, дати у форматі
+pydantic (``Z`` для UTC).
+
+``?fields=title,status`` обмежує набір полів відповіді; порядок полів завжди
+такий, як у схемі, а не як у запиті.
+"""
+from typing import Any, Iterable
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+from . import schemas
+
+TASK_FIELDS = tuple(schemas.TaskResponse.model_fields)
+HISTORY_FIELDS = tuple(schemas.TaskHistoryResponse.model_fields)
+
+_OPTIONS = orjson.OPT_UTC_Z
+
+
+class UnknownFieldsError(ValueError):
+    pass
+
+
+def parse_fields(value: str | None, schema: type[BaseModel]) -> tuple[str, ...]:
+    """Поля з параметра ``fields`` у порядку схеми; без параметра — усі."""
+    available = tuple(schema.model_fields)
+    if value is None:
+        return available
+    requested = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = requested.difference(available)
+    if unknown:
+        raise UnknownFieldsError(
+            f"Невідомі поля: {', '.join(sorted(unknown))}; доступні: {', '.join(available)}"
+        )
+    if not requested:
+        raise UnknownFieldsError("Параметр fields не містить жодного поля")
+    return tuple(field for field in available if field in requested)
+
+
+def dump_rows(rows: Iterable[Any], fields: tuple[str, ...]) -> bytes:
+    """JSON-масив об'єктів з атрибутами ``fields`` кожного рядка (Row, ORM чи pydantic)."""
+    return orjson.dumps([{field: getattr(row, field) for field in fields} for row in rows], option=_OPTIONS)
+
+
+def json_response(body: bytes | str, headers: dict[str, str] | None = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,80 @@
+"""Єдиний записувач для SQLite з груповою фіксацією.
+
+SQLite дозволяє лише одного записувача на файл. Замість того щоб кожна сесія
+боролася за блокування ("database is locked"), операції запису стають у чергу,
+а фонова задача виконує всі накопичені операції в одній транзакції — кожну у
+власному SAVEPOINT, щоб помилка однієї не скасовувала інші — і фіксує їх одним commit.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Operation = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class SQLiteWriter:
+    def __init__(self, session_factory: async_sessionmaker, max_batch: int):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue), name="sqlite-writer")
+        return self._queue
+
+    async def submit(self, operation: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """Ставить операцію в чергу і чекає, доки її транзакцію буде зафіксовано."""
+        queue = self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((operation, future))
+        return await future
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._commit_batch(batch)
+            except Exception:
+                logger.exception("SQLite writer batch failed")
+
+    async def _commit_batch(self, batch: list[tuple[Operation, asyncio.Future]]):
+        outcomes = []
+        async with self.session_factory() as session:
+            for operation, future in batch:
+                if future.cancelled():
+                    continue
+                try:
+                    async with session.begin_nested():
+                        result = await operation(session)
+                except Exception as exc:
+                    outcomes.append((future, None, exc))
+                else:
+                    outcomes.append((future, result, None))
+            try:
+                await session.commit()
+            except Exception as exc:
+                for future, _, _ in outcomes:
+                    if not future.done():
+                        future.set_exception(exc)
+                raise
+
+        for future, result, exc in outcomes:
+            if future.done():
+                continue
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
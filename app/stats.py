@@ -0,0 +1,172 @@
+"""Лічильники для GET /tasks/stats, що оновлюються в транзакції запису завдань.
+
+task_status_counts зберігає кількість завдань у кожному статусі, task_daily_counts —
+по днях (UTC) кількість завдань, виконаних того дня (за Task.completed_at), і
+невиконаних завдань із дедлайном на цей день. Функції запису в crud рахують
+різницю внеску завдань до й після зміни (``contribution``) і додають її до
+лічильників upsert'ом (``apply``), тож статистика читається кількома рядками
+незалежно від розміру tasks.
+
+Прострочені — невиконані завдання з дедлайном раніше ``now``: сума due_pending
+за минулі дні плюс підрахунок за індексом лише серед сьогоднішніх дедлайнів.
+
+``reconcile`` перераховує лічильники з таблиці tasks і виправляє розбіжності
+(задача Celery reconcile_stats).
+"""
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import Date, delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+_STATUS = "status"
+_COMPLETED = "completed"
+_DUE_PENDING = "due_pending"
+
+
+def _utc_day(value: datetime) -> date:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).date()
+
+
+def contribution(
+    status: models.TaskStatus,
+    due_date: datetime | None,
+    completed_at: datetime | None,
+) -> Counter:
+    """Внесок завдання з такими значеннями полів у лічильники."""
+    counts = Counter({(_STATUS, status): 1})
+    if status == models.TaskStatus.COMPLETED and completed_at is not None:
+        counts[(_COMPLETED, _utc_day(completed_at))] += 1
+    if status == models.TaskStatus.PENDING and due_date is not None:
+        counts[(_DUE_PENDING, _utc_day(due_date))] += 1
+    return counts
+
+
+def task_contribution(task: models.Task) -> Counter:
+    return contribution(task.status, task.due_date, task.completed_at)
+
+
+def _insert(session: AsyncSession):
+    return postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+
+
+async def apply(session: AsyncSession, delta: Counter):
+    """Додає ``delta`` до лічильників.
+
+    Рядки оновлюються в порядку ключів, тож паралельні транзакції блокують їх
+    в однаковому порядку й не потрапляють у взаємне блокування.
+    """
+    statuses = sorted((key, count) for (kind, key), count in delta.items() if kind == _STATUS and count)
+    days: dict[date, dict] = {}
+    for (kind, key), count in delta.items():
+        if kind != _STATUS and count:
+            days.setdefault(key, {"day": key, _COMPLETED: 0, _DUE_PENDING: 0})[kind] += count
+
+    insert = _insert(session)
+    if statuses:
+        statement = insert(models.TaskStatusCount).values(
+            [{"status": status, "count": count} for status, count in statuses]
+        )
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["status"],
+                set_={"count": models.TaskStatusCount.count + statement.excluded.count},
+            )
+        )
+    if days:
+        daily = models.TaskDailyCount
+        statement = insert(daily).values([days[day] for day in sorted(days)])
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["day"],
+                set_={
+                    "completed": daily.completed + statement.excluded.completed,
+                    "due_pending": daily.due_pending + statement.excluded.due_pending,
+                },
+            )
+        )
+
+
+async def read(session: AsyncSession, now: datetime, days: int) -> dict:
+    """Статистика на момент ``now`` із виконаними за останні ``days`` днів."""
+    daily = models.TaskDailyCount
+    today = _utc_day(now)
+    first_day = today - timedelta(days=days - 1)
+
+    by_status = {status: 0 for status in models.TaskStatus}
+    result = await session.execute(select(models.TaskStatusCount.status, models.TaskStatusCount.count))
+    by_status.update(result.all())
+
+    result = await session.execute(select(daily.day, daily.completed).where(daily.day >= first_day, daily.day <= today))
+    completed = dict(result.all())
+
+    result = await session.execute(select(func.coalesce(func.sum(daily.due_pending), 0)).where(daily.day < today))
+    overdue = result.scalar_one()
+    result = await session.execute(
+        select(func.count()).where(
+            models.Task.status == models.TaskStatus.PENDING,
+            models.Task.due_date >= datetime.combine(today, time(), tzinfo=timezone.utc),
+            models.Task.due_date < now,
+        )
+    )
+    overdue += result.scalar_one()
+
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "overdue": overdue,
+        "completed_per_day": [
+            {"day": day, "completed": completed.get(day, 0)}
+            for day in (first_day + timedelta(days=offset) for offset in range(days))
+        ],
+    }
+
+
+def _day(dialect: str, column):
+    if dialect == "postgresql":
+        return func.date(func.timezone("UTC", column), type_=Date)
+    return func.date(column, type_=Date)
+
+
+async def reconcile(session: AsyncSession) -> int:
+    """Приводить лічильники до значень, перерахованих з tasks; повертає кількість виправлених."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        # Транзакції, що ще не оновили лічильники, дочекаються кінця перерахунку
+        # й додадуть свою різницю вже до перерахованих значень.
+        await session.execute(text("LOCK TABLE task_status_counts, task_daily_counts IN EXCLUSIVE MODE"))
+
+    task = models.Task
+    actual = Counter()
+    result = await session.execute(
+        select(task.status, func.count()).where(task.status.is_not(None)).group_by(task.status)
+    )
+    actual.update({(_STATUS, status): count for status, count in result})
+    for kind, status, column in (
+        (_COMPLETED, models.TaskStatus.COMPLETED, task.completed_at),
+        (_DUE_PENDING, models.TaskStatus.PENDING, task.due_date),
+    ):
+        day_of = _day(dialect, column)
+        result = await session.execute(
+            select(day_of, func.count()).where(task.status == status, column.is_not(None)).group_by(day_of)
+        )
+        actual.update({(kind, day): count for day, count in result})
+
+    stored = Counter()
+    result = await session.execute(select(models.TaskStatusCount.status, models.TaskStatusCount.count))
+    stored.update({(_STATUS, status): count for status, count in result})
+    daily = models.TaskDailyCount
+    for day, completed, due_pending in await session.execute(select(daily.day, daily.completed, daily.due_pending)):
+        stored.update({(_COMPLETED, day): completed, (_DUE_PENDING, day): due_pending})
+
+    delta = Counter(actual)
+    delta.subtract(stored)
+    await apply(session, delta)
+    # Порожні дні лише подовжують підсумовування прострочених у read.
+    await session.execute(delete(daily).where(daily.completed == 0, daily.due_pending == 0))
+    return sum(1 for count in delta.values() if count)
@@ -0,0 +1,87 @@
+"""Довготривалий asyncio-рантайм для процесів Celery-воркерів.
+
+Замість ``asyncio.run`` на кожну задачу процес воркера тримає один цикл подій,
+на якому живуть пул з'єднань ``engine`` і пул SMTP-з'єднань ``mail.transport``.
+Цикл створюється в ``worker_process_init`` (або ліниво при першій задачі,
+наприклад у ``-P solo``) і закривається в ``worker_process_shutdown``.
+
+Підтримуються лише пули ``prefork`` і ``solo``: у ``threads``, ``gevent`` та
+``eventlet`` задачі одного процесу виконувалися б одночасно, а ``engine`` і
+``mail.transport`` прив'язані до одного циклу. Воркер з іншим пулом не
+стартує (див. celery_app._RequireSingleLoopPool).
+"""
+import asyncio
+import os
+import threading
+from typing import Awaitable, TypeVar
+
+from . import mail
+from .database import engine, read_engine
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_pid: int | None = None
+_loop_thread: int | None = None
+
+
+def _is_running_here() -> bool:
+    return (
+        _loop is not None
+        and not _loop.is_closed()
+        and _loop_pid == os.getpid()
+        and _loop_thread == threading.get_ident()
+    )
+
+
+def _engines():
+    return (engine,) if read_engine is engine else (engine, read_engine)
+
+
+async def _warm_up():
+    for pool_engine in _engines():
+        async with pool_engine.connect():
+            pass
+
+
+def start() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid, _loop_thread
+    if _is_running_here():
+        return _loop
+
+    # З'єднання в пулі належать батьківському процесу або іншому циклу подій:
+    # відпускаємо їх, не закриваючи, і наповнюємо пул заново вже на новому циклі.
+    for pool_engine in _engines():
+        pool_engine.sync_engine.dispose(close=False)
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _loop_pid = os.getpid()
+    _loop_thread = threading.get_ident()
+    _loop.run_until_complete(_warm_up())
+    return _loop
+
+
+def run(coro: Awaitable[T]) -> T:
+    """Виконує корутину на циклі подій процесу."""
+    if _loop is not None and _loop_pid == os.getpid() and _loop_thread != threading.get_ident():
+        # Окремий цикл тут ділив би з'єднання пулів engine/read_engine з циклом
+        # потоку-власника, а asyncpg такі з'єднання на чужому циклі не приймає.
+        coro.close()
+        raise RuntimeError(
+            "Рантайм воркера належить іншому потоку: підтримуються лише пули Celery prefork і solo"
+        )
+    return start().run_until_complete(coro)
+
+
+def shutdown():
+    global _loop, _loop_pid, _loop_thread
+    if not _is_running_here():
+        return
+    try:
+        _loop.run_until_complete(mail.transport.close())
+        for pool_engine in _engines():
+            _loop.run_until_complete(pool_engine.dispose())
+        _loop.run_until_complete(_loop.shutdown_asyncgens())
+    finally:
+        _loop.close()
+        _loop = _loop_pid = _loop_thread = None
@@ -0,0 +1,4 @@
+"""Бенчмарки API та фонових задач.
+
+Кожен модуль запускається окремо, наприклад ``python -m benchmarks.pagination``.
+"""
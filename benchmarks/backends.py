@@ -0,0 +1,154 @@
+"""Навантажувальне порівняння SQLite та PostgreSQL на тому самому API.
+
+Запуск: ``python -m benchmarks.backends --clients 50 --requests 5000``.
+Без ``--postgres-url`` скрипт піднімає тимчасовий кластер PostgreSQL через
+``initdb``/``pg_ctl`` (з PATH або з теки PG_BIN_DIR) і зупиняє його наприкінці.
+Кожен бекенд вимірюється в окремому процесі, бо рушій БД створюється під час імпорту app.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _pg_binary(name: str) -> str:
+    bin_dir = os.getenv("PG_BIN_DIR")
+    path = os.path.join(bin_dir, name) if bin_dir else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise SystemExit(f"{name} не знайдено: додайте його в PATH, задайте PG_BIN_DIR або --postgres-url")
+    return path
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def temporary_postgres():
+    workdir = tempfile.mkdtemp(prefix="todo-bench-pg-")
+    data_dir = os.path.join(workdir, "data")
+    port = _free_port()
+    subprocess.run(
+        [_pg_binary("initdb"), "-D", data_dir, "-U", "postgres", "--auth=trust"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    pg_ctl = _pg_binary("pg_ctl")
+    subprocess.run(
+        [pg_ctl, "-D", data_dir, "-o", f"-p {port} -k {workdir}", "-l", os.path.join(workdir, "log"), "-w", "start"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        yield f"postgresql+asyncpg://postgres@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", data_dir, "-m", "fast", "-w", "stop"], stdout=subprocess.DEVNULL)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def _load(args) -> dict:
+    import httpx
+
+    from app.database import Base, engine
+    from app.main import app, limiter
+    from benchmarks.common import percentile
+
+    limiter.enabled = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for start in range(0, args.seed, 1000):
+            items = [{"title": f"Завдання {index}"} for index in range(start, min(start + 1000, args.seed))]
+            await client.post("/tasks/bulk", json={"items": items})
+
+        latencies: dict[str, list[float]] = {"create": [], "list": [], "get": [], "update": []}
+        queue: asyncio.Queue = asyncio.Queue()
+        for index in range(args.requests):
+            queue.put_nowait(index)
+
+        async def client_loop():
+            while not queue.empty():
+                index = queue.get_nowait()
+                operation = ("create", "list", "get", "update")[index % 4]
+                task_id = random.randint(1, args.seed)
+                started = time.perf_counter()
+                if operation == "create":
+                    response = await client.post("/tasks/", json={"title": f"Нове {index}"})
+                elif operation == "list":
+                    response = await client.get("/tasks/", params={"limit": 50})
+                elif operation == "get":
+                    response = await client.get(f"/tasks/{task_id}")
+                else:
+                    response = await client.patch(f"/tasks/{task_id}", json={"title": f"Оновлене {index}"})
+                response.raise_for_status()
+                latencies[operation].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.clients)))
+        duration = time.perf_counter() - started
+
+    await engine.dispose()
+    return {
+        "throughput_rps": round(args.requests / duration, 1),
+        "operations": {
+            name: {"p50_ms": round(percentile(values, 50), 2), "p99_ms": round(percentile(values, 99), 2)}
+            for name, values in latencies.items()
+        },
+    }
+
+
+def _run_backend(url: str, args) -> dict:
+    env = {**os.environ, "DATABASE_URL": url, "CACHE_BACKEND": "none"}
+    command = [
+        sys.executable, "-m", "benchmarks.backends", "--worker",
+        "--clients", str(args.clients), "--requests", str(args.requests), "--seed", str(args.seed),
+    ]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=10_000, help="Кількість завдань у базі до старту")
+    parser.add_argument("--sqlite-path", default=os.path.join(tempfile.gettempdir(), "todo-bench-backends.db"))
+    parser.add_argument("--postgres-url")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(_load(args))))
+        return
+
+    results = {"sqlite": _run_backend(f"sqlite+aiosqlite:///{args.sqlite_path}", args)}
+    if args.postgres_url:
+        results["postgresql"] = _run_backend(args.postgres_url, args)
+    else:
+        with temporary_postgres() as url:
+            results["postgresql"] = _run_backend(url, args)
+
+    print(f"{'backend':<12}{'rps':>8}" + "".join(f"{name + ' p50/p99':>22}" for name in ("create", "list", "get", "update")))
+    for backend, result in results.items():
+        row = f"{backend:<12}{result['throughput_rps']:>8}"
+        for name in ("create", "list", "get", "update"):
+            stats = result["operations"][name]
+            row += f"{stats['p50_ms']:>13.2f}/{stats['p99_ms']:<8.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
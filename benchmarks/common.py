@@ -0,0 +1,90 @@
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine, AsyncSession
+
+from app import models
+from app.database import Base
+
+SEED_BATCH_SIZE = 10_000
+SEED_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def default_database_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"todo-bench-{name}.db")
+
+
+async def create_engine(path: str, fresh: bool = True) -> AsyncEngine:
+    if fresh and os.path.exists(path):
+        os.remove(path)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+def session_factory(engine: AsyncEngine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def seed_tasks(engine: AsyncEngine, count: int, batch_size: int = SEED_BATCH_SIZE):
+    for start in range(0, count, batch_size):
+        rows = [
+            {
+                "title": f"Завдання {index}",
+                "description": f"Опис завдання {index}",
+                "status": models.TaskStatus.COMPLETED if index % 3 == 0 else models.TaskStatus.PENDING,
+                "due_date": SEED_EPOCH + timedelta(days=index % 365),
+                "created_at": SEED_EPOCH + timedelta(seconds=index),
+            }
+            for index in range(start, min(start + batch_size, count))
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.Task), rows)
+
+
+async def seed_history(
+    engine: AsyncEngine,
+    task_id: int,
+    count: int,
+    batch_size: int = SEED_BATCH_SIZE,
+):
+    for start in range(0, count, batch_size):
+        rows = [
+            {
+                "task_id": task_id,
+                "event_type": models.TaskEventType.UPDATED,
+                "changed_at": SEED_EPOCH + timedelta(seconds=index),
+                "before_data": {"title": f"Завдання {index}"},
+                "after_data": {"title": f"Завдання {index + 1}"},
+                "changed_fields": ["title"],
+            }
+            for index in range(start, min(start + batch_size, count))
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.TaskHistory), rows)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[rank]
+
+
+async def measure(operation: Callable[[], Awaitable[object]], repeat: int) -> dict[str, float]:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await operation()
+        durations.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": statistics.median(durations),
+        "p95_ms": percentile(durations, 95),
+    }
@@ -0,0 +1,102 @@
+"""Запізнення сповіщень про прострочення: щохвилинне опитування проти планувальника дедлайнів.
+
+Запуск: ``python -m benchmarks.deadline_scheduler --tasks 2000 --spread 10``.
+``--tasks`` завдань з дедлайнами, рівномірно розкиданими на ``--spread`` секунд
+уперед, обробляє ``DeadlineScheduler`` (сигнали змін передаються напряму, без
+Redis). Для кожного завдання вимірюється, наскільки пізніше дедлайну його
+зарезервовано. Для опитування ``crontab(minute='*')`` запізнення — час до
+наступної хвилини після дедлайну (прогін самої задачі не враховано). Окремо
+рахуються запити до БД, поки планувальник простоює.
+"""
+import os
+import tempfile
+
+DATABASE_PATH = os.path.join(tempfile.gettempdir(), "todo-bench-deadline-scheduler.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+import argparse
+import asyncio
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, insert, select
+
+from app import models
+from app.database import AsyncSessionLocal, engine as app_engine
+from app.deadline_scheduler import DeadlineScheduler
+from benchmarks.common import create_engine, percentile
+
+
+async def _seed(count: int, spread: float, start: datetime):
+    engine = await create_engine(DATABASE_PATH)
+    rows = [
+        {
+            "title": f"Завдання {index}",
+            "status": models.TaskStatus.PENDING,
+            "created_at": start,
+            "due_date": start + timedelta(seconds=spread * index / count),
+            "notification_email": f"user{index % 100}@example.com",
+        }
+        for index in range(count)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(insert(models.Task), rows)
+    await engine.dispose()
+
+
+def _stats(name: str, lateness: list[float]):
+    print(
+        f"{name:<22}{percentile(lateness, 50):>10.1f}{percentile(lateness, 95):>10.1f}"
+        f"{max(lateness):>10.1f}"
+    )
+
+
+async def run(args):
+    start = datetime.now(timezone.utc) + timedelta(seconds=1)
+    await _seed(args.tasks, args.spread, start)
+    queries = []
+    event.listen(app_engine.sync_engine, "before_cursor_execute", lambda *_: queries.append(time.perf_counter()))
+
+    scheduler = DeadlineScheduler(dispatch=lambda token: None, batch_size=200, lease_seconds=300)
+    runner = asyncio.create_task(scheduler.run())
+    scheduler.resync()
+    await asyncio.sleep(args.spread + 1.5)
+    idle_from = len(queries)
+    await asyncio.sleep(args.idle)
+    idle_queries = len(queries) - idle_from
+    runner.cancel()
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Task.due_date, models.Task.overdue_claim_expires_at).where(
+                models.Task.overdue_claim_token.is_not(None)
+            )
+        )
+        # Резерв діє lease_seconds від моменту резервування.
+        scheduled = [
+            ((claim_expires_at - timedelta(seconds=300)) - due_date).total_seconds() * 1000
+            for due_date, claim_expires_at in result
+        ]
+    polled = []
+    for index in range(args.tasks):
+        due = (start + timedelta(seconds=args.spread * index / args.tasks)).timestamp()
+        polled.append((math.floor(due / 60) + 1) * 60 * 1000 - due * 1000)
+
+    print(f"{'mode':<22}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    _stats("crontab(minute='*')", polled)
+    _stats("deadline_scheduler", scheduled)
+    print(f"зарезервовано {len(scheduled)} з {args.tasks}; запитів до БД за {args.idle} с простою: {idle_queries}")
+    await app_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=10.0, help="На скільки секунд уперед розкидано дедлайни")
+    parser.add_argument("--idle", type=float, default=5.0, help="Скільки секунд рахувати запити під час простою")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
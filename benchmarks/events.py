@@ -0,0 +1,127 @@
+"""Затримка доставки подій /tasks/stream і навантаження на БД залежно від кількості підписників.
+
+Запуск: ``python -m benchmarks.events --subscribers 1 100 1000 --writes 200``.
+Для кожної кількості підписників виконуються PATCH /tasks/{id}; вимірюється час
+від відповіді на PATCH до отримання події останнім підписником і кількість
+запитів до task_history, які зробив насос стрічки. Порівняння — опитування
+GET /tasks/ кожним клієнтом: стільки запитів на інтервал опитування, скільки
+клієнтів. Кожна кількість підписників вимірюється в окремому процесі, бо рушій
+БД створюється під час імпорту app.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def _run(args) -> dict:
+    import httpx
+    from sqlalchemy import event
+
+    from app import events
+    from app.database import Base, engine
+    from app.main import app, limiter
+    from benchmarks.common import percentile, seed_tasks
+
+    limiter.enabled = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await seed_tasks(engine, args.seed)
+
+    history_reads = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_reads(conn, cursor, statement, parameters, context, executemany):
+        nonlocal history_reads
+        if statement.lstrip().upper().startswith("SELECT") and "FROM task_history" in statement:
+            history_reads += 1
+
+    received: dict[int, int] = {}
+    done: dict[int, asyncio.Event] = {}
+    finished: dict[int, float] = {}
+
+    async def subscriber():
+        async for item in events.stream():
+            if item is None:
+                continue
+            received[item.id] = received.get(item.id, 0) + 1
+            if received[item.id] == args.subscriber_count:
+                finished[item.id] = time.perf_counter()
+                done.setdefault(item.id, asyncio.Event()).set()
+
+    subscribers = [asyncio.create_task(subscriber()) for _ in range(args.subscriber_count)]
+    await asyncio.sleep(0.5)
+
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        reads_before = history_reads
+        for index in range(args.writes):
+            response = await client.patch(f"/tasks/{index % args.seed + 1}", json={"title": f"Зміна {index}"})
+            responded = time.perf_counter()
+            # seed_tasks не пише історію, а кожен PATCH додає рівно один запис.
+            event_id = index + 1
+            await asyncio.wait_for(done.setdefault(event_id, asyncio.Event()).wait(), 30)
+            latencies.append(max(0.0, finished[event_id] - responded) * 1000)
+            assert response.status_code == 200, response.text
+        reads = history_reads - reads_before
+
+    for task in subscribers:
+        task.cancel()
+    await asyncio.gather(*subscribers, return_exceptions=True)
+    await engine.dispose()
+    return {
+        "subscribers": args.subscriber_count,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "reads_per_write": reads / args.writes,
+    }
+
+
+def _child(args):
+    print(json.dumps(asyncio.run(_run(args))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1000)
+    parser.add_argument("--poll-seconds", type=float, default=5, help="Інтервал опитування для порівняння")
+    parser.add_argument("--subscriber-count", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.subscriber_count is not None:
+        _child(args)
+        return
+
+    print(f"{'subscribers':>12}{'p50 ms':>10}{'p95 ms':>10}{'reads/write':>13}{'polling q/s':>13}")
+    for count in args.subscribers:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{directory}/events.db")
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.events",
+                    "--subscriber-count", str(count),
+                    "--writes", str(args.writes),
+                    "--seed", str(args.seed),
+                ],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{result['subscribers']:>12}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+            f"{result['reads_per_write']:>13.2f}{count / args.poll_seconds:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Пам'ять і швидкість GET /tasks/export залежно від кількості рядків.
+
+Запуск: ``python -m benchmarks.export --sizes 1000 100000 1000000``.
+Застосунок викликається напряму як ASGI-додаток, а тіло відповіді відкидається
+частинами (httpx.ASGITransport накопичує тіло цілком і спотворив би вимір);
+пік пам'яті (tracemalloc) має лишатися сталим незалежно від розміру вивантаження.
+"""
+import os
+import tempfile
+
+DATABASE_PATH = os.path.join(tempfile.gettempdir(), "todo-bench-export.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.database import engine as app_engine
+from app.main import app
+from benchmarks.common import create_engine, seed_tasks
+
+
+async def _export(format: str) -> tuple[int, float, float]:
+    lines = 0
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/tasks/export",
+        "raw_path": b"/tasks/export",
+        "query_string": f"format={format}".encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+
+    requested = False
+
+    async def receive():
+        # Після тіла запиту клієнт не відключається, доки відповідь не буде передано.
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal lines
+        if message["type"] == "http.response.body":
+            lines += message.get("body", b"").count(b"\n")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    duration = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return lines, duration, peak / 1024
+
+
+async def main_async(args):
+    app_engine.echo = False
+    print(f"{'rows':>10}{'format':>8}{'rows/s':>12}{'peak KiB':>12}")
+    for size in args.sizes:
+        engine = await create_engine(DATABASE_PATH)
+        await seed_tasks(engine, size)
+        await engine.dispose()
+        await app_engine.dispose()
+
+        for format in ("ndjson", "csv"):
+            lines, duration, peak = await _export(format)
+            rows = lines - (format == "csv")
+            print(f"{rows:>10}{format:>8}{rows / duration:>12.0f}{peak:>12.0f}")
+    await app_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
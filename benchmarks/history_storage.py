@@ -0,0 +1,92 @@
+"""Розмір task_history у компактному форматі проти повних знімків до/після.
+
+Запуск: ``python -m benchmarks.history_storage --tasks 1000 --updates 50``.
+Історія пишеться через crud, тож вміст рядків такий самий, як у робочій базі.
+Повний формат рахується з відновлених записів, які повертає GET /tasks/{id}/history.
+"""
+import os
+import tempfile
+
+DATABASE_PATH = os.path.join(tempfile.gettempdir(), "todo-bench-history-storage.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import func, select
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal, engine as app_engine
+from benchmarks.common import create_engine, measure
+
+
+def _json_size(value) -> int:
+    return 0 if value is None else len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+async def _write_history(tasks: int, updates: int):
+    async with AsyncSessionLocal() as db:
+        for start in range(0, tasks, schemas.BULK_MAX_ITEMS):
+            count = min(schemas.BULK_MAX_ITEMS, tasks - start)
+            await crud.create_tasks_bulk(db, [schemas.TaskCreate(title=f"Завдання {start + index}") for index in range(count)])
+        for round_number in range(updates):
+            for start in range(1, tasks + 1, schemas.BULK_MAX_ITEMS):
+                items = [
+                    schemas.TaskBulkUpdateItem(id=task_id, title=f"Завдання {task_id} / {round_number}")
+                    for task_id in range(start, min(start + schemas.BULK_MAX_ITEMS, tasks + 1))
+                ]
+                await crud.update_tasks_bulk(db, items)
+
+
+async def _report(tasks: int):
+    history = models.TaskHistory
+    async with AsyncSessionLocal() as db:
+        rows, checkpoints, stored = (
+            await db.execute(
+                select(
+                    func.count(),
+                    func.count().filter(history.is_checkpoint.is_(True)),
+                    func.sum(
+                        func.coalesce(func.length(history.before_data), 0)
+                        + func.coalesce(func.length(history.after_data), 0)
+                        + func.coalesce(func.length(history.changed_fields), 0)
+                        + func.coalesce(func.length(history.compressed_snapshot), 0)
+                    ),
+                )
+            )
+        ).one()
+
+        full = 0
+        for task_id in range(1, tasks + 1):
+            for entry in await crud.get_task_history(db, task_id, limit=rows):
+                full += _json_size(entry.before_data) + _json_size(entry.after_data) + _json_size(entry.changed_fields)
+
+        page = await measure(lambda: crud.get_task_history(db, 1, limit=50), repeat=50)
+
+    print(f"rows              {rows}")
+    print(f"checkpoints       {checkpoints}")
+    print(f"full snapshots    {full} bytes")
+    print(f"stored            {stored} bytes ({100 * (full - stored) / full:.1f}% saved)")
+    print(f"history page      median {page['median_ms']:.2f} ms, p95 {page['p95_ms']:.2f} ms")
+
+
+async def main_async(args):
+    engine = await create_engine(DATABASE_PATH)
+    await engine.dispose()
+    app_engine.echo = False
+    await _write_history(args.tasks, args.updates)
+    await _report(args.tasks)
+    await app_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=50, help="Оновлень на кожне завдання")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
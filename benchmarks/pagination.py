@@ -0,0 +1,98 @@
+"""Порівняння OFFSET- та курсорної пагінації для GET /tasks/ і GET /tasks/{task_id}/history.
+
+Запуск: ``python -m benchmarks.pagination --tasks 1000000 --history 10000000``.
+Уся історія записується для одного завдання, щоб сторінки були якомога глибшими.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import select
+
+from app import crud, models
+from benchmarks.common import (
+    create_engine,
+    default_database_path,
+    measure,
+    seed_history,
+    seed_tasks,
+    session_factory,
+)
+
+HOT_TASK_ID = 1
+DEPTHS = (0.0, 0.1, 0.5, 0.9, 0.999)
+
+
+async def _task_cursor(session, position: int):
+    query = (
+        select(models.Task.created_at, models.Task.id)
+        .order_by(models.Task.created_at, models.Task.id)
+        .offset(position - 1)
+        .limit(1)
+    )
+    return (await session.execute(query)).one() if position else None
+
+
+async def _history_cursor(session, position: int):
+    query = (
+        select(models.TaskHistory.changed_at, models.TaskHistory.id)
+        .where(models.TaskHistory.task_id == HOT_TASK_ID)
+        .order_by(models.TaskHistory.changed_at.desc(), models.TaskHistory.id.desc())
+        .offset(position - 1)
+        .limit(1)
+    )
+    return (await session.execute(query)).one() if position else None
+
+
+async def run(args):
+    path = args.database or default_database_path("pagination")
+    engine = await create_engine(path, fresh=not args.reuse)
+    if not args.reuse:
+        await seed_tasks(engine, args.tasks)
+        await seed_history(engine, HOT_TASK_ID, args.history)
+
+    Session = session_factory(engine)
+    print(f"{'endpoint':<10}{'depth':>10}{'offset ms':>14}{'keyset ms':>14}")
+    async with Session() as session:
+        for name, total, load_cursor, fetch in (
+            ("tasks", args.tasks, _task_cursor, _fetch_tasks),
+            ("history", args.history, _history_cursor, _fetch_history),
+        ):
+            for depth in DEPTHS:
+                position = int(total * depth)
+                cursor = tuple(await load_cursor(session, position)) if position else None
+                offset_stats = await measure(
+                    lambda: fetch(session, skip=position, after=None, limit=args.limit), args.repeat
+                )
+                keyset_stats = await measure(
+                    lambda: fetch(session, skip=0, after=cursor, limit=args.limit), args.repeat
+                )
+                print(
+                    f"{name:<10}{position:>10}"
+                    f"{offset_stats['median_ms']:>14.2f}{keyset_stats['median_ms']:>14.2f}"
+                )
+    await engine.dispose()
+
+
+async def _fetch_tasks(session, skip, after, limit):
+    return await crud.get_tasks(db=session, skip=skip, limit=limit, after=after)
+
+
+async def _fetch_history(session, skip, after, limit):
+    return await crud.get_task_history(
+        db=session, task_id=HOT_TASK_ID, skip=skip, limit=limit, after=after
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--history", type=int, default=10_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database", help="Шлях до файлу SQLite (за замовчуванням у тимчасовій теці)")
+    parser.add_argument("--reuse", action="store_true", help="Не пересівати вже заповнену базу")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
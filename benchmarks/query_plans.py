@@ -0,0 +1,219 @@
+"""Перевірка планів запитів списку завдань і пошуку прострочених завдань через EXPLAIN.
+
+Запуск: ``python -m benchmarks.query_plans`` (SQLite) або з
+``--postgres-url postgresql+asyncpg://...``. Для кожного фільтра й сортування
+GET /tasks/ і для запитів задачі send_overdue_deadline_notifications скрипт
+перехоплює SQL, який виконує crud, і перевіряє план: потрібний індекс
+використовується, таблиця tasks не читається повністю, а там, де порядок
+має давати індекс, немає окремого сортування. Код виходу 1, якщо хоч одна
+перевірка не пройшла.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app import crud, models
+from app.database import Base
+from benchmarks.common import SEED_BATCH_SIZE, SEED_EPOCH, create_engine, default_database_path, session_factory
+
+NOW = SEED_EPOCH + timedelta(days=180)
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[AsyncSession], Awaitable[object]]
+    indexes: set[str]
+    # Чи допустиме окреме сортування (порядок не збігається з жодним індексом).
+    sort_allowed: bool = False
+
+
+CASES = [
+    Case("default", lambda db: crud.get_tasks(db), {"ix_tasks_created_at_id"}),
+    Case("sort=-created_at", lambda db: crud.get_tasks(db, sort="-created_at"), {"ix_tasks_created_at_id"}),
+    # За частого статусу PostgreSQL може обрати обхід ix_tasks_created_at_id з фільтром:
+    # порядок той самий, а LIMIT зупиняє обхід після першої сторінки.
+    Case(
+        "status",
+        lambda db: crud.get_tasks(db, status=models.TaskStatus.PENDING),
+        {"ix_tasks_status_created_at_id", "ix_tasks_created_at_id"},
+    ),
+    Case(
+        "created range",
+        lambda db: crud.get_tasks(db, created_from=SEED_EPOCH + timedelta(days=1), created_to=SEED_EPOCH + timedelta(days=2)),
+        {"ix_tasks_created_at_id"},
+    ),
+    Case("sort=due_date", lambda db: crud.get_tasks(db, sort="due_date", limit=50), {"ix_tasks_due_date_id"}),
+    Case(
+        "sort=-due_date, due range",
+        lambda db: crud.get_tasks(db, sort="-due_date", due_from=NOW, due_to=NOW + timedelta(days=7)),
+        {"ix_tasks_due_date_id"},
+    ),
+    Case(
+        "status, sort=due_date",
+        lambda db: crud.get_tasks(db, status=models.TaskStatus.COMPLETED, sort="due_date"),
+        {"ix_tasks_status_due_date_id"},
+    ),
+    Case(
+        "overdue, sort=due_date",
+        lambda db: crud.get_tasks(db, overdue=True, sort="due_date", now=NOW),
+        {"ix_tasks_status_due_date_id"},
+    ),
+    Case(
+        "overdue",
+        lambda db: crud.get_tasks(db, overdue=True, now=NOW),
+        {"ix_tasks_status_due_date_id", "ix_tasks_status_created_at_id", "ix_tasks_created_at_id"},
+        sort_allowed=True,
+    ),
+    Case("has_email", lambda db: crud.get_tasks(db, has_email=True), {"ix_tasks_with_email_created_at_id"}),
+    Case(
+        "has_email, created range",
+        lambda db: crud.get_tasks(db, has_email=True, created_from=SEED_EPOCH + timedelta(days=1)),
+        {"ix_tasks_with_email_created_at_id"},
+    ),
+    Case(
+        "overdue notifications",
+        lambda db: crud.get_tasks_due_for_overdue_notification(db, now=NOW, limit=100),
+        {"ix_tasks_overdue_notification"},
+        sort_allowed=True,
+    ),
+    Case(
+        "overdue claim",
+        lambda db: crud.claim_tasks_due_for_overdue_notification(db, limit=100, lease_seconds=60, now=NOW),
+        {"ix_tasks_overdue_notification"},
+        sort_allowed=True,
+    ),
+]
+
+
+async def seed(engine: AsyncEngine, count: int, analyze: bool = True):
+    generator = random.Random(0)
+    for start in range(0, count, SEED_BATCH_SIZE):
+        rows = []
+        for index in range(start, min(start + SEED_BATCH_SIZE, count)):
+            due_date = SEED_EPOCH + timedelta(hours=generator.randrange(365 * 24))
+            email = f"user{index}@example.com" if generator.random() < 0.1 else None
+            rows.append(
+                {
+                    "title": f"Завдання {index}",
+                    "status": models.TaskStatus.COMPLETED if generator.random() < 0.6 else models.TaskStatus.PENDING,
+                    "due_date": due_date if generator.random() < 0.8 else None,
+                    "created_at": SEED_EPOCH + timedelta(seconds=index * 30),
+                    "notification_email": email,
+                    "overdue_notified_at": due_date if email and due_date < NOW and generator.random() < 0.9 else None,
+                }
+            )
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.Task), rows)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if analyze:
+            await conn.exec_driver_sql("ANALYZE")
+
+
+async def _sqlite_plan(conn, statement: str, parameters) -> tuple[list[str], set[str], bool, bool]:
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    details = [row[-1] for row in result]
+    indexes = {word for detail in details for word in detail.replace("(", " ").split() if word.startswith("ix_")}
+    full_scan = any(detail == "SCAN tasks" for detail in details)
+    sorted_ = any("TEMP B-TREE" in detail for detail in details)
+    return details, indexes, full_scan, sorted_
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+async def _postgres_plan(conn, statement: str, parameters) -> tuple[list[str], set[str], bool, bool]:
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    plan = result.scalar_one()
+    nodes = list(_walk((json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]))
+    details = [f"{node['Node Type']} {node.get('Index Name') or node.get('Relation Name') or ''}".strip() for node in nodes]
+    indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+    full_scan = any(node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "tasks" for node in nodes)
+    sorted_ = any(node["Node Type"] in ("Sort", "Incremental Sort") for node in nodes)
+    return details, indexes, full_scan, sorted_
+
+
+async def inspect_case(engine: AsyncEngine, case: Case) -> tuple[list[str], set[str], list[list[str]]]:
+    """Виконує запити ``case`` і повертає (проблеми плану, використані індекси, плани)."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with session_factory(engine)() as session:
+            await case.run(session)
+            await session.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    explain = _postgres_plan if engine.dialect.name == "postgresql" else _sqlite_plan
+    problems, used, plans = [], set(), []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            details, indexes, full_scan, sorted_ = await explain(conn, statement, parameters)
+            used |= indexes
+            plans.append(details)
+            if full_scan:
+                problems.append("повне читання tasks")
+            if sorted_ and not case.sort_allowed:
+                problems.append("окреме сортування")
+    if not used & case.indexes:
+        problems.append(f"не використано {' або '.join(sorted(case.indexes))}")
+    return problems, used, plans
+
+
+async def check(engine: AsyncEngine) -> bool:
+    ok = True
+    for case in CASES:
+        problems, used, plans = await inspect_case(engine, case)
+        ok = ok and not problems
+        print(f"{'OK  ' if not problems else 'FAIL'} {case.name:<28}{', '.join(sorted(used)) or '-'}")
+        for problem in problems:
+            print(f"     {problem}")
+        if problems:
+            for details in plans:
+                print("     " + " | ".join(details))
+    return ok
+
+
+async def run(args) -> bool:
+    if args.postgres_url:
+        engine = create_async_engine(args.postgres_url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        engine = await create_engine(args.database or default_database_path("query-plans"))
+    await seed(engine, args.tasks, analyze=not args.no_analyze)
+    try:
+        return await check(engine)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--database", help="Шлях до файлу SQLite (за замовчуванням у тимчасовій теці)")
+    parser.add_argument("--postgres-url", help="Перевіряти плани PostgreSQL замість SQLite")
+    parser.add_argument("--no-analyze", action="store_true", help="Не збирати статистику ANALYZE (частковий індекс сповіщень тоді може не обиратися)")
+    sys.exit(0 if asyncio.run(run(parser.parse_args())) else 1)
+
+
+if __name__ == "__main__":
+    main()
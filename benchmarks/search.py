@@ -0,0 +1,150 @@
+"""Швидкість GET /tasks/search на великій таблиці порівняно з LIKE '%слово%'.
+
+Запуск: ``python -m benchmarks.search --tasks 1000000``; для PostgreSQL —
+``--postgres-url postgresql+asyncpg://...`` (база в кодуванні UTF8 з
+LC_CTYPE, що розрізняє кирилицю, інакше to_tsvector її відкидає).
+Назви й описи складаються зі слів синтетичного українського словника з
+частотами за законом Ципфа, тож запити покривають і рідкісні, і часті слова.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+from datetime import timedelta
+
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import crud, models, search
+from app.database import Base
+from benchmarks.common import (
+    SEED_BATCH_SIZE,
+    SEED_EPOCH,
+    create_engine,
+    default_database_path,
+    measure,
+    session_factory,
+)
+
+SYLLABLES = "ка ро ні ла ві ст ми до ре жи ї ць ту по хо бу лі зе ня ґа є ша".split()
+VOCABULARY_SIZE = 20_000
+# Ранги слів у словнику, за якими будуються запити: від найчастішого до рідкісних.
+QUERY_RANKS = (0, 10, 100, 1000, 10_000)
+
+
+def _vocabulary() -> list[str]:
+    generator = random.Random(0)
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(generator.choices(SYLLABLES, k=generator.randint(2, 4))))
+    return sorted(words, key=lambda word: (len(word), word))
+
+
+def _texts(vocabulary: list[str], count: int, seed: int):
+    generator = random.Random(seed)
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for _ in range(count):
+        title = " ".join(generator.choices(vocabulary, cum_weights=weights, k=generator.randint(2, 5)))
+        description = " ".join(generator.choices(vocabulary, cum_weights=weights, k=generator.randint(5, 20)))
+        yield title.capitalize(), description
+
+
+async def _seed(engine, vocabulary: list[str], count: int):
+    texts = _texts(vocabulary, count, seed=1)
+    for start in range(0, count, SEED_BATCH_SIZE):
+        rows = [
+            {
+                "title": title,
+                "description": description,
+                "status": models.TaskStatus.PENDING,
+                "created_at": SEED_EPOCH + timedelta(seconds=index),
+            }
+            for index, (title, description) in zip(range(start, min(start + SEED_BATCH_SIZE, count)), texts)
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.Task), rows)
+
+
+async def _create_postgres_engine(url: str, fresh: bool = True):
+    engine = create_async_engine(url)
+    if fresh:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+def _like(word: str):
+    pattern = f"%{word}%"
+    return or_(func.lower(models.Task.title).like(pattern), func.lower(models.Task.description).like(pattern))
+
+
+async def _count_matches(session, q: str) -> int:
+    candidates, search.SEARCH_MAX_CANDIDATES = search.SEARCH_MAX_CANDIDATES, 0
+    try:
+        return len(await crud.search_tasks(db=session, q=q, limit=None))
+    finally:
+        search.SEARCH_MAX_CANDIDATES = candidates
+
+
+async def run(args):
+    if args.max_candidates is not None:
+        search.SEARCH_MAX_CANDIDATES = args.max_candidates
+    vocabulary = _vocabulary()
+    if args.postgres_url:
+        engine = await _create_postgres_engine(args.postgres_url, fresh=not args.reuse)
+    else:
+        engine = await create_engine(args.database or default_database_path("search"), fresh=not args.reuse)
+    if not args.reuse:
+        await _seed(engine, vocabulary, args.tasks)
+        if args.postgres_url:
+            async with engine.connect() as conn:
+                await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.exec_driver_sql("VACUUM ANALYZE tasks")
+
+    queries = [vocabulary[rank] for rank in QUERY_RANKS]
+    queries += [f"{vocabulary[10]} {vocabulary[100]}", vocabulary[1000][:3]]
+
+    Session = session_factory(engine)
+    print(f"{'query':<24}{'matches':>10}{'p50 ms':>10}{'p95 ms':>10}{'page 2 p95':>12}{'LIKE p95':>12}")
+    async with Session() as session:
+        for q in queries:
+            count_query = select(func.count()).select_from(models.Task)
+            matches = await _count_matches(session, q)
+            first = await crud.search_tasks(db=session, q=q, limit=args.limit)
+            stats = await measure(lambda: crud.search_tasks(db=session, q=q, limit=args.limit), args.repeat)
+
+            page_p95 = float("nan")
+            if len(first) == args.limit:
+                cursor = (first[-1][1], first[-1][0].id)
+                page = await measure(
+                    lambda: crud.search_tasks(db=session, q=q, limit=args.limit, after=cursor), args.repeat
+                )
+                page_p95 = page["p95_ms"]
+
+            like_p95 = float("nan")
+            if not args.skip_like and " " not in q:
+                like = await measure(
+                    lambda: session.execute(count_query.where(_like(q))), max(1, args.repeat // 10)
+                )
+                like_p95 = like["p95_ms"]
+
+            print(f"{q:<24}{matches:>10}{stats['median_ms']:>10.2f}{stats['p95_ms']:>10.2f}{page_p95:>12.2f}{like_p95:>12.2f}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--database", help="Шлях до файлу SQLite (за замовчуванням у тимчасовій теці)")
+    parser.add_argument("--postgres-url", help="Вимірювати на PostgreSQL замість SQLite")
+    parser.add_argument("--max-candidates", type=int, help="Замінити SEARCH_MAX_CANDIDATES (0 — без обмеження)")
+    parser.add_argument("--reuse", action="store_true", help="Не пересівати вже заповнену базу")
+    parser.add_argument("--skip-like", action="store_true", help="Не вимірювати повільний LIKE для порівняння")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Серіалізація сторінок GET /tasks/ і GET /tasks/{task_id}/history: pydantic проти orjson.
+
+Запуск: ``python -m benchmarks.serialization --tasks 10000 --limit 200 --blob-kb 4``.
+Старий шлях — об'єкти ORM, ``TaskResponse.model_validate(...).model_dump`` і
+перевірка ``response_model`` у FastAPI (``serialize_response``) з кодуванням
+JSONResponse, колонки JSON розбирає json.loads; новий — рядки з потрібними
+колонками й ``serialization.dump_rows`` на рушії з параметрами застосунку
+(``database._engine_options``, колонки JSON розбирає orjson).
+Окремо вимірюється влучання в кеш сторінки: раніше FastAPI перевіряв і кодував
+закешовані словники щоразу, тепер віддаються готові байти. Перед вимірюванням
+перевіряється, що обидва шляхи дають однакові байти.
+"""
+import argparse
+import asyncio
+from datetime import timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import crud, history, models, schemas, serialization
+from app.database import _engine_options
+from benchmarks.common import SEED_EPOCH, create_engine, default_database_path, measure, seed_tasks, session_factory
+
+HOT_TASK_ID = 1
+
+TASKS_FIELD = create_model_field("Response", List[schemas.TaskResponse])
+HISTORY_FIELD = create_model_field("Response", List[schemas.TaskHistoryResponse])
+
+
+async def _fastapi_body(field, content) -> bytes:
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def _seed_history(engine, count: int, blob_kb: int):
+    snapshot = {
+        "id": HOT_TASK_ID,
+        "title": "Завдання",
+        "description": "опис " * (blob_kb * 1024 // 10),
+        "status": "pending",
+        "due_date": None,
+        "created_at": SEED_EPOCH.isoformat(),
+        "notification_email": None,
+    }
+    rows = [
+        {
+            "task_id": HOT_TASK_ID,
+            "event_type": models.TaskEventType.UPDATED,
+            "changed_at": SEED_EPOCH + timedelta(seconds=index),
+            "is_checkpoint": True,
+            "before_data": {**snapshot, "title": f"Завдання {index}"},
+            "after_data": {**snapshot, "title": f"Завдання {index + 1}"},
+            "changed_fields": ["title"],
+        }
+        for index in range(count)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(insert(models.TaskHistory), rows)
+
+
+async def run(args):
+    path = default_database_path("serialization")
+    engine = await create_engine(path)
+    await seed_tasks(engine, args.tasks)
+    await _seed_history(engine, args.limit, args.blob_kb)
+    url = f"sqlite+aiosqlite:///{path}"
+    app_engine = create_async_engine(url, **_engine_options(url))
+
+    fields = serialization.TASK_FIELDS
+    columns = dict.fromkeys((*fields, "id", "created_at"))
+    async with session_factory(engine)() as db, session_factory(app_engine)() as app_db:
+        async def old_tasks_page():
+            # Як раніше в read_tasks: load_page (його результат кешувався) і response_model.
+            result = await db.execute(
+                select(models.Task).order_by(models.Task.created_at, models.Task.id).limit(args.limit)
+            )
+            items = [schemas.TaskResponse.model_validate(task).model_dump(mode="json") for task in result.scalars()]
+            db.expunge_all()
+            return items, await _fastapi_body(TASKS_FIELD, items)
+
+        async def new_tasks_page():
+            rows = await crud.get_tasks(db=app_db, limit=args.limit, columns=columns)
+            return serialization.dump_rows(rows, fields)
+
+        async def old_history_page():
+            result = await db.execute(
+                select(models.TaskHistory)
+                .where(models.TaskHistory.task_id == HOT_TASK_ID)
+                .order_by(models.TaskHistory.changed_at.desc(), models.TaskHistory.id.desc())
+                .limit(args.limit)
+            )
+            entries = await history.restore(db, result.scalars().all())
+            db.expunge_all()
+            return await _fastapi_body(HISTORY_FIELD, entries)
+
+        async def new_history_page():
+            entries = await crud.get_task_history(db=app_db, task_id=HOT_TASK_ID, limit=args.limit)
+            return serialization.dump_rows(entries, serialization.HISTORY_FIELDS)
+
+        cached_items, old_body = await old_tasks_page()
+        assert old_body == await new_tasks_page(), "сторінки завдань відрізняються"
+        assert await old_history_page() == await new_history_page(), "сторінки історії відрізняються"
+
+        cases = [
+            (f"GET /tasks/?limit={args.limit}", old_tasks_page, new_tasks_page),
+            (
+                "  влучання в кеш",
+                lambda: _fastapi_body(TASKS_FIELD, cached_items),
+                # Новий шлях віддає закешований рядок без перетворень.
+                lambda: asyncio.sleep(0),
+            ),
+            (f"GET /tasks/1/history?limit={args.limit} ({args.blob_kb} КБ)", old_history_page, new_history_page),
+        ]
+        print(f"{'case':<44}{'old ms':>10}{'new ms':>10}{'speedup':>9}")
+        for name, old, new in cases:
+            old_stats = await measure(old, args.repeat)
+            new_stats = await measure(new, args.repeat)
+            speedup = old_stats["median_ms"] / new_stats["median_ms"] if new_stats["median_ms"] else float("inf")
+            print(f"{name:<44}{old_stats['median_ms']:>10.3f}{new_stats['median_ms']:>10.3f}{speedup:>8.1f}x")
+    await engine.dispose()
+    await app_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--blob-kb", type=int, default=4, help="Розмір опису в знімках історії")
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
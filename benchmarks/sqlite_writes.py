@@ -0,0 +1,100 @@
+"""Пропускна здатність записів SQLite: звичайний режим проти SQLITE_CONCURRENT_MODE.
+
+Запуск: ``python -m benchmarks.sqlite_writes --clients 200 --requests 5000``.
+Кожен клієнт надсилає PATCH /tasks/{id}; помилки ("database is locked") рахуються окремо.
+Кожен режим вимірюється в окремому процесі, бо рушій БД створюється під час імпорту app.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def _load(args) -> dict:
+    import httpx
+
+    from app.database import Base, engine
+    from app.main import app, limiter
+    from benchmarks.common import percentile, seed_tasks
+
+    limiter.enabled = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await seed_tasks(engine, args.seed)
+
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(args.requests))
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def client_loop():
+            nonlocal errors
+            for index in remaining:
+                task_id = random.randint(1, args.seed)
+                started = time.perf_counter()
+                response = await client.patch(f"/tasks/{task_id}", json={"title": f"Оновлене {index}"})
+                if response.status_code == 200:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.clients)))
+        duration = time.perf_counter() - started
+
+    await engine.dispose()
+    return {
+        "writes_per_second": round(len(latencies) / duration, 1),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def _run_mode(concurrent: bool, args) -> dict:
+    if os.path.exists(args.database):
+        os.remove(args.database)
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{args.database}",
+        "SQLITE_CONCURRENT_MODE": "1" if concurrent else "0",
+        "CACHE_BACKEND": "none",
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.sqlite_writes", "--worker",
+        "--clients", str(args.clients), "--requests", str(args.requests), "--seed", str(args.seed),
+    ]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=10_000)
+    parser.add_argument("--database", default=os.path.join(tempfile.gettempdir(), "todo-bench-sqlite-writes.db"))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(_load(args))))
+        return
+
+    print(f"{'mode':<12}{'writes/s':>10}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, concurrent in (("default", False), ("concurrent", True)):
+        result = _run_mode(concurrent, args)
+        print(
+            f"{name:<12}{result['writes_per_second']:>10}{result['errors']:>8}"
+            f"{result['p50_ms']:>10}{result['p99_ms']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
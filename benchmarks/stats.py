@@ -0,0 +1,91 @@
+"""Час GET /tasks/stats (crud.get_task_stats) при зростанні таблиці tasks.
+
+Запуск: ``python -m benchmarks.stats --sizes 10000 100000 1000000``; для
+PostgreSQL — з ``--postgres-url postgresql+asyncpg://...``. Таблиця дозаповнюється
+до кожного розміру, лічильники перераховуються з нуля (час reconcile теж
+виводиться), після чого вимірюється читання статистики з лічильників і для
+порівняння ті самі числа через COUNT(*) ... GROUP BY по tasks.
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import crud, models, stats
+from app.database import Base
+from benchmarks.common import SEED_EPOCH, create_engine, default_database_path, measure, seed_tasks, session_factory
+
+NOW = SEED_EPOCH + timedelta(days=180)
+DAYS = 30
+
+
+async def _grow(engine, current: int, size: int):
+    await seed_tasks(engine, size - current)
+    async with engine.begin() as conn:
+        # seed_tasks не заповнює completed_at: розносимо виконання по днях створення.
+        await conn.execute(
+            update(models.Task)
+            .where(models.Task.status == models.TaskStatus.COMPLETED, models.Task.completed_at.is_(None))
+            .values(completed_at=models.Task.created_at)
+        )
+
+
+async def _scan(session):
+    """Ті самі числа, що й у stats.read, прямими агрегатами по tasks."""
+    task = models.Task
+    await session.execute(select(task.status, func.count()).group_by(task.status))
+    await session.execute(
+        select(func.count()).where(task.status == models.TaskStatus.PENDING, task.due_date < NOW)
+    )
+    day = func.date(task.completed_at)
+    await session.execute(
+        select(day, func.count())
+        .where(task.status == models.TaskStatus.COMPLETED, task.completed_at >= NOW - timedelta(days=DAYS))
+        .group_by(day)
+    )
+
+
+async def run(args):
+    if args.postgres_url:
+        engine = create_async_engine(args.postgres_url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        engine = await create_engine(args.database or default_database_path("stats"))
+
+    Session = session_factory(engine)
+    print(f"{'tasks':>10}{'reconcile ms':>14}{'stats p50':>12}{'stats p95':>12}{'scan p50':>12}{'scan p95':>12}")
+    current = 0
+    for size in sorted(args.sizes):
+        await _grow(engine, current, size)
+        current = size
+        async with Session() as session:
+            started = time.perf_counter()
+            await stats.reconcile(session)
+            await session.commit()
+            reconcile_ms = (time.perf_counter() - started) * 1000
+
+            counters = await measure(lambda: crud.get_task_stats(db=session, days=DAYS, now=NOW), args.repeat)
+            scan = await measure(lambda: _scan(session), max(1, args.repeat // 10))
+        print(
+            f"{size:>10}{reconcile_ms:>14.1f}{counters['median_ms']:>12.2f}{counters['p95_ms']:>12.2f}"
+            f"{scan['median_ms']:>12.2f}{scan['p95_ms']:>12.2f}"
+        )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--database", help="Шлях до файлу SQLite (за замовчуванням у тимчасовій теці)")
+    parser.add_argument("--postgres-url", help="Вимірювати на PostgreSQL замість SQLite")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""Відтворюваний набір бенчмарків API та Celery-задач із порівнянням між комітами.
+
+Запуск::
+
+    python -m benchmarks.suite run --tasks 100000 --history 100000 --requests 2000
+    python -m benchmarks.suite compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+
+``run`` наповнює окрему базу SQLite, проганяє сценарії ендпоінтів через ASGI-транспорт
+у процесі та через uvicorn по TCP, потім задачі ``send_overdue_deadline_notifications``
+, ``send_task_completed_email`` і ``relay_outbox`` з eager-Celery проти локального SMTP-приймача aiosmtpd.
+Для кожного сценарію записуються p50/p95/p99, пропускна здатність і пам'ять; результат
+зберігається в JSON, названий за поточним комітом. ``compare`` показує різницю двох
+таких файлів і з ``--fail-on-regression`` завершується з кодом 1 при погіршенні.
+"""
+import os
+import tempfile
+
+DATABASE_PATH = os.getenv("BENCH_DATABASE_PATH", os.path.join(tempfile.gettempdir(), "todo-bench-suite.db"))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+os.environ.setdefault("CACHE_BACKEND", "none")
+os.environ.setdefault("SMTP_HOST", "127.0.0.1")
+os.environ.setdefault("SMTP_PORT", "8026")
+os.environ["SMTP_USE_TLS"] = "0"
+# Лист на кожне завдання, щоб relay_outbox лишався порівнянним між комітами.
+os.environ.setdefault("COMPLETED_NOTIFICATION_MODE", "immediate")
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+HOT_TASK_ID = 1
+BULK_ITEMS = 100
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def _endpoint_request(client, scenario: str, index: int, tasks: int):
+    task_id = random.randint(1, tasks)
+    if scenario == "list_tasks":
+        return client.get("/tasks/", params={"limit": 50})
+    if scenario == "list_tasks_by_status":
+        return client.get("/tasks/", params={"limit": 50, "status": "pending"})
+    if scenario == "get_task":
+        return client.get(f"/tasks/{task_id}")
+    if scenario == "task_stats":
+        return client.get("/tasks/stats")
+    if scenario == "task_history":
+        return client.get(f"/tasks/{HOT_TASK_ID}/history", params={"limit": 50})
+    if scenario == "create_task":
+        return client.post("/tasks/", json={"title": f"Нове {index}"})
+    if scenario == "update_task":
+        return client.patch(f"/tasks/{task_id}", json={"title": f"Оновлене {index}"})
+    if scenario == "complete_task":
+        # Перехід у completed з email пише сповіщення в outbox тією ж транзакцією.
+        status = "completed" if index % 2 == 0 else "pending"
+        return client.patch(f"/tasks/{task_id}", json={"status": status, "notification_email": "bench@example.com"})
+    if scenario == "bulk_create":
+        return client.post("/tasks/bulk", json={"items": [{"title": f"Пакет {index}-{n}"} for n in range(BULK_ITEMS)]})
+    raise ValueError(f"Невідомий сценарій: {scenario}")
+
+
+ENDPOINT_SCENARIOS = (
+    "list_tasks",
+    "list_tasks_by_status",
+    "get_task",
+    "task_stats",
+    "task_history",
+    "create_task",
+    "update_task",
+    "complete_task",
+    "bulk_create",
+)
+
+
+def _latency_stats(latencies: list[float], duration: float, errors: int) -> dict:
+    from benchmarks.common import percentile
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 1) if duration else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        **{metric: round(percentile(latencies, int(metric[1:3])), 3) for metric in LATENCY_METRICS},
+    }
+
+
+async def _drive(client, scenario: str, requests: int, clients: int, tasks: int) -> dict:
+    import httpx
+
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client_loop():
+        nonlocal errors
+        for index in remaining:
+            started = time.perf_counter()
+            try:
+                response = await _endpoint_request(client, scenario, index, tasks)
+            except httpx.TransportError:
+                errors += 1
+                continue
+            if response.status_code < 400:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    return _latency_stats(latencies, time.perf_counter() - started, errors)
+
+
+async def _allocation_peak(client, scenario: str, samples: int, tasks: int) -> float:
+    """Пік виділеної Python-пам'яті (KiB) на один запит за ``samples`` послідовних запитів."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for index in range(samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await _endpoint_request(client, scenario, index, tasks)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return round(max(peaks, default=0) / 1024, 1)
+
+
+def _max_rss_kib() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _process_rss_kib(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+async def _seed(args):
+    from app import stats
+    from benchmarks.common import create_engine, seed_history, seed_tasks, session_factory
+
+    engine = await create_engine(DATABASE_PATH)
+    await seed_tasks(engine, args.tasks)
+    await seed_history(engine, HOT_TASK_ID, args.history)
+    # Заповнення йде в обхід crud, тож лічильники /tasks/stats рахуємо з нуля.
+    async with session_factory(engine)() as session:
+        await stats.reconcile(session)
+        await session.commit()
+    await engine.dispose()
+
+
+async def _run_asgi(args) -> dict:
+    import httpx
+
+    from app.database import engine
+    from app.main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for scenario in ENDPOINT_SCENARIOS:
+            stats = await _drive(client, scenario, args.requests, args.clients, args.tasks)
+            stats["alloc_peak_kib"] = await _allocation_peak(client, scenario, args.memory_samples, args.tasks)
+            stats["max_rss_kib"] = _max_rss_kib()
+            results[scenario] = stats
+            print(f"  asgi     {scenario:<22}{stats['throughput_rps']:>10} rps  p99 {stats['p99_ms']} ms", file=sys.stderr)
+    await engine.dispose()
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_ready(client, server: subprocess.Popen):
+    import httpx
+
+    for _ in range(200):
+        if server.poll() is not None:
+            raise SystemExit("uvicorn завершився під час запуску")
+        try:
+            await client.get("/cache/stats")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.05)
+    raise SystemExit("uvicorn не відповів за 10 секунд")
+
+
+async def _run_uvicorn(args) -> dict:
+    import httpx
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.suite", "serve", "--port", str(port)],
+        stderr=subprocess.DEVNULL,
+    )
+    results = {}
+    try:
+        limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=300) as client:
+            await _wait_until_ready(client, server)
+            for scenario in ENDPOINT_SCENARIOS:
+                stats = await _drive(client, scenario, args.requests, args.clients, args.tasks)
+                stats["server_rss_kib"] = _process_rss_kib(server.pid)
+                results[scenario] = stats
+                print(f"  uvicorn  {scenario:<22}{stats['throughput_rps']:>10} rps  p99 {stats['p99_ms']} ms", file=sys.stderr)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+class _SinkHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+async def _prepare_notifications(overdue: int, completed: int, outbox: bool = False):
+    """Перші ``overdue`` завдань стають простроченими, наступні ``completed`` — виконаними, усі без сповіщень.
+
+    З ``outbox`` для виконаних ще й додаються рядки outbox_messages, як це робить PATCH.
+    """
+    from sqlalchemy import update
+
+    from app import models, outbox as task_outbox
+    from app.database import WriteSessionLocal
+
+    async with WriteSessionLocal() as db:
+        await db.execute(
+            update(models.Task)
+            .where(models.Task.id <= overdue)
+            .values(
+                status=models.TaskStatus.PENDING,
+                due_date=datetime(2020, 1, 1, tzinfo=timezone.utc),
+                notification_email="bench@example.com",
+                overdue_notified_at=None,
+                overdue_claim_token=None,
+                overdue_claim_expires_at=None,
+            )
+        )
+        await db.execute(
+            update(models.Task)
+            .where(models.Task.id > overdue, models.Task.id <= overdue + completed)
+            .values(
+                status=models.TaskStatus.COMPLETED,
+                notification_email="bench@example.com",
+                completed_notified_at=None,
+            )
+        )
+        if outbox:
+            await task_outbox.add(
+                db,
+                models.OutboxKind.TASK_COMPLETED,
+                [(task_id, "bench@example.com") for task_id in range(overdue + 1, overdue + completed + 1)],
+            )
+        await db.commit()
+
+
+def _run_jobs(args) -> dict:
+    from aiosmtpd.controller import Controller
+
+    from app import worker_runtime
+    from app.celery_app import celery_app, relay_outbox, send_overdue_deadline_notifications, send_task_completed_email
+
+    celery_app.conf.task_always_eager = True
+    handler = _SinkHandler()
+    controller = Controller(handler, hostname=os.environ["SMTP_HOST"], port=int(os.environ["SMTP_PORT"]))
+    controller.start()
+    results = {}
+    try:
+        durations, sent = [], 0
+        started = time.perf_counter()
+        for _ in range(args.job_runs):
+            worker_runtime.run(_prepare_notifications(args.overdue, args.completed_emails))
+            before = handler.received
+            run_started = time.perf_counter()
+            send_overdue_deadline_notifications.apply()
+            durations.append((time.perf_counter() - run_started) * 1000)
+            sent += handler.received - before
+        total = time.perf_counter() - started
+        results["send_overdue_deadline_notifications"] = {
+            **_latency_stats(durations, total, 0),
+            "emails": sent,
+            "emails_per_second": round(sent / sum(durations) * 1000, 1) if durations else 0.0,
+            "max_rss_kib": _max_rss_kib(),
+        }
+
+        durations, before = [], handler.received
+        started = time.perf_counter()
+        for task_id in range(args.overdue + 1, args.overdue + args.completed_emails + 1):
+            task_started = time.perf_counter()
+            send_task_completed_email.apply(args=(task_id,))
+            durations.append((time.perf_counter() - task_started) * 1000)
+        results["send_task_completed_email"] = {
+            **_latency_stats(durations, time.perf_counter() - started, 0),
+            "emails": handler.received - before,
+            "max_rss_kib": _max_rss_kib(),
+        }
+
+        durations, before = [], handler.received
+        started = time.perf_counter()
+        for _ in range(args.job_runs):
+            worker_runtime.run(_prepare_notifications(0, args.completed_emails, outbox=True))
+            run_started = time.perf_counter()
+            relay_outbox.apply()
+            durations.append((time.perf_counter() - run_started) * 1000)
+        sent = handler.received - before
+        results["relay_outbox"] = {
+            **_latency_stats(durations, time.perf_counter() - started, 0),
+            "emails": sent,
+            "emails_per_second": round(sent / sum(durations) * 1000, 1) if durations else 0.0,
+            "max_rss_kib": _max_rss_kib(),
+        }
+    finally:
+        worker_runtime.shutdown()
+        controller.stop()
+    return results
+
+
+def _git(*command: str) -> str | None:
+    try:
+        return subprocess.run(["git", *command], check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata(args) -> dict:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "environment": {name: os.getenv(name) for name in ("CACHE_BACKEND", "SQLITE_CONCURRENT_MODE")},
+        "parameters": {
+            name: getattr(args, name)
+            for name in (
+                "tasks", "history", "requests", "clients", "memory_samples",
+                "overdue", "job_runs", "completed_emails", "drivers",
+            )
+        },
+    }
+
+
+def run(args):
+    asyncio.run(_seed(args))
+    from app.database import engine
+
+    engine.echo = False
+    from app.main import limiter
+
+    limiter.enabled = False
+
+    results = {"meta": _metadata(args), "endpoints": {}, "jobs": {}}
+    if "asgi" in args.drivers:
+        results["endpoints"]["asgi"] = asyncio.run(_run_asgi(args))
+    if "uvicorn" in args.drivers:
+        results["endpoints"]["uvicorn"] = asyncio.run(_run_uvicorn(args))
+    if not args.skip_jobs:
+        results["jobs"] = _run_jobs(args)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{(results['meta']['commit'] or 'local')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print(output)
+
+
+def serve(args):
+    import uvicorn
+
+    from app.main import app, limiter
+
+    limiter.enabled = False
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+def _flatten(results: dict) -> dict[str, dict]:
+    flat = {f"{driver}/{name}": stats for driver, scenarios in results["endpoints"].items() for name, stats in scenarios.items()}
+    flat.update({f"job/{name}": stats for name, stats in results["jobs"].items()})
+    return flat
+
+
+def compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = _flatten(json.load(file))
+    with open(args.candidate, encoding="utf-8") as file:
+        candidate = _flatten(json.load(file))
+
+    regressions = 0
+    print(f"{'scenario':<44}{'metric':<16}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name in sorted(baseline.keys() & candidate.keys()):
+        for metric in (*LATENCY_METRICS, "throughput_rps"):
+            before, after = baseline[name].get(metric), candidate[name].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            # Для затримок погіршення — це зростання, для пропускної здатності — падіння.
+            worse = change > args.threshold if metric != "throughput_rps" else change < -args.threshold
+            regressions += worse
+            marker = "  !" if worse else ""
+            print(f"{name:<44}{metric:<16}{before:>12}{after:>12}{change:>+9.1f}%{marker}")
+    for name in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{name:<44}є лише в {'baseline' if name in baseline else 'candidate'}")
+    print(f"Погіршень понад {args.threshold}%: {regressions}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Наповнити базу, виміряти сценарії й записати JSON")
+    run_parser.add_argument("--tasks", type=int, default=100_000, help="Кількість завдань у базі")
+    run_parser.add_argument("--history", type=int, default=100_000, help="Кількість записів історії гарячого завдання")
+    run_parser.add_argument("--requests", type=int, default=2000, help="Запитів на сценарій")
+    run_parser.add_argument("--clients", type=int, default=50, help="Паралельних клієнтів")
+    run_parser.add_argument("--memory-samples", type=int, default=50, help="Запитів під tracemalloc на сценарій")
+    run_parser.add_argument("--overdue", type=int, default=1000, help="Прострочених завдань на прогін задачі")
+    run_parser.add_argument("--job-runs", type=int, default=5, help="Прогонів send_overdue_deadline_notifications")
+    run_parser.add_argument("--completed-emails", type=int, default=500, help="Викликів send_task_completed_email")
+    run_parser.add_argument("--drivers", nargs="+", choices=("asgi", "uvicorn"), default=["asgi", "uvicorn"])
+    run_parser.add_argument("--skip-jobs", action="store_true", help="Не запускати Celery-задачі")
+    run_parser.add_argument("--output", help="Шлях до JSON (типово benchmarks/results/<коміт>.json)")
+
+    compare_parser = commands.add_parser("compare", help="Порівняти два JSON-результати")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Поріг погіршення у відсотках")
+    compare_parser.add_argument("--fail-on-regression", action="store_true")
+
+    serve_parser = commands.add_parser("serve", help=argparse.SUPPRESS)
+    serve_parser.add_argument("--port", type=int, required=True)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "serve":
+        serve(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
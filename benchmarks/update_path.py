@@ -0,0 +1,125 @@
+"""Запити до БД і затримка PATCH /tasks/{id}.
+
+Запуск: ``python -m benchmarks.update_path --tasks 10000 --requests 2000 --clients 20``;
+для PostgreSQL — з ``--postgres-url postgresql+asyncpg://...``. Спершу послідовні
+PATCH (зміна назви й перемикання статусу) з підрахунком запитів до БД на один PATCH
+(execute та commit), потім ті самі запити від ``--clients`` паралельних клієнтів.
+Вимірювання йде в окремому процесі, бо рушій БД створюється під час імпорту app.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _payload(index: int) -> dict:
+    if index % 2:
+        return {"title": f"Оновлене {index}"}
+    return {"status": "completed" if index % 4 == 0 else "pending"}
+
+
+async def _load(args) -> dict:
+    import httpx
+    from sqlalchemy import event
+
+    from app.database import Base, engine
+    from app.main import app, limiter
+    from benchmarks.common import percentile, seed_tasks
+
+    limiter.enabled = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await seed_tasks(engine, args.tasks)
+
+    round_trips = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_execute(*_):
+        nonlocal round_trips
+        round_trips += 1
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(*_):
+        nonlocal round_trips
+        round_trips += 1
+
+    results = {}
+    # Без SQLITE_CONCURRENT_MODE паралельні записи в SQLite можуть отримати
+    # "database is locked" — такі відповіді 500 рахуються як помилки.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        latencies = []
+        round_trips = 0
+        for index in range(args.requests):
+            started = time.perf_counter()
+            response = await client.patch(f"/tasks/{random.randint(1, args.tasks)}", json=_payload(index))
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+        results["round_trips_per_patch"] = round(round_trips / args.requests, 2)
+        results["sequential_p50_ms"] = round(percentile(latencies, 50), 3)
+        results["sequential_p99_ms"] = round(percentile(latencies, 99), 3)
+
+        latencies = []
+        errors = 0
+        remaining = iter(range(args.requests))
+
+        async def client_loop():
+            nonlocal errors
+            for index in remaining:
+                started = time.perf_counter()
+                response = await client.patch(f"/tasks/{random.randint(1, args.tasks)}", json=_payload(index))
+                if response.status_code == 200:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.clients)))
+        duration = time.perf_counter() - started
+        results["concurrent_rps"] = round(len(latencies) / duration, 1)
+        results["concurrent_p50_ms"] = round(percentile(latencies, 50), 3)
+        results["concurrent_p99_ms"] = round(percentile(latencies, 99), 3)
+        results["concurrent_errors"] = errors
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--postgres-url", help="Вимірювати на PostgreSQL замість SQLite")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_load(args))))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.postgres_url or f"sqlite+aiosqlite:///{directory}/update_path.db"
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.update_path", "--child",
+                "--tasks", str(args.tasks),
+                "--requests", str(args.requests),
+                "--clients", str(args.clients),
+            ],
+            env=dict(os.environ, DATABASE_URL=url, CACHE_BACKEND="none"),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    for name, value in json.loads(output.strip().splitlines()[-1]).items():
+        print(f"{name:>24}  {value}")
+
+
+if __name__ == "__main__":
+    main()
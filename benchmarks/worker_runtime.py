@@ -0,0 +1,86 @@
+"""Накладні витрати на задачу send_task_completed_email: asyncio.run проти worker_runtime.
+
+Запуск: ``python -m benchmarks.worker_runtime --emails 10000``.
+Листи йдуть на локальний SMTP-приймач aiosmtpd, тому вимірюється саме цикл подій,
+сесія БД і SMTP-відправка, а не мережа.
+"""
+import os
+import tempfile
+
+DATABASE_PATH = os.path.join(tempfile.gettempdir(), "todo-bench-worker-runtime.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+os.environ.setdefault("SMTP_HOST", "127.0.0.1")
+os.environ.setdefault("SMTP_PORT", "8025")
+os.environ["SMTP_USE_TLS"] = "0"
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from aiosmtpd.controller import Controller
+from sqlalchemy import insert
+
+from app import models, worker_runtime
+from app.celery_app import _send_completed_notification
+from app.database import engine as app_engine
+from benchmarks.common import create_engine, percentile
+
+
+class _SinkHandler:
+    async def handle_DATA(self, server, session, envelope):
+        return "250 OK"
+
+
+async def _seed(count: int) -> list[int]:
+    engine = await create_engine(DATABASE_PATH)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "title": f"Завдання {index}",
+            "status": models.TaskStatus.COMPLETED,
+            "created_at": now,
+            "notification_email": f"user{index % 100}@example.com",
+        }
+        for index in range(count * 2)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(insert(models.Task), rows)
+    await engine.dispose()
+    return list(range(1, count * 2 + 1))
+
+
+def _run_phase(name: str, task_ids: list[int], runner):
+    durations = []
+    started = time.perf_counter()
+    for task_id in task_ids:
+        task_started = time.perf_counter()
+        runner(_send_completed_notification(task_id))
+        durations.append((time.perf_counter() - task_started) * 1000)
+    total = time.perf_counter() - started
+    print(
+        f"{name:<16}{len(task_ids):>8}{total:>10.2f}"
+        f"{sum(durations) / len(durations):>12.3f}{percentile(durations, 95):>12.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=10_000)
+    args = parser.parse_args()
+
+    app_engine.echo = False
+    task_ids = asyncio.run(_seed(args.emails))
+    controller = Controller(_SinkHandler(), hostname=os.environ["SMTP_HOST"], port=int(os.environ["SMTP_PORT"]))
+    controller.start()
+    try:
+        print(f"{'mode':<16}{'tasks':>8}{'total s':>10}{'mean ms':>12}{'p95 ms':>12}")
+        _run_phase("asyncio.run", task_ids[: args.emails], asyncio.run)
+        _run_phase("worker_runtime", task_ids[args.emails:], worker_runtime.run)
+    finally:
+        worker_runtime.shutdown()
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
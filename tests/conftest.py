@@ -0,0 +1,35 @@
+import asyncio
+import os
+import tempfile
+
+# До першого імпорту app: app.database створює engine з DATABASE_URL під час імпорту.
+DATABASE_PATH = os.path.join(tempfile.gettempdir(), "todo-tests.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+import pytest
+
+from app.database import Base, engine
+
+
+async def _recreate_database():
+    # drop_all не знає про віртуальну таблицю tasks_fts, тож база щоразу нова.
+    await engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DATABASE_PATH + suffix):
+            os.remove(DATABASE_PATH + suffix)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@pytest.fixture
+def fresh_database():
+    """Виконує корутину у власному циклі подій на порожній базі застосунку."""
+
+    async def prepared(coro):
+        await _recreate_database()
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+
+    return lambda coro: asyncio.run(prepared(coro))
@@ -0,0 +1,37 @@
+import asyncio
+import os
+
+import pytest
+
+from benchmarks.common import create_engine
+from benchmarks.query_plans import CASES, inspect_case, seed
+
+# Плани PostgreSQL перевіряє python -m benchmarks.query_plans --postgres-url ...
+TASKS = 5_000
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("query-plans") / "todo.db")
+
+    async def prepare():
+        engine = await create_engine(path)
+        await seed(engine, TASKS)
+        await engine.dispose()
+
+    asyncio.run(prepare())
+    yield path
+    os.remove(path)
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_sqlite_plan_uses_index(database, case):
+    async def inspect():
+        engine = await create_engine(database, fresh=False)
+        try:
+            return await inspect_case(engine, case)
+        finally:
+            await engine.dispose()
+
+    problems, used, plans = asyncio.run(inspect())
+    assert not problems, f"{problems}; індекси: {sorted(used)}; плани: {plans}"
@@ -0,0 +1,72 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app import crud, models, schemas
+from app.database import AsyncSessionLocal
+
+NOW = datetime.now(timezone.utc)
+
+
+def _due_date(generator: random.Random) -> datetime | None:
+    if generator.random() < 0.2:
+        return None
+    return NOW + timedelta(days=generator.randint(-10, 10), hours=generator.randint(0, 23))
+
+
+def _changes(generator: random.Random) -> dict:
+    changes = {}
+    if generator.random() < 0.6:
+        changes["status"] = generator.choice(list(models.TaskStatus))
+    if generator.random() < 0.5:
+        changes["due_date"] = _due_date(generator)
+    if generator.random() < 0.3:
+        changes["title"] = f"Завдання {generator.randrange(1000)}"
+    return changes
+
+
+async def _random_writes(db, generator: random.Random, steps: int):
+    ids = []
+    for _ in range(steps):
+        action = generator.choice(["create", "create_bulk", "update", "update_bulk", "delete", "delete_bulk"])
+        if action == "create" or not ids:
+            task = await crud.create_task(db, schemas.TaskCreate(title="Завдання", due_date=_due_date(generator)))
+            ids.append(task.id)
+        elif action == "create_bulk":
+            tasks = await crud.create_tasks_bulk(
+                db,
+                [schemas.TaskCreate(title="Завдання", due_date=_due_date(generator)) for _ in range(generator.randint(1, 5))],
+            )
+            ids.extend(task.id for task in tasks)
+        elif action == "update":
+            await crud.update_task(db, generator.choice(ids), schemas.TaskUpdate(**_changes(generator)))
+        elif action == "update_bulk":
+            chosen = generator.sample(ids, min(len(ids), generator.randint(1, 5)))
+            await crud.update_tasks_bulk(
+                db, [schemas.TaskBulkUpdateItem(id=task_id, **_changes(generator)) for task_id in chosen]
+            )
+        elif action == "delete":
+            await crud.delete_task(db, ids.pop(generator.randrange(len(ids))))
+        else:
+            chosen = generator.sample(ids, min(len(ids), generator.randint(1, 3)))
+            await crud.delete_tasks_bulk(db, chosen)
+            ids = [task_id for task_id in ids if task_id not in chosen]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_incremental_counters_match_reconcile(fresh_database, seed):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await _random_writes(db, random.Random(seed), steps=200)
+            stats = await crud.get_task_stats(db, days=30, now=NOW)
+            result = await db.execute(select(models.Task.status, func.count()).group_by(models.Task.status))
+            by_status = dict(result.all())
+            return await crud.reconcile_task_stats(db), stats, by_status
+
+    corrected, stats, by_status = fresh_database(scenario())
+
+    assert corrected == 0
+    assert stats["by_status"] == {status: by_status.get(status, 0) for status in models.TaskStatus}
+    assert stats["total"] == sum(by_status.values())
@@ -0,0 +1,25 @@
+import httpx
+import pytest
+
+from app.main import app
+
+
+@pytest.mark.parametrize("field", ["status", "title"])
+def test_patch_rejects_null_for_required_field(fresh_database, field):
+    async def calls():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            created = await client.post("/tasks/", json={"title": "Завдання"})
+            assert created.status_code == 201
+            task_id = created.json()["id"]
+            single = await client.patch(f"/tasks/{task_id}", json={field: None})
+            bulk = await client.patch("/tasks/bulk", json={"items": [{"id": task_id, field: None}]})
+            stored = await client.get(f"/tasks/{task_id}")
+            stats = await client.get("/tasks/stats")
+            return created, single, bulk, stored, stats
+
+    created, single, bulk, stored, stats = fresh_database(calls())
+
+    assert single.status_code == 422
+    assert bulk.status_code == 422
+    assert stored.json() == created.json()
+    assert stats.status_code == 200